@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# Batched collection of the files that experiments produce on remote hosts.
+
+import asyncio
+import hashlib
+import json
+import shlex
+import shutil
+import tempfile
+from pathlib import Path
+from typing import TextIO, Union
+
+# Manifest with the artifacts that were registered but not collected yet. It
+# is kept in the data directory so that artifacts left behind by an
+# interrupted campaign are collected by the next one.
+MANIFEST_NAME = ".artifacts.json"
+
+# Artifacts are only transferred in batches of at most this many files.
+MAX_BATCH_SIZE = 1000
+
+
+def sha256_file(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+async def run_shell(
+    command: str, log_file: Union[bool, TextIO]
+) -> tuple[int, str]:
+    """Run a local bash command without blocking the event loop.
+
+    Returns:
+        Exit status and standard output.
+    """
+    if log_file is True:
+        stderr = None
+    elif log_file is False:
+        stderr = asyncio.subprocess.DEVNULL
+    else:
+        stderr = log_file
+    proc = await asyncio.create_subprocess_exec(
+        "bash",
+        "-c",
+        command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=stderr,
+    )
+    stdout, _ = await proc.communicate()
+    return proc.returncode, stdout.decode()
+
+
+class ArtifactCollector:
+    """Files produced on remote hosts that are collected in bulk.
+
+    Experiments register every file they leave on a host (e.g., RTT
+    histograms) together with the local path where it belongs (i.e., the name
+    `paper_plots.py` expects). Files stay on the hosts until `collect` is
+    called, typically once at the end of a sweep. Each host then transfers all
+    of its files in a single compressed stream, all hosts in parallel.
+
+    Files are checked against their checksum on the host before they are
+    moved into place and they are only removed from the host afterwards.
+    Artifacts that could not be transferred are kept in the manifest and
+    retried by the next `collect`, even if it runs in a later campaign.
+
+    There is a single instance per data directory (see
+    `ArtifactCollector.get`).
+
+    Args:
+        data_dir: Data directory. Local paths are relative to it.
+    """
+
+    _instances: dict[Path, "ArtifactCollector"] = {}
+
+    def __init__(self, data_dir: Path) -> None:
+        self.data_dir = data_dir
+        self.manifest_path = data_dir / MANIFEST_NAME
+
+        # Pending artifacts per host, mapping local path to remote path.
+        self.pending: dict[str, dict[str, str]] = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path) as f:
+                self.pending = json.load(f)
+
+        # Hosts whose files are in the local filesystem.
+        self.local_hosts = {"localhost"}
+
+    @classmethod
+    def get(cls, data_dir: Path) -> "ArtifactCollector":
+        data_dir = data_dir.resolve()
+        if data_dir not in cls._instances:
+            cls._instances[data_dir] = cls(data_dir)
+        return cls._instances[data_dir]
+
+    def _save_manifest(self) -> None:
+        pending = {
+            host: files for host, files in self.pending.items() if files
+        }
+        tmp_path = self.manifest_path.with_name(f".{MANIFEST_NAME}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(pending, f, indent=2, sort_keys=True)
+        tmp_path.replace(self.manifest_path)
+
+    def register(
+        self, hostname: str, remote_path: str, local_path: Path
+    ) -> None:
+        """Register a file that must be collected from a host.
+
+        Args:
+            hostname: Host where the file is.
+            remote_path: Path of the file in the host. Relative paths are
+              relative to the home directory. The file must not change until
+              it is collected.
+            local_path: Where the file should be placed, inside the data
+              directory.
+        """
+        local_name = str(local_path.resolve().relative_to(self.data_dir))
+        self.pending.setdefault(hostname, {})[local_name] = remote_path
+        self._save_manifest()
+
+    def set_local_host(self, hostname: str) -> None:
+        """Treat the files of `hostname` as local (e.g., simulated hosts, see
+        `sim_testbed.py`)."""
+        self.local_hosts.add(hostname)
+
+    def host_command(self, hostname: str, command: str) -> str:
+        """Shell command that runs `command` on a host (which may be
+        local)."""
+        if hostname in self.local_hosts:
+            return f"bash -c {shlex.quote(command)}"
+        return f"ssh {hostname} {shlex.quote(command)}"
+
+    def nb_pending(self) -> int:
+        return sum(len(files) for files in self.pending.values())
+
+    def collect(self, log_file: Union[bool, TextIO] = False) -> int:
+        """Transfer all pending artifacts.
+
+        Returns:
+            Number of artifacts collected.
+
+        Raises:
+            RuntimeError: If some artifacts could not be collected. Corrupted
+              artifacts remain pending, while artifacts that no longer exist
+              on their host are dropped.
+        """
+        if self.nb_pending() == 0:
+            return 0
+
+        hosts = [host for host, files in self.pending.items() if files]
+
+        async def collect_all() -> list[Union[int, BaseException]]:
+            return await asyncio.gather(
+                *(self._collect_host(host, log_file) for host in hosts),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(collect_all())
+        self._save_manifest()
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return sum(results)
+
+    async def _collect_host(
+        self, hostname: str, log_file: Union[bool, TextIO]
+    ) -> int:
+        files = self.pending[hostname]
+        nb_collected = 0
+        local_names = sorted(files)
+        for i in range(0, len(local_names), MAX_BATCH_SIZE):
+            batch_names = local_names[i : i + MAX_BATCH_SIZE]
+            batch = {name: files[name] for name in batch_names}
+            nb_collected += await self._collect_batch(
+                hostname, batch, log_file
+            )
+        return nb_collected
+
+    async def _collect_batch(
+        self,
+        hostname: str,
+        batch: dict[str, str],
+        log_file: Union[bool, TextIO],
+    ) -> int:
+        remote_paths = sorted(set(batch.values()))
+        quoted_paths = " ".join(shlex.quote(path) for path in remote_paths)
+
+        # Checksums on the host. Missing files are simply not listed.
+        status, output = await run_shell(
+            self.host_command(
+                hostname,
+                f"cd ~ && sha256sum -- {quoted_paths} 2>/dev/null; true",
+            ),
+            log_file,
+        )
+        if status != 0:
+            raise RuntimeError(f"Failed to reach {hostname}")
+
+        checksums = {}
+        for line in output.splitlines():
+            checksum, _, path = line.partition("  ")
+            if path != "":
+                checksums[path] = checksum
+
+        missing = set(remote_paths) - set(checksums)
+        available = [path for path in remote_paths if path in checksums]
+
+        with tempfile.TemporaryDirectory(dir=self.data_dir) as staging:
+            if available:
+                quoted_paths = " ".join(shlex.quote(p) for p in available)
+                archive_cmd = self.host_command(
+                    hostname, f"cd ~ && tar czf - -- {quoted_paths}"
+                )
+                status, _ = await run_shell(
+                    f"set -o pipefail; {archive_cmd} | "
+                    f"tar xzf - -C {shlex.quote(staging)}",
+                    log_file,
+                )
+                if status != 0:
+                    raise RuntimeError(
+                        f"Failed to transfer artifacts from {hostname}"
+                    )
+
+            collected = []
+            nb_corrupted = 0
+            for local_name, remote_path in batch.items():
+                local_path = self.data_dir / local_name
+                if remote_path not in checksums:
+                    continue
+
+                # Tar strips the leading "/" from absolute paths.
+                staged_path = Path(staging) / remote_path.lstrip("/")
+                if (
+                    not staged_path.exists()
+                    or sha256_file(staged_path) != checksums[remote_path]
+                ):
+                    nb_corrupted += 1
+                    continue
+
+                local_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(staged_path), str(local_path))
+                collected.append(local_name)
+
+        # Files that are no longer on the host but are already in place were
+        # collected by a run that was interrupted before updating the
+        # manifest. Other missing files are lost and are not retried.
+        collected_paths = [batch[name] for name in collected]
+        nb_lost = 0
+        for local_name, remote_path in batch.items():
+            if remote_path in missing:
+                if not (self.data_dir / local_name).exists():
+                    nb_lost += 1
+                collected.append(local_name)
+
+        for local_name in collected:
+            del self.pending[hostname][local_name]
+
+        if collected_paths:
+            quoted_paths = " ".join(shlex.quote(p) for p in collected_paths)
+            await run_shell(
+                self.host_command(
+                    hostname, f"cd ~ && rm -f -- {quoted_paths}"
+                ),
+                log_file,
+            )
+
+        if nb_corrupted > 0 or nb_lost > 0:
+            raise RuntimeError(
+                f"{nb_corrupted} corrupted and {nb_lost} missing artifacts "
+                f"from {hostname}"
+            )
+
+        return len(collected) - nb_lost
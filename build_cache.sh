@@ -0,0 +1,86 @@
+#!/bin/bash
+# Skip build steps whose sources did not change since the last successful
+# build.
+#
+# May be sourced (to use `cached_build`) or executed directly, in which case
+# the arguments are the same as the ones for `cached_build`.
+#
+# Prints "build: <name> up to date" or "build: <name> rebuilt in <s>s" for
+# every step so that callers can report what was rebuilt.
+
+# Hash of the sources of a component and of the command used to build it
+# (including its definition, if it is a shell function). Build directories
+# are ignored. Files listed in BUILD_DEPS (separated by spaces) are also
+# hashed, e.g., the stamp of a library that the component links against.
+sources_hash() {
+    local src_dir=$1
+    shift
+    (
+        cd "$src_dir" || exit 1
+        find . -type f -not -path "*/build*/*" \( \
+            -name "*.c" -o -name "*.cc" -o -name "*.cpp" -o -name "*.h" \
+            -o -name "*.hpp" -o -name "*.py" -o -name "*.sh" \
+            -o -name "*.cmake" -o -name "CMakeLists.txt" \
+            -o -name "Makefile" -o -name "meson.build" \
+            -o -name "meson_options.txt" \) -print0 \
+            | sort -z | xargs -0 -r sha256sum
+        echo "$@"
+        declare -f "$1"
+        for dep in $BUILD_DEPS; do
+            echo "$dep"
+            cat "$dep" 2>/dev/null
+        done
+    ) | sha256sum | cut -d " " -f 1
+}
+
+# Usage: cached_build NAME SRC_DIR STAMP_FILE CMD [ARG ...]
+#   NAME: Name of the component, used in the output.
+#   SRC_DIR: Directory with the sources of the component.
+#   STAMP_FILE: File recording the hash of the last successful build. Place
+#     it in the build directory so that removing the build directory forces a
+#     rebuild.
+#   CMD: Command that builds the component. Runs from SRC_DIR.
+#
+# Set BUILD_DEPS to also rebuild the component when other files change.
+cached_build() {
+    local name=$1
+    local src_dir=$2
+    local stamp_file=$3
+    shift 3
+
+    local hash
+    hash=$(sources_hash "$src_dir" "$@")
+
+    if [ -f "$stamp_file" ] && [ "$(cat "$stamp_file")" = "$hash" ]; then
+        echo "build: $name up to date"
+        return 0
+    fi
+
+    local start_ns
+    start_ns=$(date +%s%N)
+
+    (cd "$src_dir" && "$@")
+    local status=$?
+
+    local elapsed_ms=$((($(date +%s%N) - start_ns) / 1000000))
+    local elapsed
+    elapsed=$(printf "%d.%03d" $((elapsed_ms / 1000)) $((elapsed_ms % 1000)))
+
+    if [ $status -ne 0 ]; then
+        echo "build: $name failed after ${elapsed}s"
+        rm -f "$stamp_file"
+        return $status
+    fi
+
+    mkdir -p "$(dirname "$stamp_file")"
+    echo "$hash" > "$stamp_file"
+    echo "build: $name rebuilt in ${elapsed}s"
+}
+
+if [ "${BASH_SOURCE[0]}" = "$0" ]; then
+    if [ $# -lt 4 ]; then
+        echo "Usage: $0 NAME SRC_DIR STAMP_FILE CMD [ARG ...]"
+        exit 1
+    fi
+    cached_build "$@"
+fi
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Concurrent control of the commands that run during a measurement.
+
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, Optional, TextIO, TypeVar, Union
+
+# How long each command waits for new output before checking if it exited
+# (in seconds).
+POLL_INTERVAL = 0.1
+
+T = TypeVar("T")
+
+
+class CommandFailed(RuntimeError):
+    """A command stopped while the measurement still depended on it."""
+
+
+class StreamedCommand:
+    """Command whose output is collected in the background.
+
+    Attributes:
+        name: Name used in the error messages (e.g., "DUT").
+        command: Running command (any command returned by `run_command`).
+        log_file: Where to log the output of the command.
+        output: Output received so far.
+        exit_status: Exit status, once the command exited.
+    """
+
+    def __init__(
+        self, name: str, command: Any, log_file: Union[bool, TextIO]
+    ) -> None:
+        self.name = name
+        self.command = command
+        self.log_file = log_file
+        self.output = ""
+        self.exit_status: Optional[int] = None
+
+    def poll(self) -> tuple[str, bool]:
+        """Wait up to `POLL_INTERVAL` for new output.
+
+        Runs in a worker thread, since the commands only offer a blocking
+        interface.
+
+        Returns:
+            New output and whether the command exited.
+        """
+        start_time = time.time()
+        output = self.command.watch(
+            timeout=POLL_INTERVAL,
+            stdout=self.log_file,
+            stderr=self.log_file,
+        )
+        exited = self.command.exit_status_ready()
+        if exited:
+            self.exit_status = self.command.recv_exit_status()
+        elif output == "":
+            # Some commands return right away when there is no output.
+            time.sleep(max(POLL_INTERVAL - (time.time() - start_time), 0))
+        return output, exited
+
+
+class CommandMonitor:
+    """Streams the output of all the commands of a measurement concurrently.
+
+    Every command added to the monitor must keep running until the monitor is
+    closed. If one of them exits earlier, the monitor records the failure and
+    everything waiting on the monitor (`wait_for` and `run`) raises
+    `CommandFailed` right away, instead of waiting for its own timeout.
+
+    Commands must not be watched by anyone else while they are in the
+    monitor. The monitor stops watching them when it is closed, after which
+    they can be stopped as usual.
+
+    Example:
+        async with CommandMonitor() as monitor:
+            monitor.add("DUT", dut_cmd, log_file)
+            await monitor.wait_for("DUT", "ready", timeout=60)
+            await monitor.run(asyncio.to_thread(measure))
+    """
+
+    def __init__(self) -> None:
+        self.commands: dict[str, StreamedCommand] = {}
+        self.tasks: list[asyncio.Task] = []
+        self.updated = asyncio.Condition()
+        self.failure: Optional[str] = None
+        self.closing = False
+
+    def add(
+        self, name: str, command: Any, log_file: Union[bool, TextIO] = False
+    ) -> StreamedCommand:
+        """Start streaming the output of a running command."""
+        if name in self.commands:
+            raise ValueError(f"Command {name} already in the monitor")
+
+        streamed_command = StreamedCommand(name, command, log_file)
+        self.commands[name] = streamed_command
+        self.tasks.append(asyncio.create_task(self._stream(streamed_command)))
+        return streamed_command
+
+    async def _stream(self, streamed_command: StreamedCommand) -> None:
+        while not self.closing:
+            output, exited = await asyncio.to_thread(streamed_command.poll)
+
+            async with self.updated:
+                streamed_command.output += output
+                if exited and not self.closing and self.failure is None:
+                    self.failure = (
+                        f"{streamed_command.name} exited with status "
+                        f"{streamed_command.exit_status}"
+                    )
+                self.updated.notify_all()
+
+            if exited:
+                return
+
+    async def _wait_until(
+        self, predicate: Callable[[], bool], timeout: Optional[float]
+    ) -> None:
+        async with self.updated:
+            await asyncio.wait_for(
+                self.updated.wait_for(
+                    lambda: self.failure is not None or predicate()
+                ),
+                timeout,
+            )
+        if self.failure is not None:
+            raise CommandFailed(self.failure)
+
+    async def wait_for(
+        self, name: str, pattern: str, timeout: Optional[float] = None
+    ) -> None:
+        """Wait until the output of a command matches `pattern`.
+
+        Args:
+            name: Name of the command.
+            pattern: Regular expression to look for in the output.
+            timeout: Maximum time to wait (in seconds).
+
+        Raises:
+            CommandFailed: If any command exited or if the pattern did not
+              show up within `timeout`.
+        """
+        streamed_command = self.commands[name]
+        try:
+            await self._wait_until(
+                lambda: re.search(pattern, streamed_command.output)
+                is not None,
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            raise CommandFailed(
+                f'{name} did not print "{pattern}" within {timeout}s'
+            )
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Run `awaitable` while watching the commands.
+
+        Raises:
+            CommandFailed: If any command exited before `awaitable` finished.
+              `awaitable` is cancelled. Note that work running in a thread
+              (e.g., with `asyncio.to_thread`) cannot be interrupted and
+              keeps running in the background.
+        """
+        task = asyncio.ensure_future(awaitable)
+        failure = asyncio.ensure_future(self._wait_until(lambda: False, None))
+
+        await asyncio.wait(
+            [task, failure], return_when=asyncio.FIRST_COMPLETED
+        )
+
+        if task.done():
+            failure.cancel()
+            return task.result()
+
+        task.cancel()
+        return failure.result()  # Raises CommandFailed.
+
+    async def close(self) -> None:
+        """Stop streaming the output of the commands."""
+        self.closing = True
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+
+    async def __aenter__(self) -> "CommandMonitor":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
@@ -19,6 +19,8 @@
 #include <stdint.h>
 #include <stdio.h>
 
+#include <atomic>
+
 // Uncomment to disable TX path.
 // #define DISABLE_TX
 
@@ -100,6 +102,10 @@ static int parse_args(int argc, char** argv,
 }
 
 volatile bool quit;
+
+// Number of cores that started polling. The last one to start tells the
+// experiment scripts that the DUT is ready to receive packets.
+static std::atomic<uint32_t> nb_polling_cores{0};
 static uint32_t q_per_core;
 static uint32_t nb_cycles;
 
@@ -241,6 +247,11 @@ static int lcore_work(void* arg) {
 
   printf("Starting core %u with first queue %u\n", lcore_id, first_queue);
 
+  if (++nb_polling_cores == rte_lcore_count()) {
+    printf("DUT ready (%u cores polling)\n", rte_lcore_count());
+    fflush(stdout);
+  }
+
   /* Run until the application is quit or killed. */
   while (!quit) {
     for (uint32_t q_offset = 0; q_offset < nb_queues; ++q_offset) {
@@ -26,30 +26,33 @@ echo performance | sudo tee /sys/devices/system/cpu/cpu7/cpufreq/scaling_governo
 # Disable NMI watchdog.
 echo 0 | sudo tee /proc/sys/kernel/nmi_watchdog
 
+source $SCRIPT_DIR/build_cache.sh
+
+cmake_build() {
+    mkdir -p build_release
+    cd build_release
+    cmake -DCMAKE_BUILD_TYPE=Release -D CMAKE_C_COMPILER=gcc-9 -D CMAKE_CXX_COMPILER=g++-9 .. && make
+}
+
+# Components are only rebuilt if their sources changed since the last build.
+
 # DDIO Bench.
-cd $SCRIPT_DIR/tools/ddio-bench
-make
+cached_build ddio-bench $SCRIPT_DIR/tools/ddio-bench \
+    $SCRIPT_DIR/tools/ddio-bench/.build_stamp make
 
-# Maglev.
-cd $SCRIPT_DIR/maglev
-mkdir -p build_release
-cd build_release
-cmake -DCMAKE_BUILD_TYPE=Release -D CMAKE_C_COMPILER=gcc-9 -D CMAKE_CXX_COMPILER=g++-9 ..
-make
+# Maglev. Links against the installed Ensō library, so it is also rebuilt
+# whenever Ensō is.
+BUILD_DEPS=$SCRIPT_DIR/enso/build/.setup_stamp \
+    cached_build maglev $SCRIPT_DIR/maglev \
+    $SCRIPT_DIR/maglev/build_release/.build_stamp cmake_build
 
 # Log monitor.
-cd $SCRIPT_DIR/log_monitor
-mkdir -p build_release
-cd build_release
-cmake -DCMAKE_BUILD_TYPE=Release -D CMAKE_C_COMPILER=gcc-9 -D CMAKE_CXX_COMPILER=g++-9 ..
-make
+cached_build log_monitor $SCRIPT_DIR/log_monitor \
+    $SCRIPT_DIR/log_monitor/build_release/.build_stamp cmake_build
 
 # DPDK Echo
-cd $SCRIPT_DIR/dpdk_echo
-mkdir -p build_release
-cd build_release
-cmake -DCMAKE_BUILD_TYPE=Release -D CMAKE_C_COMPILER=gcc-9 -D CMAKE_CXX_COMPILER=g++-9 ..
-make
+cached_build dpdk_echo $SCRIPT_DIR/dpdk_echo \
+    $SCRIPT_DIR/dpdk_echo/build_release/.build_stamp cmake_build
 
 # Bind E810 to DPDK.
 sudo modprobe uio_pci_generic
@@ -1,15 +1,26 @@
 #!/usr/bin/env python3
 
 import asyncio
+import concurrent.futures
+import csv
 import itertools
-import subprocess
+import json
+import math
+import shutil
+import statistics
 import sys
-import tempfile
 import time
 
-from collections import defaultdict
 from pathlib import Path
-from typing import Any, Optional, TextIO, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Hashable,
+    Optional,
+    TextIO,
+    Union,
+)
 
 import click
 
@@ -18,145 +29,349 @@ from rich.live import Live
 from rich.progress import (
     BarColumn,
     Progress,
+    TaskID,
     TextColumn,
     TimeElapsedColumn,
     TimeRemainingColumn,
 )
 
 from netexp.helpers import (
-    set_host_clock,
     download_file,
     LocalHost,
     RemoteHost,
-    get_host_from_hostname,
 )
 from netexp.pktgen.dpdk import DpdkConfig
-from netexp.throughput import zero_loss_throughput
 
 from enso.ensogen import EnsoGen
 from enso.enso_nic import EnsoNic
 
+from artifact_collector import ArtifactCollector
+from command_stream import CommandFailed, CommandMonitor
+from hist_summary import read_histogram, summarize, summary_path
+from host_pool import host_pool
+from host_state import (
+    HostState,
+    get_host_state,
+    host_states,
+    restore_host_defaults,
+)
+from iteration_stopping import AdaptiveIterations, min_samples
+from load_refinement import LoadRefinement
+from remote_agent import AgentError, AgentHost, write_log
+from repo_sync import build_manifest, sync_remote_repo
+from results_store import PointConfig, ResultsStore, ThroughputConfig
 from set_constants import set_constants
+from sweep_planner import plan_sweep
+from throughput_search import ThroughputSearch, is_ensogen_error
+
+if TYPE_CHECKING:
+    from sim_testbed import SimTestbed
 
 console = Console()
 
 if sys.version_info < (3, 9, 0):
     raise RuntimeError("Python 3.9 or a more recent version is required.")
 
+# Estimated time (in seconds) for each kind of DUT reconfiguration. Used to
+# plan the order in which experiment points run.
+SET_CLOCK_COST = 0.5  # One remote command for all cores.
+CLOCK_SETTLE_COST = 0.5  # Until measured, see `HostState.clock_settle_times`.
+DDIO_COST = 1  # One remote command (change-ddio and wrmsr).
+FALLBACK_QUEUES_COST = 1
+DESC_PER_PKT_COST = 1
+
+# Printed by the DUT applications in this repo once all their cores are
+# polling (see `dpdk_echo` and `maglev`).
+DUT_READY_MARKER = "DUT ready"
+
+# Maximum time to wait for a DUT to answer probe packets (in seconds).
+READY_PROBE_TIMEOUT = 30
+
+# Maximum time to wait for a DUT to print its ready pattern during a
+# measurement (in seconds).
+DUT_READY_TIMEOUT = 60
+
+# Time between samples of the CPU utilization and frequency of the DUT cores
+# taken during every measurement (in seconds). Only sampled when running
+# commands through an agent (see `remote_agent.Sampler`).
+CPU_SAMPLE_INTERVAL = 0.5
+
+# Cache events counted by `CacheProfileExperiment` (see `perf list`).
+CACHE_EVENTS = [
+    "L1-dcache-loads",
+    "L1-dcache-load-misses",
+    "l2_rqsts.references",
+    "l2_rqsts.miss",
+    "LLC-loads",
+    "LLC-load-misses",
+]
+
+# p99 RTT measured at a load and whether EnsōGen lost packets.
+LoadResult = tuple[float, bool]
+
 
 async def update_remote_repos(
     hostname_paths: dict[str, str], hostname_logs: dict[str, TextIO]
 ) -> None:
-    """Run rsync to update the remote repos."""
+    """Sync the local repo to the remote repos.
+
+    Only files that changed since the last sync to each host are
+    transferred (see `repo_sync.py`). Hosts are synced in parallel.
+    """
     local_enso_eval_path = Path(__file__).resolve().parent
+    local_manifest = await asyncio.to_thread(
+        build_manifest, local_enso_eval_path
+    )
 
-    # Run git ls-files --exclude-standard -oi --directory to get the list of
-    # files to exclude and save it to a temporary file.
-    excluded_files = tempfile.NamedTemporaryFile()
-    get_ignore_files_cmd = [
-        "git",
-        "ls-files",
-        "--exclude-standard",
-        "-oi",
-        "--directory",
-    ]
+    async def update_remote_repo(hostname: str, path: str) -> None:
+        nb_files = await sync_remote_repo(
+            hostname,
+            path,
+            local_enso_eval_path,
+            local_manifest,
+            hostname_logs[hostname],
+        )
+        if nb_files == 0:
+            console.log(f"[green]{hostname} repo is up to date")
+        else:
+            console.log(f"[green]Synced {nb_files} files to {hostname}")
 
-    subprocess.run(
-        get_ignore_files_cmd,
-        stdout=excluded_files,
-        stderr=subprocess.DEVNULL,
-        cwd=local_enso_eval_path,
-    )
-    subprocess.run(
-        get_ignore_files_cmd,
-        stdout=excluded_files,
-        stderr=subprocess.DEVNULL,
-        cwd=local_enso_eval_path / "enso",
+    await asyncio.gather(
+        *(
+            update_remote_repo(hostname, path)
+            for hostname, path in hostname_paths.items()
+        )
     )
 
-    # Also ignore .git.
-    excluded_files.write(b".git\n")
-    excluded_files.write(b"enso/.git\n")
-    excluded_files.flush()
 
-    async def update_remote_repo(
-        hostname: str, path: str, log: TextIO, excluded_files_name: str
-    ) -> None:
-        """Update a remote repo."""
-
-        # Create path on remote host if it does not exist.
-        host = get_host_from_hostname(hostname)
-        host.run_command(f"mkdir -p {path}", print_command=log)
-
-        rsync_cmd = [
-            "rsync",
-            "-rlptzv",
-            "--progress",
-            "--exclude-from",
-            excluded_files_name,
-            f"{local_enso_eval_path}/",
-            f"{hostname}:{path}",
-        ]
+def log_build_report(hostname: str, output: str) -> None:
+    """Log the build steps reported by `build_cache.sh`."""
+    for line in output.splitlines():
+        if line.startswith("build: "):
+            console.log(f"[cyan]{hostname} {line.removeprefix('build: ')}")
 
-        subprocess.run(rsync_cmd, stdout=log, stderr=log)
 
-        bitstream_path = "enso/scripts/alt_ehipc2_hw.sof"
+async def setup_remote_repos(
+    hostname_paths: dict[str, str], hostname_logs: dict[str, TextIO]
+) -> None:
+    """Run setup script in the remote repos.
 
-        # Also sync the bitstream.
-        rsync_cmd = [
-            "rsync",
-            "-rlptzv",
-            "--progress",
-            f"{local_enso_eval_path}/{bitstream_path}",
-            f"{hostname}:{path}/{bitstream_path}",
-        ]
-        subprocess.run(rsync_cmd, stdout=log, stderr=log)
-
-    update_tasks = []
-    for hostname, path in hostname_paths.items():
-        update_tasks.append(
-            asyncio.create_task(
-                update_remote_repo(
-                    hostname,
-                    path,
-                    hostname_logs[hostname],
-                    excluded_files.name,
-                )
+    Setup is skipped on hosts where the enso sources did not change since the
+    last successful setup (see `build_cache.sh`).
+    """
+
+    def run_setup(hostname: str, path: str, log: TextIO) -> None:
+        host = get_host(hostname)
+        host_setup = host.run_command(
+            (
+                f"{path}/build_cache.sh enso {path}/enso "
+                f"{path}/enso/build/.setup_stamp {path}/enso/setup.sh"
+            ),
+            source_bashrc=True,
+        )
+        output = host_setup.watch(stdout=log, stderr=log)
+        if host_setup.recv_exit_status() != 0:
+            raise RuntimeError(f"{hostname} setup failed.")
+        log_build_report(hostname, output)
+
+    await asyncio.gather(
+        *(
+            asyncio.to_thread(
+                run_setup, hostname, path, hostname_logs[hostname]
             )
+            for hostname, path in hostname_paths.items()
         )
+    )
 
-    for task in update_tasks:
-        await task
 
-    del excluded_files
+def get_host(hostname: str) -> Union[LocalHost, RemoteHost]:
+    return host_pool.get(hostname)
 
 
-async def setup_remote_repos(
-    hostname_paths: dict[str, str], hostname_logs: dict[str, TextIO]
+def fetch_file(
+    hostname: str,
+    remote_path: str,
+    local_path: str,
+    log_file: Union[bool, TextIO] = False,
 ) -> None:
-    """Run setup script in the remote repos."""
+    """Copy a file from a host, which may be the local host."""
+    host = host_pool.get(hostname).host
+    if isinstance(host, AgentHost):
+        with open(local_path, "wb") as f:
+            f.write(host.read_file(remote_path))
+    elif hostname == "localhost":
+        shutil.copyfile(remote_path, local_path)
+    else:
+        download_file(hostname, remote_path, local_path, log_file=log_file)
 
-    async def run_setup(hostname: str, path: str, log: TextIO) -> None:
-        host = get_host_from_hostname(hostname)
-        host_setup = host.run_command(
-            f"{path}/enso/setup.sh", source_bashrc=True
+
+def cpu_samples_path(save_file_name: Path) -> Path:
+    """Where the CPU samples of a measurement are saved."""
+    return save_file_name.with_suffix(".cpu.csv")
+
+
+def save_cpu_samples(
+    path: Path, columns: list[str], samples: list[tuple[float, ...]]
+) -> None:
+    """Save the samples taken by `AgentHost.stop_sampling` as CSV."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(samples)
+
+
+def collect_artifacts(
+    collector: ArtifactCollector, log_file: Union[bool, TextIO] = False
+) -> None:
+    """Collect the pending artifacts, only logging failures since the
+    artifacts remain pending for the next collection."""
+    if collector.nb_pending() == 0:
+        return
+
+    start_time = time.time()
+    try:
+        nb_collected = collector.collect(log_file=log_file)
+    except RuntimeError as e:
+        console.log(f"[orange1]Failed to collect artifacts: {e}")
+        return
+
+    console.log(
+        f"[cyan]Collected {nb_collected} artifacts in "
+        f"{time.time() - start_time:.1f}s"
+    )
+
+
+def run_to_completion(
+    host: Union[LocalHost, RemoteHost],
+    command: str,
+    log_file: Union[bool, TextIO] = False,
+) -> tuple[str, int]:
+    """Run a command on a host and wait until it finishes.
+
+    Takes a single round trip on hosts that run an agent.
+
+    Returns:
+        Output and exit status of the command.
+    """
+    agent_host = getattr(host, "host", host)
+    if isinstance(agent_host, AgentHost):
+        [(output, status)], _ = agent_host.run(
+            [command], print_command=log_file
         )
-        host_setup.watch(stdout=log, stderr=log)
-        if host_setup.recv_exit_status() != 0:
-            raise RuntimeError(f"{hostname} setup failed.")
+        write_log(log_file, output)
+        return output, status
+
+    cmd = host.run_command(command, print_command=log_file)
+    output = cmd.watch(stdout=log_file, stderr=log_file)
+    return output, cmd.recv_exit_status()
+
+
+def set_cores_clock_command(
+    clock: int, cores: list[int], config: dict[str, Any], timeout: float = 10
+) -> str:
+    """Command that sets the CPU frequency of multiple cores (see
+    `set_cores_clock`)."""
+    cores_str = " ".join(str(core) for core in cores)
+    return (
+        f"{config['paths']['set_clock_cmd']} {clock} {int(timeout * 1000)} "
+        f"{cores_str}"
+    )
 
-        del host
 
-    setup_tasks = []
-    for hostname, path in hostname_paths.items():
-        setup_tasks.append(
-            asyncio.create_task(
-                run_setup(hostname, path, hostname_logs[hostname])
-            )
+def check_cores_clock(
+    clock: int,
+    cores: list[int],
+    output: str,
+    status: int,
+    timeout: float = 10,
+) -> float:
+    """Check the result of `set_cores_clock_command`.
+
+    Returns:
+        Time it took for the frequency to settle (in seconds).
+    """
+    # Frequency was set but did not settle before the timeout.
+    if status == 2:
+        console.log(
+            f"[orange1]Clock {clock} did not settle after {timeout}s on cores "
+            f"{cores}"
         )
+        return timeout
+
+    if status != 0:
+        raise RuntimeError(f'Could not set clock "{clock}" for cores {cores}')
+
+    settle_ms = int(output.split("settle_ms:")[-1].strip())
+
+    return settle_ms / 1000
+
+
+def set_cores_clock(
+    host: Union[LocalHost, RemoteHost],
+    clock: int,
+    cores: list[int],
+    config: dict[str, Any],
+    timeout: float = 10,
+    log_file: Union[bool, TextIO] = False,
+) -> float:
+    """Set the CPU frequency of multiple cores with a single remote command.
+
+    Unlike `set_host_clock`, which runs a few commands per core, this programs
+    all cores at once and then waits until all of them report a stable
+    frequency.
+
+    Args:
+        host: Host to set the clock frequency for.
+        clock: CPU frequency to be set (in kHz). If `0` set frequency to
+          maximum supported by the cores.
+        cores: List of cores to set the frequency to.
+        config: Experiment configuration.
+        timeout: Maximum time to wait for the frequency to settle (in
+          seconds).
+
+    Returns:
+        Time it took for the frequency to settle (in seconds).
+    """
+    output, status = run_to_completion(
+        host,
+        set_cores_clock_command(clock, cores, config, timeout),
+        log_file=log_file,
+    )
+    return check_cores_clock(clock, cores, output, status, timeout)
+
+
+def set_ddio_ways_command(
+    device_bus: str,
+    nb_ways: int,
+    total_nb_ways: int,
+    config: dict[str, Any],
+) -> str:
+    """Command that sets the number of DDIO ways (see `set_ddio_ways`)."""
+    assert 0 <= nb_ways <= total_nb_ways
+
+    enable_ddio = int(nb_ways > 0)
+    device_bus = device_bus.split("0x")[-1]
+
+    command = (
+        f"{config['paths']['change_ddio_cmd']} 0x{device_bus} {enable_ddio}"
+    )
 
-    for task in setup_tasks:
-        await task
+    if nb_ways > 0:
+        full_mask = (1 << total_nb_ways) - 1
+        ddio_mask = (full_mask << (total_nb_ways - nb_ways)) & full_mask
+        command += f" && sudo wrmsr 0xc8b {hex(ddio_mask)}"
+
+    return command
+
+
+def check_ddio_ways(device_bus: str, nb_ways: int, status: int) -> None:
+    """Check the exit status of `set_ddio_ways_command`."""
+    if status != 0:
+        device_bus = device_bus.split("0x")[-1]
+        raise RuntimeError(
+            f'Could not change the number of DDIO ways for bus "{device_bus}" '
+            f"to {nb_ways}"
+        )
 
 
 def set_ddio_ways(
@@ -169,47 +384,60 @@ def set_ddio_ways(
 ) -> None:
     """Set the number of ways for the DDIO on a remote host.
 
+    Enabling DDIO and setting the number of ways run as a single remote
+    command.
+
     Args:
-        ssh_client: SSH connection to the remote host.
+        host: Host to set the DDIO ways for.
         device_bus: PCI bus of the device (in hex).
         nb_ways: The number of DDIO ways to set (set to 0 to disable DDIO).
         total_nb_ways: The total number of DDIO ways on the remote host.
     """
-    assert 0 <= nb_ways <= total_nb_ways
+    command = set_ddio_ways_command(device_bus, nb_ways, total_nb_ways, config)
+    _, status = run_to_completion(host, command, log_file=log_file)
+    check_ddio_ways(device_bus, nb_ways, status)
 
-    enable_ddio = int(nb_ways > 0)
-    device_bus = device_bus.split("0x")[-1]
 
-    cmd = host.run_command(
-        f"{config['paths']['change_ddio_cmd']} 0x{device_bus} {enable_ddio}",
-        print_command=log_file,
-    )
-    cmd.watch(stdout=log_file, stderr=log_file)
-    status = cmd.recv_exit_status()
-    if status != 0:
-        raise RuntimeError(f'Could not change DDIO for bus "{device_bus}"')
+class EnsoGenProbe:
+    """Check if the DUT is ready by sending it a few packets with EnsoGen.
 
-    if nb_ways == 0:
-        return
+    Meant for DUT applications that do not signal when they are ready.
 
-    if nb_ways > total_nb_ways:
-        raise ValueError(
-            f"Cannot set number of ways to {nb_ways}, only "
-            f"{total_nb_ways} available"
-        )
+    Args:
+        pktgen: EnsoGen instance connected to the DUT.
+        nb_pkts: Number of packets to send in every probe.
+        throughput: Rate to send the probe packets at (in bps).
+    """
 
-    full_mask = (1 << total_nb_ways) - 1
-    ddio_mask = (full_mask << (total_nb_ways - nb_ways)) & full_mask
+    def __init__(
+        self,
+        pktgen: EnsoGen,
+        nb_pkts: int = 1000,
+        throughput: float = 1_000_000_000,
+    ) -> None:
+        self.pktgen = pktgen
+        self.nb_pkts = nb_pkts
+        self.throughput = throughput
 
-    cmd = host.run_command(f"sudo wrmsr 0xc8b {hex(ddio_mask)}")
-    cmd.watch(stdout=log_file, stderr=log_file)
+    def __call__(self) -> bool:
+        """Return True if all probe packets came back."""
+        self.pktgen.clean_stats()
+        self.pktgen.start(self.throughput, self.nb_pkts)
+        try:
+            self.pktgen.wait_transmission_done()
+        except RuntimeError as e:
+            if not is_ensogen_error(e):
+                raise
 
-    status = cmd.recv_exit_status()
+        ready = self.pktgen.get_nb_rx_pkts() >= self.nb_pkts
+        self.pktgen.clean_stats()
+
+        return ready
 
-    if status != 0:
-        raise RuntimeError(
-            f"Could not change the number of DDIO ways to {nb_ways}"
-        )
+
+# Command that changes a setting of the DUT host and the function that checks
+# its output and exit status once it ran.
+SetupCommand = tuple[str, Callable[[str, int], None]]
 
 
 class Dut:
@@ -234,6 +462,22 @@ class Dut:
     def wait_stop(self) -> None:
         raise NotImplementedError
 
+    def reconfiguration_cost(
+        self, current: Optional[dict[str, Any]], target: dict[str, Any]
+    ) -> float:
+        """Estimate the time to reconfigure the DUT between two points.
+
+        Args:
+            current: Parameters of the point that ran last (None if no point
+              ran yet).
+            target: Parameters of the next point (e.g., `nb_cores`,
+              `cpu_clock`, `ddio_ways`).
+
+        Returns:
+            Estimated reconfiguration time (in seconds).
+        """
+        return 0.0
+
     def zero_loss_throughput(
         self,
         pktgen: EnsoGen,
@@ -241,7 +485,23 @@ class Dut:
         max_throughput: int = 100_000_000_000,
         precision: int = 100_000_000,
         warmup_duration: int = 5,  # seconds.
+        seed: Optional[tuple[float, float]] = None,
+        **search_args: Any,
     ) -> int:
+        """Find the zero-loss throughput for the running DUT.
+
+        Args:
+            pktgen: Packet generator used to send traffic to the DUT.
+            pkt_size: Packet size (in bytes).
+            max_throughput: Maximum throughput to probe (in bps).
+            precision: Precision of the search (in bps).
+            warmup_duration: Duration of the warmup (in seconds).
+            seed: Optional bracket (low, high) where the zero-loss throughput
+              is expected to be. The search falls back to the full range if
+              the bracket turns out to be wrong.
+            **search_args: Extra arguments for `ThroughputSearch` (e.g.,
+              `loss_tolerance` or `adaptive_duration`).
+        """
         self.wait_ready()
 
         # Warmup.
@@ -251,18 +511,23 @@ class Dut:
             pktgen.start(max_throughput, nb_pkts)
             pktgen.wait_transmission_done()
 
-        throughput = zero_loss_throughput(
+        search = ThroughputSearch(
             pktgen,
             pkt_size,
             max_throughput=max_throughput,
             precision=precision,
             target_duration=1,
             log_file=pktgen.log_file,
+            **search_args,
         )
-        return throughput
+        return search.find(seed)
 
 
 class MultiCoreDut(Dut):
+    # Printed by the DUT application once it is ready (see `wait_ready`).
+    ready_pattern = DUT_READY_MARKER
+    ready_probe: Optional[Callable[[], bool]] = None
+
     def __init__(
         self,
         cpu_clock: int,
@@ -274,8 +539,6 @@ class MultiCoreDut(Dut):
     ) -> None:
         super().__init__(config=config, **kwargs)
 
-        self.core_clocks = {}
-        self.last_ddio_setting = {}
         self.cpu_clock = cpu_clock
         self.pcie_device_addr = pcie_device_addr
 
@@ -315,39 +578,182 @@ class MultiCoreDut(Dut):
     def get_hostname(self) -> str:
         raise NotImplementedError
 
-    def apply_clock_to_cores(self, nb_cores: int) -> None:
-        wait_for_clock = False
+    def reconfiguration_cost(
+        self, current: Optional[dict[str, Any]], target: dict[str, Any]
+    ) -> float:
+        cost = super().reconfiguration_cost(current, target)
+        current = current or {}
 
-        for i in range(nb_cores):
-            if self.core_clocks.get(i, None) != self.cpu_clock:
-                set_host_clock(self.host, self.cpu_clock, [i])
-                self.core_clocks[i] = self.cpu_clock
-                wait_for_clock = True
+        nb_cores = target.get("nb_cores", 1)
+        cpu_clock = target.get("cpu_clock", self.cpu_clock)
+        if current.get("cpu_clock") != cpu_clock:
+            nb_clock_changes = nb_cores
+        else:
+            nb_clock_changes = max(nb_cores - current.get("nb_cores", 0), 0)
 
-        # HACK(sadok): For some unknown reason running a command right after
-        # setting the clock leads to a slight a performance degradation.
-        if wait_for_clock:
-            time.sleep(5)
+        if nb_clock_changes > 0:
+            settle_times = self.host_state.clock_settle_times
+            if settle_times:
+                cost += SET_CLOCK_COST + statistics.median(settle_times)
+            else:
+                cost += SET_CLOCK_COST + CLOCK_SETTLE_COST
 
-    def apply_ddio_ways(self) -> None:
+        ddio_ways = target.get("ddio_ways", self.nb_ddio_ways)
+        if current.get("ddio_ways", self.nb_ddio_ways) != ddio_ways:
+            cost += DDIO_COST
+
+        return cost
+
+    @property
+    def host_state(self) -> HostState:
+        return get_host_state(self.get_hostname())
+
+    def clock_setup(self, nb_cores: int) -> list[SetupCommand]:
+        """Commands that set the clock of the first `nb_cores` cores, if any
+        of them runs at a different clock."""
+        host_state = self.host_state
+
+        cores = [
+            i
+            for i in range(nb_cores)
+            if host_state.core_clocks.get(i, None) != self.cpu_clock
+        ]
+        if len(cores) == 0:
+            return []
+
+        cpu_clock = self.cpu_clock
+        host = self.host
+        config = self.config
+        log_file = self.log_file
+
+        def restore_clocks() -> None:
+            # Set clocks back to maximum.
+            set_cores_clock(
+                host,
+                0,
+                list(host_state.core_clocks),
+                config=config,
+                log_file=log_file,
+            )
+
+        def done(output: str, status: int) -> None:
+            settle_time = check_cores_clock(cpu_clock, cores, output, status)
+            host_state.clock_settle_times.append(settle_time)
+
+            for i in cores:
+                host_state.core_clocks[i] = cpu_clock
+
+            host_state.set_restore("core_clocks", restore_clocks)
+
+        # Running a command right after setting the clock used to lead to a
+        # slight performance degradation, so the command waits until the
+        # cores report a stable frequency.
+        command = set_cores_clock_command(cpu_clock, cores, config)
+        return [(command, done)]
+
+    def apply_clock_to_cores(self, nb_cores: int) -> None:
+        self.run_setup(self.clock_setup(nb_cores))
+
+    def ddio_setup(self) -> list[SetupCommand]:
+        """Commands that set the number of DDIO ways, if it changed."""
         # This should work for 0000:17:00.0 and 17:00.0 formats.
         device_bus = self.pcie_device_addr.split(":")[-2]
+        host_state = self.host_state
+        nb_ddio_ways = self.nb_ddio_ways
+
+        if host_state.ddio_ways.get(device_bus, None) == nb_ddio_ways:
+            return []
+
+        host = self.host
+        setting = f"ddio_ways_{device_bus}"
+        default_nb_ddio_ways = self.config["extra"]["default_nb_ddio_ways"]
+
+        def restore_ddio_ways() -> None:
+            set_ddio_ways(
+                host,
+                device_bus,
+                default_nb_ddio_ways,
+                self.nb_llc_ways,
+                config=self.config,
+                log_file=self.log_file,
+            )
 
-        if self.last_ddio_setting.get(device_bus, None) == self.nb_ddio_ways:
-            return
+        def done(output: str, status: int) -> None:
+            check_ddio_ways(device_bus, nb_ddio_ways, status)
+            host_state.ddio_ways[device_bus] = nb_ddio_ways
 
-        set_ddio_ways(
-            self.host,
-            device_bus,
-            self.nb_ddio_ways,
-            self.nb_llc_ways,
-            config=self.config,
-            log_file=self.log_file,
+            if nb_ddio_ways == default_nb_ddio_ways:
+                host_state.set_restore(setting, None)
+            else:
+                host_state.set_restore(setting, restore_ddio_ways)
+
+        command = set_ddio_ways_command(
+            device_bus, nb_ddio_ways, self.nb_llc_ways, self.config
         )
-        self.last_ddio_setting[device_bus] = self.nb_ddio_ways
+        return [(command, done)]
+
+    def apply_ddio_ways(self) -> None:
+        self.run_setup(self.ddio_setup())
+
+    def run_setup(self, setup: list[SetupCommand]) -> None:
+        """Run setup commands in order."""
+        for command, done in setup:
+            done(*run_to_completion(self.host, command, self.log_file))
+
+    def start_app(self, command: str, setup: list[SetupCommand]) -> Any:
+        """Run setup commands and then start the DUT application.
+
+        On hosts that run an agent, the setup commands and the application
+        start in a single round trip. The application is stopped if any of
+        the setup commands failed.
+
+        Returns:
+            The running application.
+        """
+        agent_host = self.host.host
+        if not isinstance(agent_host, AgentHost):
+            self.run_setup(setup)
+            return self.host.run_command(
+                command, pty=True, print_command=self.log_file
+            )
+
+        results, sw_instance = agent_host.run(
+            [setup_command for setup_command, _ in setup],
+            start=command,
+            pty=True,
+            print_command=self.log_file,
+        )
+        try:
+            for (_, done), (output, status) in zip(setup, results):
+                write_log(self.log_file, output)
+                done(output, status)
+        except BaseException:
+            self.stop_app(sw_instance, self.log_file)
+            raise
+
+        return sw_instance
+
+    def stop_app(
+        self, sw_instance: Any, log_file: Union[bool, TextIO]
+    ) -> None:
+        """Stop the DUT application with Ctrl+C and wait until it exits.
+
+        Takes a single round trip on hosts that run an agent.
+        """
+        agent_host = self.host.host
+        if isinstance(agent_host, AgentHost):
+            write_log(log_file, agent_host.stop(sw_instance))
+            return
+
+        sw_instance.send(b"\x03")  # Ctrl+C.
+        sw_instance.watch(stdout=log_file, stderr=log_file)
 
 
 class EnsoEchoDut(MultiCoreDut):
+    # The echo application (in the enso repo) does not signal when it is
+    # ready, so we wait for its first stats line.
+    ready_pattern = "Mbps"
+
     def __init__(
         self,
         nic: EnsoNic,
@@ -358,11 +764,13 @@ class EnsoEchoDut(MultiCoreDut):
         many_dsc_queues: bool = False,
         verbose: bool = False,
         cmd: Optional[str] = None,
+        ready_probe: Optional[Callable[[], bool]] = None,
         **kwargs: Any,
     ) -> None:
         super().__init__(cpu_clock, pcie_device_addr, config=config, **kwargs)
 
         self.nic = nic
+        self.ready_probe = ready_probe
         self.notif_per_pkt = notif_per_pkt
         self.many_dsc_queues = many_dsc_queues
         self.verbose = verbose
@@ -378,16 +786,10 @@ class EnsoEchoDut(MultiCoreDut):
         if self.sw_instance is not None:
             raise RuntimeError("Program already running")
 
-        if self.notif_per_pkt:
-            self.nic.enable_desc_per_pkt()
-
-        self.apply_clock_to_cores(nb_cores)
-        self.apply_ddio_ways()
-
-        self.sw_instance = self.nic.host.run_command(
+        self.apply_nic_modes()
+        self.sw_instance = self.start_app(
             f"{self.cmd} {nb_cores} {queues_per_core} {nb_cycles}",
-            pty=True,
-            print_command=self.log_file,
+            self.clock_setup(nb_cores) + self.ddio_setup(),
         )
 
         self.running_nb_cores = nb_cores
@@ -407,15 +809,28 @@ class EnsoEchoDut(MultiCoreDut):
         self.wait_ready()
 
     def wait_ready(self) -> None:
+        """Wait until the DUT application is ready.
+
+        If the DUT has a `ready_probe`, we send probe packets until the
+        application answers them, instead of waiting for its output.
+        """
         if self.sw_instance is None:
             raise RuntimeError("Program did not start")
 
-        self.sw_instance.watch(
-            keyboard_int=self.stop,
-            stdout=self.log_file,
-            stderr=self.log_file,
-            stop_pattern="Mbps",
-        )
+        if self.ready_probe is None:
+            self.sw_instance.watch(
+                keyboard_int=self.stop,
+                stdout=self.log_file,
+                stderr=self.log_file,
+                stop_pattern=self.ready_pattern,
+            )
+        else:
+            deadline = time.time() + READY_PROBE_TIMEOUT
+            while not self.sw_instance.exit_status_ready():
+                if self.ready_probe():
+                    break
+                if time.time() > deadline:
+                    raise RuntimeError("DUT did not answer probe packets")
 
         # If a sw instance already finished, something wrong happened.
         if self.sw_instance.exit_status_ready():
@@ -425,29 +840,56 @@ class EnsoEchoDut(MultiCoreDut):
         if self.sw_instance is None:
             return
 
-        self.sw_instance.send(b"\x03")  # Ctrl+C.
-        self.sw_instance.watch(stdout=self.log_file, stderr=self.log_file)
+        self.stop_app(self.sw_instance, self.log_file)
 
-        # Set clocks back to maximum.
-        set_host_clock(self.host, 0, list(range(self.running_nb_cores)))
+        self.sw_instance = None
+
+    def wait_stop(self) -> None:
+        pass
+
+    def apply_nic_modes(self) -> None:
+        host_state = self.host_state
+
+        if host_state.nic_modes.get("desc_per_pkt", False) == (
+            self.notif_per_pkt
+        ):
+            return
 
         if self.notif_per_pkt:
+            self.nic.enable_desc_per_pkt()
+            host_state.set_restore(
+                "desc_per_pkt", self.nic.disable_desc_per_pkt
+            )
+        else:
             self.nic.disable_desc_per_pkt()
+            host_state.set_restore("desc_per_pkt", None)
 
-        self.sw_instance = None
+        host_state.nic_modes["desc_per_pkt"] = self.notif_per_pkt
 
-    def wait_stop(self) -> None:
-        pass
+    def reconfiguration_cost(
+        self, current: Optional[dict[str, Any]], target: dict[str, Any]
+    ) -> float:
+        cost = super().reconfiguration_cost(current, target)
+
+        # Only applied once for all points, unless another DUT changed it.
+        if current is None and self.notif_per_pkt != (
+            self.host_state.nic_modes.get("desc_per_pkt", False)
+        ):
+            cost += DESC_PER_PKT_COST
+
+        return cost
 
     @property
     def host(self) -> Union[LocalHost, RemoteHost]:
-        return self.nic.host
+        return get_host(self.nic.host_name)
 
     def get_hostname(self) -> str:
         return self.nic.host_name
 
 
 class EnsoMaglevDut(EnsoEchoDut):
+    ready_pattern = DUT_READY_MARKER
+
     def __init__(
         self,
         nic: EnsoNic,
@@ -460,7 +902,9 @@ class EnsoMaglevDut(EnsoEchoDut):
 
         self.nb_backends = nb_backends
 
-        self.core_clocks = {}
+        # Maglev does not support a notification per packet.
+        self.notif_per_pkt = False
+
         self.sw_instance = None
 
     def start(
@@ -469,30 +913,47 @@ class EnsoMaglevDut(EnsoEchoDut):
         if self.sw_instance is not None:
             raise RuntimeError("Program already running")
 
-        # Maglev relies on hashing flows to cores.
-        self.nic.fallback_queues = queues_per_core * nb_cores
+        # Another DUT may have left a notification per packet enabled.
+        self.apply_nic_modes()
 
-        self.apply_clock_to_cores(nb_cores)
+        # Maglev relies on hashing flows to cores.
+        fallback_queues = queues_per_core * nb_cores
+        host_state = self.host_state
+        if host_state.nic_modes.get("fallback_queues") != fallback_queues:
+            self.nic.fallback_queues = fallback_queues
+            host_state.nic_modes["fallback_queues"] = fallback_queues
 
-        self.sw_instance = self.host.run_command(
+        self.sw_instance = self.start_app(
             f"{self.config['paths']['enso_maglev_cmd']} -l {0}-{nb_cores-1} --"
             f" {nb_cores} {queues_per_core} {self.nb_backends}",
-            pty=True,
-            print_command=self.log_file,
+            self.clock_setup(nb_cores),
         )
 
         self.running_nb_cores = nb_cores
         self.running_queues_per_core = queues_per_core
 
+    def reconfiguration_cost(
+        self, current: Optional[dict[str, Any]], target: dict[str, Any]
+    ) -> float:
+        cost = super().reconfiguration_cost(current, target)
+        current = current or {}
+
+        fallback_queues = target.get("nb_cores", 1) * target.get(
+            "queues_per_core", 4
+        )
+        current_fallback_queues = current.get("nb_cores", 0) * current.get(
+            "queues_per_core", 0
+        )
+        if fallback_queues != current_fallback_queues:
+            cost += FALLBACK_QUEUES_COST
+
+        return cost
+
     def stop(self) -> None:
         if self.sw_instance is None:
             return
 
-        self.sw_instance.send(b"\x03")  # Ctrl+C.
-        self.sw_instance.watch(stdout=self.verbose, stderr=self.verbose)
-
-        # Set clocks back to maximum.
-        set_host_clock(self.host, 0, list(range(self.running_nb_cores)))
+        self.stop_app(self.sw_instance, self.verbose)
 
         self.sw_instance = None
 
@@ -511,9 +972,6 @@ class DpdkEchoDut(MultiCoreDut):
 
         self.hostname = hostname
         self.verbose = verbose
-        self.core_clocks = {}
-        self.ssh_client = None
-        self._host = None
         self.sw_instance = None
 
     def set_cpu_clock(self, cpu_clock: int) -> None:
@@ -533,13 +991,10 @@ class DpdkEchoDut(MultiCoreDut):
             pci_allow_list=self.config["devices"]["dpdk_dut_pcie"],
         )
 
-        self.apply_clock_to_cores(nb_cores)
-
-        self.sw_instance = self.host.run_command(
+        self.sw_instance = self.start_app(
             f"{self.config['paths']['dut_dpdk_echo_cmd']} {dpdk_config} -- "
             f"--q-per-core {queues_per_core} --nb-cycles {nb_cycles}",
-            pty=True,
-            print_command=self.log_file,
+            self.clock_setup(nb_cores),
         )
 
         self.running_nb_cores = nb_cores
@@ -562,7 +1017,7 @@ class DpdkEchoDut(MultiCoreDut):
 
         self.sw_instance.watch(
             keyboard_int=self.stop,
-            stop_pattern="Starting core 0 with first queue 0",
+            stop_pattern=self.ready_pattern,
             stdout=self.log_file,
             stderr=self.log_file,
         )
@@ -575,29 +1030,16 @@ class DpdkEchoDut(MultiCoreDut):
         if self.sw_instance is None:
             return
 
-        self.sw_instance.send(b"\x03")  # Ctrl+C.
-        self.sw_instance.watch(stdout=self.log_file, stderr=self.log_file)
-
-        # Set clocks back to maximum.
-        set_host_clock(self.host, 0, self.running_cores)
+        self.stop_app(self.sw_instance, self.log_file)
 
-        self.close_ssh_client()
+        self.sw_instance = None
 
     def wait_stop(self) -> None:
         pass
 
-    def close_ssh_client(self) -> None:
-        if self.ssh_client is None:
-            return
-        self.ssh_client.close()
-        del self.ssh_client
-        self.ssh_client = None
-
     @property
     def host(self) -> Union[LocalHost, RemoteHost]:
-        if self._host is None:
-            self._host = get_host_from_hostname(self.hostname)
-        return self._host
+        return get_host(self.hostname)
 
     def get_hostname(self) -> str:
         return self.hostname
@@ -630,19 +1072,49 @@ class DpdkMaglevDut(DpdkEchoDut):
             pci_allow_list=self.config["devices"]["dpdk_dut_pcie"],
         )
 
-        self.apply_clock_to_cores(nb_cores)
-
-        self.sw_instance = self.host.run_command(
+        self.sw_instance = self.start_app(
             f"{self.config['paths']['dpdk_maglev_cmd']} {dpdk_config} -- "
             f"--q-per-core {queues_per_core} --nb-backends {self.nb_backends}",
-            pty=True,
-            print_command=self.log_file,
+            self.clock_setup(nb_cores),
         )
 
         self.running_nb_cores = nb_cores
         self.running_queues_per_core = queues_per_core
 
 
+def plan_points(
+    name: str, dut: Dut, points: list[tuple], fields: tuple[str, ...]
+) -> list[tuple]:
+    """Reorder experiment points to reduce DUT reconfiguration time.
+
+    Args:
+        name: Experiment name (used for logging).
+        dut: DUT used to estimate the reconfiguration cost.
+        points: Points to run, as tuples of parameters.
+        fields: Names of the parameters in each point.
+
+    Returns:
+        The points in the order they should run.
+    """
+
+    def cost(current: Optional[tuple], target: tuple) -> float:
+        current_config = None
+        if current is not None:
+            current_config = dict(zip(fields, current))
+        target_config = dict(zip(fields, target))
+        return dut.reconfiguration_cost(current_config, target_config)
+
+    planned, planned_cost, baseline_cost = plan_sweep(points, cost)
+
+    if planned_cost < baseline_cost:
+        console.log(
+            f"[cyan]{name}: estimated reconfiguration time {planned_cost:.0f}s"
+            f" (saves {baseline_cost - planned_cost:.0f}s)"
+        )
+
+    return planned
+
+
 class Experiment:
     def __init__(self, name: str, iterations: int) -> None:
         self.name = name
@@ -651,13 +1123,124 @@ class Experiment:
     def run(self, step_progress: Progress, current_iter: int) -> None:
         raise NotImplementedError
 
+    def points(self) -> list[tuple[Path, Hashable]]:
+        """Points requested by this experiment that may be shared with others.
+
+        Each point is identified by the file where it is saved and a key
+        within that file. Experiments that do not share points with other
+        experiments return an empty list.
+        """
+        return []
+
+    def set_requested_by(
+        self, requested_by: dict[tuple[Path, Hashable], list[str]]
+    ) -> None:
+        """Record the experiments requesting each point of this experiment.
+
+        Args:
+            requested_by: Names of the experiments requesting each point, as
+              planned by `ExperimentTracker.plan`.
+        """
+
+    def nb_shared_points(self) -> int:
+        """Number of points of this experiment measured by other experiments
+        during this run."""
+        return 0
+
+    def is_done(self, current_iter: int) -> bool:
+        """Check if the remaining iterations can be skipped, starting at
+        `current_iter`."""
+        return False
+
     def run_many(self, progress: Progress, step_progress: Progress) -> None:
         task_id = progress.add_task("", total=self.iterations, name=self.name)
         for iter in range(self.iterations):
+            if self.is_done(iter):
+                console.log(
+                    f"[green]{self.name}: all points converged, skipping the "
+                    f"remaining {self.iterations - iter} iterations"
+                )
+                break
             self.run(step_progress, iter)
             progress.update(task_id, advance=1)
 
-        progress.update(task_id, description="[bold green] done!")
+        progress.update(
+            task_id,
+            completed=self.iterations,
+            description="[bold green] done!",
+        )
+
+
+class ThroughputResults:
+    """Throughput results saved to a CSV file.
+
+    Results are kept in the `ResultsStore` of the data directory and exported
+    to the CSV file. There is a single instance per file (see
+    `ThroughputResults.get`) that is shared by all the experiments saving to
+    it, so every experiment sees the points measured by the others.
+
+    Args:
+        save_name: Path to the CSV file.
+    """
+
+    _instances: dict[Path, "ThroughputResults"] = {}
+
+    def __init__(self, save_name: Path) -> None:
+        self.save_name = save_name
+        self.store = ResultsStore.get(save_name.parent)
+        self.store.import_throughput_csv(save_name)
+
+        # Experiment that measured each point during this run.
+        self.measured_by: dict[ThroughputConfig, str] = {}
+
+        # Experiments requesting each point (see `ExperimentTracker.plan`).
+        self.requested_by: dict[ThroughputConfig, list[str]] = {}
+
+    @classmethod
+    def get(cls, save_name: Path) -> "ThroughputResults":
+        save_name = save_name.resolve()
+        if save_name not in cls._instances:
+            cls._instances[save_name] = cls(save_name)
+        return cls._instances[save_name]
+
+    def nb_results(self, config: ThroughputConfig) -> int:
+        return self.store.nb_throughput_results(self.save_name, config)
+
+    def history(self, config: ThroughputConfig) -> list[float]:
+        return self.store.throughput_history(self.save_name, config)
+
+    def neighbors(
+        self, config: ThroughputConfig
+    ) -> dict[tuple[int, int], list[float]]:
+        return self.store.throughput_neighbors(self.save_name, config)
+
+    def append(
+        self, config: ThroughputConfig, throughput: float, name: str
+    ) -> None:
+        self.store.add_throughput(self.save_name, config, throughput)
+        self.store.export_throughput_csv(self.save_name)
+        self.measured_by[config] = name
+
+        others = [
+            other
+            for other in self.requested_by.get(config, [])
+            if other != name
+        ]
+        if len(others) > 0:
+            console.log(f"[cyan]Result also used by: {', '.join(others)}")
+
+    def shared_points(self, name: str) -> int:
+        """Number of points requested by experiment `name` that were measured
+        by another experiment during this run."""
+        return sum(
+            1
+            for config, requested_by in self.requested_by.items()
+            if name in requested_by
+            and self.measured_by.get(config, name) != name
+        )
+
+    def export(self) -> None:
+        self.store.export_throughput_csv(self.save_name)
 
 
 class ThroughputExperiment(Experiment):
@@ -675,7 +1258,11 @@ class ThroughputExperiment(Experiment):
         nb_cycles: list[int],
         ddio_ways: list[int],
         precision: int = 100_000_000,
+        loss_tolerances: Optional[list[float]] = None,
         pktgen_args: Optional[dict[str, int]] = None,
+        search_args: Optional[dict[str, Any]] = None,
+        seed_margin: float = 0.05,
+        adaptive_iterations: Optional[AdaptiveIterations] = None,
     ) -> None:
         super().__init__(name, iterations)
         self.save_name = save_name
@@ -687,27 +1274,130 @@ class ThroughputExperiment(Experiment):
         self.nb_cycles = nb_cycles
         self.ddio_ways = ddio_ways
         self.precision = precision
+        self.loss_tolerances = loss_tolerances or [0.0]
         self.pktgen_args = pktgen_args or {}
+        self.search_args = search_args or {}
+        self.seed_margin = seed_margin
+        self.adaptive_iterations = adaptive_iterations
         self.dut = dut
 
-        header = (
-            "pkt_size,nb_cores,queues_per_core,cpu_clock,nb_cycles,ddio_ways,"
-            "precision,throughput\n"
+        # Experiments saving to the same file share their results, so points
+        # requested by more than one experiment only run once per iteration.
+        self.results = ThroughputResults.get(save_name)
+
+    def points(self) -> list[tuple[Path, Hashable]]:
+        """Points requested by this experiment, identified by save file."""
+        experiments = itertools.product(
+            self.pkt_sizes,
+            self.nb_cores,
+            self.queues_per_core,
+            self.cpu_clocks,
+            self.nb_cycles,
+            self.ddio_ways,
+            self.loss_tolerances,
         )
+        return [
+            (self.results.save_name, self._get_config(*exp))
+            for exp in experiments
+        ]
 
-        self.experiment_tracker = defaultdict(int)
+    def set_requested_by(
+        self, requested_by: dict[tuple[Path, Hashable], list[str]]
+    ) -> None:
+        for save_name, config in self.points():
+            self.results.requested_by[config] = requested_by[
+                (save_name, config)
+            ]
+
+    def nb_shared_points(self) -> int:
+        return self.results.shared_points(self.name)
+
+    def _is_converged(self, config: ThroughputConfig) -> bool:
+        """Check if a point needs no more iterations (only when using
+        `adaptive_iterations`)."""
+        if self.adaptive_iterations is None:
+            return False
+        return self.adaptive_iterations.is_done(self.results.history(config))
+
+    def is_done(self, current_iter: int) -> bool:
+        return self.adaptive_iterations is not None and all(
+            self._is_converged(config) for _, config in self.points()
+        )
 
-        # If file exists, continue where we left.
-        if self.save_name.exists():
-            with open(self.save_name) as f:
-                read_header = f.readline()
-                assert header == read_header
-                for row in f.readlines():
-                    end = row.rfind(",")
-                    self.experiment_tracker[row[:end]] += 1
-        else:
-            with open(self.save_name, "w") as f:
-                f.write(header)
+    def _get_config(
+        self,
+        pkt_size: int,
+        cores: int,
+        q_per_core: int,
+        cpu_clock: int,
+        cycles: int,
+        ddio_way: int,
+        loss_tolerance: float,
+    ) -> ThroughputConfig:
+        return (
+            pkt_size,
+            cores,
+            q_per_core,
+            cpu_clock,
+            cycles,
+            ddio_way,
+            self.precision,
+            loss_tolerance,
+        )
+
+    def _get_seed(
+        self,
+        pkt_size: int,
+        cores: int,
+        q_per_core: int,
+        cpu_clock: int,
+        cycles: int,
+        ddio_way: int,
+        loss_tolerance: float,
+    ) -> Optional[tuple[float, float]]:
+        """Get a seed bracket for the throughput search from past results.
+
+        Previous iterations of the same configuration are preferred. Otherwise
+        we use the nearest configuration with the same packet size but fewer
+        cores or fewer queues per core, scaling the upper bound by the ratio
+        of cores. Configurations are farther apart the more times their
+        number of cores and queues per core double, and the bracket widens
+        with that distance.
+        """
+        config = self._get_config(
+            pkt_size,
+            cores,
+            q_per_core,
+            cpu_clock,
+            cycles,
+            ddio_way,
+            loss_tolerance,
+        )
+        history = self.results.history(config)
+        if history:
+            low = min(history) * (1 - self.seed_margin) - self.precision
+            high = max(history) * (1 + self.seed_margin) + self.precision
+            return (low, high)
+
+        neighbors = self.results.neighbors(config)
+        if not neighbors:
+            return None
+
+        def distance(neighbor: tuple[int, int]) -> float:
+            neighbor_cores, neighbor_q_per_core = neighbor
+            return math.log2(cores / neighbor_cores) + math.log2(
+                q_per_core / neighbor_q_per_core
+            )
+
+        # Ties go to the neighbor with more cores.
+        neighbor = min(neighbors, key=lambda n: (distance(n), -n[0]))
+        neighbor_throughput = statistics.median(neighbors[neighbor])
+        margin = self.seed_margin * (1 + distance(neighbor))
+
+        low = neighbor_throughput * max(1 - margin, 0)
+        high = neighbor_throughput * cores / neighbor[0]
+        high *= 1 + margin
+        return (low, high)
 
     def run(self, step_progress: Progress, current_iter: int) -> None:
         experiments = list(
@@ -718,11 +1408,53 @@ class ThroughputExperiment(Experiment):
                 self.cpu_clocks,
                 self.nb_cycles,
                 self.ddio_ways,
+                self.loss_tolerances,
             )
         )
 
         task_id = step_progress.add_task(self.name, total=len(experiments))
 
+        pending_experiments = []
+        for exp in experiments:
+            config = self._get_config(*exp)
+            exp_key = ",".join(str(field) for field in config[:-1])
+            exp_key = f"{exp_key},{config[-1]:g}"
+            if self.results.nb_results(config) > current_iter:
+                measured_by = self.results.measured_by.get(config)
+                if measured_by is not None and measured_by != self.name:
+                    console.log(
+                        f"[orange1]Skipping: {exp_key} (measured by "
+                        f"{measured_by})"
+                    )
+                else:
+                    console.log(f"[orange1]Skipping: {exp_key}")
+                step_progress.update(task_id, advance=1)
+                continue
+            if self._is_converged(config):
+                nb_results = self.results.nb_results(config)
+                console.log(
+                    f"[orange1]Skipping: {exp_key} (converged after "
+                    f"{nb_results} iterations)"
+                )
+                step_progress.update(task_id, advance=1)
+                continue
+            pending_experiments.append(exp)
+
+        pending_experiments = plan_points(
+            self.name,
+            self.dut,
+            pending_experiments,
+            (
+                "pkt_size",
+                "nb_cores",
+                "queues_per_core",
+                "cpu_clock",
+                "nb_cycles",
+                "ddio_ways",
+                "loss_tolerance",
+            ),
+        )
+
         for (
             pkt_size,
             cores,
@@ -730,21 +1462,38 @@ class ThroughputExperiment(Experiment):
             cpu_clock,
             cycles,
             ddio_way,
-        ) in experiments:
+            loss_tolerance,
+        ) in pending_experiments:
             exp_str = (
                 f"{pkt_size},{cores},{q_per_core},{cpu_clock},{cycles},"
                 f"{ddio_way}"
             )
 
-            exp_str_with_precision = f"{exp_str},{self.precision}"
+            config = self._get_config(
+                pkt_size,
+                cores,
+                q_per_core,
+                cpu_clock,
+                cycles,
+                ddio_way,
+                loss_tolerance,
+            )
 
-            if self.experiment_tracker[exp_str_with_precision] > current_iter:
-                console.log(f"[orange1]Skipping: {exp_str_with_precision}")
-                step_progress.update(task_id, advance=1)
-                continue
+            if loss_tolerance > 0:
+                exp_str = f"{exp_str},{loss_tolerance:g}"
 
             step_progress.update(task_id, description=f"({exp_str})")
 
+            seed = self._get_seed(
+                pkt_size,
+                cores,
+                q_per_core,
+                cpu_clock,
+                cycles,
+                ddio_way,
+                loss_tolerance,
+            )
+
             if "pcap" in self.pktgen_args:
                 raise NotImplementedError
             else:
@@ -758,17 +1507,23 @@ class ThroughputExperiment(Experiment):
             self.dut.start(cores, q_per_core, cycles)
 
             throughput = self.dut.zero_loss_throughput(
-                self.pktgen, pkt_size, precision=self.precision
+                self.pktgen,
+                pkt_size,
+                precision=self.precision,
+                seed=seed,
+                loss_tolerance=loss_tolerance,
+                **self.search_args,
             )
 
             self.dut.stop()
             self.dut.wait_stop()
 
-            with open(self.save_name, "a") as f:
-                f.write(f"{exp_str_with_precision},{throughput}\n")
+            self.results.append(config, throughput, self.name)
 
             step_progress.update(task_id, advance=1)
 
+        self.results.export()
+
         step_progress.update(task_id, visible=False)
 
 
@@ -788,6 +1543,9 @@ class LatencyExperiment(Experiment):
         target_duration: int = 5,
         always_save: bool = False,
         pktgen_args: Optional[dict[str, int]] = None,
+        reuse_dut: bool = False,
+        load_refinement: Optional[LoadRefinement] = None,
+        hist_summary_cmd: Optional[str] = None,
     ) -> None:
         super().__init__(name, iterations)
         self.base_save_name = base_save_name
@@ -803,14 +1561,24 @@ class LatencyExperiment(Experiment):
         self.dut = dut
         self.iter_nb = 0
         self.always_save = always_save
+        self.dut_running = False
 
-        throughput_header = (
-            "pkt_size,nb_cores,queues_per_core,cpu_clock,load,throughput\n"
-        )
+        # Keep the DUT running for all the loads of the same configuration,
+        # only restarting it after an EnsōGen error.
+        self.reuse_dut = reuse_dut
+
+        # If set, `throughput_loads` is only a coarse grid that is refined
+        # around the tail-latency knee.
+        self.load_refinement = load_refinement
+
+        # If set, histograms are summarized on the packet generator host
+        # after every load with this command (see `hist_summary.py`) and the
+        # raw histograms are only collected at the end of each run.
+        self.hist_summary_cmd = hist_summary_cmd
+        self.collector = ArtifactCollector.get(self.base_save_name.parent)
 
-        if not self.base_save_name.exists():
-            with open(self.base_save_name, "w") as f:
-                f.write(throughput_header)
+        self.store = ResultsStore.get(self.base_save_name.parent)
+        self.store.import_points_csv(self.base_save_name)
 
     def _get_save_file_name(
         self,
@@ -826,6 +1594,46 @@ class LatencyExperiment(Experiment):
 
         return save_name
 
+    def _nb_loads(self) -> int:
+        """Maximum number of loads measured for each configuration."""
+        nb_loads = len(self.throughput_loads)
+        if self.load_refinement is not None:
+            nb_loads += self.load_refinement.budget
+        return nb_loads
+
+    def _is_point_done(self, point: PointConfig) -> bool:
+        """Check if a point was measured and its histogram (or the summary of
+        its histogram) is still saved."""
+        if not self.store.is_point_done(self.base_save_name, point):
+            return False
+        save_file_name = self._get_save_file_name(*point)
+        return save_file_name.exists() or summary_path(save_file_name).exists()
+
+    def _measured_loads(self, config: tuple[int, int, int, int]) -> list[int]:
+        """Loads already measured for a configuration."""
+        return [
+            load
+            for load in self.store.point_loads(self.base_save_name, config)
+            if self._is_point_done((*config, load))
+        ]
+
+    def _nb_refined_loads(self, config: tuple[int, int, int, int]) -> int:
+        """Number of extra loads already measured for a configuration."""
+        loads = self._measured_loads(config)
+        return len(set(loads) - set(self.throughput_loads))
+
+    def _is_config_done(self, config: tuple[int, int, int, int]) -> bool:
+        if not all(
+            self._is_point_done((*config, load))
+            for load in self.throughput_loads
+        ):
+            return False
+
+        return (
+            self.load_refinement is None
+            or self._nb_refined_loads(config) >= self.load_refinement.budget
+        )
+
     def run(self, step_progress: Progress, current_iter: int) -> None:
         experiments = list(
             itertools.product(
@@ -836,92 +1644,299 @@ class LatencyExperiment(Experiment):
             )
         )
 
-        task_total = len(experiments) * len(self.throughput_loads)
+        task_total = len(experiments) * self._nb_loads()
         task_id = step_progress.add_task(self.name, total=task_total)
 
-        for (pkt_size, cores, q_per_core, cpu_clock) in experiments:
-            for i, load in enumerate(self.throughput_loads):
-                save_file_name = self._get_save_file_name(
-                    pkt_size, cores, q_per_core, cpu_clock, load
-                )
+        pending_experiments = []
+        for exp in experiments:
+            if self._is_config_done(exp):
+                console.log(f"[orange1]Skipping: {exp}")
+                step_progress.update(task_id, advance=self._nb_loads())
+                continue
+            pending_experiments.append(exp)
+
+        pending_experiments = plan_points(
+            self.name,
+            self.dut,
+            pending_experiments,
+            ("pkt_size", "nb_cores", "queues_per_core", "cpu_clock"),
+        )
+
+        for config in pending_experiments:
+            self.dut_running = False
 
-                exp_str = f"{pkt_size},{cores},{q_per_core},{cpu_clock},{load}"
+            # p99 RTT of every load whose histogram was saved.
+            p99s: dict[int, float] = {}
+
+            # Loads where EnsōGen lost packets.
+            lossy_loads: set[int] = set()
+
+            def add_result(load: int, result: Optional[LoadResult]) -> None:
+                if result is None:
+                    lossy_loads.add(load)
+                    return
+                p99s[load], lost_pkts = result
+                if lost_pkts:
+                    lossy_loads.add(load)
+
+            nb_steps = self._nb_loads()
+            for load in self.throughput_loads:
+                result = self._run_load(step_progress, task_id, *config, load)
+                add_result(load, result)
+                step_progress.update(task_id, advance=1)
+                nb_steps -= 1
+
+                # Higher loads would also lose packets.
+                if result is None:
+                    break
 
-                if save_file_name.exists():
-                    console.log(f"[orange1]Skipping: {save_file_name}")
+            if self.load_refinement is not None:
+                # Extra loads measured in previous runs.
+                for load in self._measured_loads(config):
+                    if load not in p99s:
+                        result = self._get_result(*config, load)
+                        if result is not None:
+                            add_result(load, result)
+
+                nb_refined = self._nb_refined_loads(config)
+                while nb_refined < self.load_refinement.budget:
+                    load = self.load_refinement.next_load(p99s, lossy_loads)
+                    if load is None:
+                        break
+                    result = self._run_load(
+                        step_progress, task_id, *config, load
+                    )
+                    add_result(load, result)
                     step_progress.update(task_id, advance=1)
-                    continue
+                    nb_steps -= 1
+                    nb_refined += 1
 
-                step_progress.update(task_id, description=f"({exp_str})")
+            step_progress.update(task_id, advance=nb_steps)
 
-                if "pcap" in self.pktgen_args:
-                    raise NotImplementedError
-                else:
-                    pkt_size = self.pktgen_args.get("pkt_size", pkt_size)
-                    nb_src = self.pktgen_args.get("nb_src", 1)
-                    nb_dst = self.pktgen_args.get("nb_dst", q_per_core * cores)
-                    self.pktgen.set_params(pkt_size, nb_src, nb_dst)
+            if self.dut_running:
+                self.dut.stop()
 
-                self.dut.set_cpu_clock(cpu_clock)
-                self.dut.start(cores, q_per_core)
-                self.dut.wait_ready()
+        if self.hist_summary_cmd is not None:
+            collect_artifacts(self.collector, self.pktgen.log_file)
 
-                pps = load / ((pkt_size + 20) * 8)
-                nb_pkts = int(pps * self.target_duration)
+        self.store.export_points_csv(self.base_save_name)
 
-                # Make sure RTT hist is enabled.
-                og_rtt_hist = self.pktgen.rtt_hist
-                self.pktgen.rtt_hist = True
+        step_progress.update(task_id, visible=False)
 
-                self.pktgen.clean_stats()
+    def _nb_pkts(self, pkt_size: int, load: int) -> int:
+        """Number of packets sent at each load."""
+        pkt_size = self.pktgen_args.get("pkt_size", pkt_size)
+        pps = load / ((pkt_size + 20) * 8)
+        return int(pps * self.target_duration)
 
-                self.pktgen.start(load, nb_pkts)
+    def _get_result(
+        self,
+        pkt_size: int,
+        cores: int,
+        q_per_core: int,
+        cpu_clock: int,
+        load: int,
+    ) -> Optional[LoadResult]:
+        """Get the result of a load that was already measured.
+
+        Returns:
+            p99 RTT and whether EnsōGen lost packets (i.e., the histogram has
+            fewer packets than were sent), or None if the histogram is
+            missing.
+        """
+        save_file_name = self._get_save_file_name(
+            pkt_size, cores, q_per_core, cpu_clock, load
+        )
+        if summary_path(save_file_name).exists():
+            with open(summary_path(save_file_name)) as f:
+                summary = json.load(f)
+        elif save_file_name.exists():
+            summary = summarize(read_histogram(save_file_name))
+        else:
+            return None
+
+        # Histograms without packets are treated as missing.
+        if summary is None:
+            return None
+
+        return summary["p99"], summary["count"] < self._nb_pkts(pkt_size, load)
+
+    def _pending_hist_dir(self) -> str:
+        """Directory in the packet generator host with the histograms that
+        were not collected yet."""
+        return str(Path(self.pktgen.hist_file).parent / "pending_hists")
+
+    def _summarize_histogram(self, save_file_name: Path) -> Optional[float]:
+        """Summarize the histogram of the last load on the packet generator
+        host and save the summary locally.
+
+        The raw histogram is left in the pending directory of the packet
+        generator host and registered with the artifact collector.
+
+        Returns:
+            p99 RTT, or None if the histogram has no packets (nothing is
+            saved in this case).
+        """
+        pending_path = f"{self._pending_hist_dir()}/{save_file_name.name}"
+        host = host_pool.get(self.pktgen.nic.host_name)
+        cmd = host.run_command(
+            f"{self.hist_summary_cmd} {self.pktgen.hist_file} "
+            f"--keep {pending_path}",
+            print_command=self.pktgen.log_file,
+        )
+        output = cmd.watch(stderr=self.pktgen.log_file)
+        if cmd.recv_exit_status() != 0:
+            raise RuntimeError("Failed to summarize RTT histogram")
+        summary = json.loads(output.strip().splitlines()[-1])
+        if summary is None:
+            return None
+
+        # Write to a temporary file first so that an interrupted run never
+        # leaves a partial summary behind.
+        summary_file_name = summary_path(save_file_name)
+        tmp_summary_file_name = summary_file_name.with_name(
+            f".{summary_file_name.name}.tmp"
+        )
+        with open(tmp_summary_file_name, "w") as f:
+            json.dump(summary, f)
+        tmp_summary_file_name.replace(summary_file_name)
 
-                save_file = True
+        self.collector.register(
+            self.pktgen.nic.host_name, pending_path, save_file_name
+        )
 
-                try:
-                    self.pktgen.wait_transmission_done()
-                except RuntimeError as e:
-                    # HACK(sadok): Should use proper Exception class.
-                    if e.args[0] != "Error running EnsōGen":
-                        raise
-                    save_file = False or self.always_save
+        return summary["p99"]
 
-                nb_rx_pkts = self.pktgen.get_nb_rx_pkts()
+    def _add_point(self, point: PointConfig, rx_throughput: float) -> None:
+        """Save a point and export the CSV file right away so that an
+        interrupted run never leaves results out of it."""
+        self.store.add_point(self.base_save_name, point, rx_throughput)
+        self.store.export_points_csv(self.base_save_name)
 
-                self.dut.stop()
+    def _run_load(
+        self,
+        step_progress: Progress,
+        task_id: TaskID,
+        pkt_size: int,
+        cores: int,
+        q_per_core: int,
+        cpu_clock: int,
+        load: int,
+    ) -> Optional[LoadResult]:
+        """Measure the RTT histogram of a single load.
+
+        Starts the DUT if it is not running and stops it if it should not be
+        reused for the next load.
+
+        Returns:
+            p99 RTT at this load and whether EnsōGen lost packets, or None if
+            EnsōGen lost packets and the histogram was not saved (i.e.,
+            without `always_save`) or if the histogram has no packets.
+        """
+        save_file_name = self._get_save_file_name(
+            pkt_size, cores, q_per_core, cpu_clock, load
+        )
 
-                # Restore previous configuration.
-                self.pktgen.rtt_hist = og_rtt_hist
-                # self.pktgen.stats_delay = og_stats_delay
+        exp_str = f"{pkt_size},{cores},{q_per_core},{cpu_clock},{load}"
+        point = (pkt_size, cores, q_per_core, cpu_clock, load)
 
-                # Do not save if error occurred in EnsōGen. This includes
-                # not receiving all packets back, which indicates that the DUT
-                # cannot keep up with the offered load.
-                if not save_file:
-                    steps = len(self.throughput_loads) - i
-                    step_progress.update(task_id, advance=steps)
-                    break
+        if self._is_point_done(point):
+            console.log(f"[orange1]Skipping: {save_file_name}")
+            return self._get_result(
+                pkt_size, cores, q_per_core, cpu_clock, load
+            )
 
-                if nb_rx_pkts > nb_pkts:
-                    raise RuntimeError(
-                        "Received more packets than sent. Measurement is "
-                        "unreliable."
-                    )
+        step_progress.update(task_id, description=f"({exp_str})")
 
-                download_file(
-                    self.pktgen.nic.host_name,
-                    self.pktgen.hist_file,
-                    str(save_file_name),
-                    log_file=self.pktgen.log_file,
-                )
+        if "pcap" in self.pktgen_args:
+            raise NotImplementedError
+        else:
+            pkt_size = self.pktgen_args.get("pkt_size", pkt_size)
+            nb_src = self.pktgen_args.get("nb_src", 1)
+            nb_dst = self.pktgen_args.get("nb_dst", q_per_core * cores)
+            self.pktgen.set_params(pkt_size, nb_src, nb_dst)
 
-                with open(self.base_save_name, "a") as f:
-                    f.write(f"{exp_str},{self.pktgen.get_rx_throughput()}\n")
+        if not self.dut_running:
+            self.dut.set_cpu_clock(cpu_clock)
+            self.dut.start(cores, q_per_core)
+            self.dut.wait_ready()
+            self.dut_running = True
 
-                step_progress.update(task_id, advance=1)
+        nb_pkts = self._nb_pkts(pkt_size, load)
 
-        step_progress.update(task_id, visible=False)
+        # Make sure RTT hist is enabled.
+        og_rtt_hist = self.pktgen.rtt_hist
+        self.pktgen.rtt_hist = True
+
+        self.pktgen.clean_stats()
+
+        self.pktgen.start(load, nb_pkts)
+
+        save_file = True
+        pktgen_error = False
+
+        try:
+            self.pktgen.wait_transmission_done()
+        except RuntimeError as e:
+            # HACK(sadok): Should use proper Exception class.
+            if e.args[0] != "Error running EnsōGen":
+                raise
+            save_file = False or self.always_save
+            pktgen_error = True
+
+        nb_rx_pkts = self.pktgen.get_nb_rx_pkts()
+
+        # After an error, the DUT may still be processing packets from the
+        # previous load, so we restart it for the next one.
+        if not self.reuse_dut or pktgen_error:
+            self.dut.stop()
+            self.dut_running = False
+
+        # Restore previous configuration.
+        self.pktgen.rtt_hist = og_rtt_hist
+        # self.pktgen.stats_delay = og_stats_delay
+
+        # Do not save if error occurred in EnsōGen. This includes not
+        # receiving all packets back, which indicates that the DUT cannot
+        # keep up with the offered load.
+        if not save_file:
+            return None
+
+        if nb_rx_pkts > nb_pkts:
+            self.dut.stop()
+            raise RuntimeError(
+                "Received more packets than sent. Measurement is unreliable."
+            )
+
+        if self.hist_summary_cmd is not None:
+            p99 = self._summarize_histogram(save_file_name)
+            if p99 is None:
+                return None
+            self._add_point(point, self.pktgen.get_rx_throughput())
+            return p99, pktgen_error
+
+        # Download to a temporary file first so that an interrupted download
+        # never leaves a partial histogram behind.
+        tmp_save_file_name = save_file_name.with_name(
+            f".{save_file_name.name}.tmp"
+        )
+        fetch_file(
+            self.pktgen.nic.host_name,
+            self.pktgen.hist_file,
+            str(tmp_save_file_name),
+            log_file=self.pktgen.log_file,
+        )
+
+        summary = summarize(read_histogram(tmp_save_file_name))
+        if summary is None:
+            tmp_save_file_name.unlink()
+            return None
+
+        tmp_save_file_name.replace(save_file_name)
+
+        self._add_point(point, self.pktgen.get_rx_throughput())
+
+        return summary["p99"], pktgen_error
 
 
 class MeasureDutExperiment(Experiment):
@@ -954,12 +1969,8 @@ class MeasureDutExperiment(Experiment):
         self.pktgen_args = pktgen_args or {}
         self.dut = dut
 
-        if not self.base_save_name.exists():
-            with open(self.base_save_name, "w") as f:
-                f.write(
-                    "pkt_size,nb_cores,queues_per_core,cpu_clock,load,"
-                    "throughput\n"
-                )
+        self.store = ResultsStore.get(self.base_save_name.parent)
+        self.store.import_points_csv(self.base_save_name)
 
         assert target_duration > 5
 
@@ -990,17 +2001,35 @@ class MeasureDutExperiment(Experiment):
 
         task_id = step_progress.add_task(self.name, total=len(experiments))
 
-        for (pkt_size, cores, q_per_core, cpu_clock, load) in experiments:
-            save_file_name = self._get_save_file_name(
-                pkt_size, cores, q_per_core, cpu_clock, load
-            )
-
-            exp_str = f"{pkt_size},{cores},{q_per_core},{cpu_clock},{load}"
-
-            if save_file_name.exists():
+        pending_experiments = []
+        for exp in experiments:
+            if self.store.is_point_done(self.base_save_name, exp):
+                save_file_name = self._get_save_file_name(*exp)
                 console.log(f"Skipping: {save_file_name}")
                 step_progress.update(task_id, advance=1)
                 continue
+            pending_experiments.append(exp)
+
+        pending_experiments = plan_points(
+            self.name,
+            self.dut,
+            pending_experiments,
+            ("pkt_size", "nb_cores", "queues_per_core", "cpu_clock", "load"),
+        )
+
+        for (
+            pkt_size,
+            cores,
+            q_per_core,
+            cpu_clock,
+            load,
+        ) in pending_experiments:
+            save_file_name = self._get_save_file_name(
+                pkt_size, cores, q_per_core, cpu_clock, load
+            )
+
+            exp_str = f"{pkt_size},{cores},{q_per_core},{cpu_clock},{load}"
+            point = (pkt_size, cores, q_per_core, cpu_clock, load)
 
             step_progress.update(task_id, description=f"({exp_str})")
 
@@ -1015,32 +2044,218 @@ class MeasureDutExperiment(Experiment):
                 self.pktgen.set_params(pkt_size, nb_src, nb_dst)
 
             self.dut.start(cores, q_per_core)
-            self.dut.wait_ready()
 
-            self.pktgen.start(load, 0)
-            time.sleep(1)
+            try:
+                rx_throughput = asyncio.run(
+                    self.measure_point(save_file_name, load)
+                )
+            except CommandFailed as e:
+                # Leave the point pending so that it runs again later.
+                console.log(f"[red]{e}, aborting point ({exp_str})")
+                step_progress.update(task_id, advance=1)
+                continue
 
-            self.measure_dut(save_file_name)
+            self.store.add_point(self.base_save_name, point, rx_throughput)
+            self.store.export_points_csv(self.base_save_name)
 
-            self.pktgen.pktgen_cmd.watch(
-                timeout=1,
-                stdout=self.pktgen.log_file,
-                stderr=self.pktgen.log_file,
-            )
+            step_progress.update(task_id, advance=1)
+
+        self.store.export_points_csv(self.base_save_name)
+
+        step_progress.update(task_id, visible=False)
+
+    async def measure_point(self, save_file_name: Path, load: int) -> float:
+        """Measure the running DUT at the given load.
+
+        The output of the DUT and of the packet generator is streamed
+        concurrently with the measurement so that the point is aborted as
+        soon as either of them stops. Both are stopped when this returns,
+        but only after `measure_dut` finished, since it cannot be interrupted
+        once it started.
+
+        When the DUT host runs an agent, the utilization and frequency of
+        the DUT cores are also sampled while `measure_dut` runs and saved
+        next to its results (see `cpu_samples_path`).
+
+        Args:
+            save_file_name: Where `measure_dut` should save its results.
+            load: Load offered by the packet generator (in bps).
+
+        Returns:
+            Throughput received by the packet generator (in bps).
+
+        Raises:
+            CommandFailed: If the DUT was not ready in time or if the DUT or
+              the packet generator stopped during the measurement.
+        """
+        pktgen_running = False
+        sampling = False
+
+        # Runs `measure_dut` in a thread that we can wait for, even if the
+        # point is aborted (unlike `asyncio.to_thread`).
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        try:
+            async with CommandMonitor() as monitor:
+                monitor.add("DUT", self.dut.sw_instance, self.dut.log_file)
+
+                if self.dut.ready_probe is None:
+                    await monitor.wait_for(
+                        "DUT", self.dut.ready_pattern, DUT_READY_TIMEOUT
+                    )
+                else:
+                    await monitor.run(asyncio.to_thread(self.dut.wait_ready))
+
+                self.pktgen.start(load, 0)
+                pktgen_running = True
+                monitor.add(
+                    "Pktgen", self.pktgen.pktgen_cmd, self.pktgen.log_file
+                )
 
-            self.pktgen.stop()
+                await monitor.run(asyncio.sleep(1))
+
+                dut_host = host_pool.get(self.dut.get_hostname()).host
+                if isinstance(dut_host, AgentHost):
+                    cores = list(range(self.dut.running_nb_cores))
+                    await asyncio.to_thread(
+                        dut_host.start_sampling, CPU_SAMPLE_INTERVAL, cores
+                    )
+                    sampling = True
+
+                measure = executor.submit(self.measure_dut, save_file_name)
+                await monitor.run(asyncio.wrap_future(measure))
+
+                if sampling:
+                    sampling = False
+                    columns, samples = await asyncio.to_thread(
+                        dut_host.stop_sampling
+                    )
+                    save_cpu_samples(
+                        cpu_samples_path(save_file_name), columns, samples
+                    )
+        finally:
+            executor.shutdown(wait=True)
+            if sampling:
+                try:
+                    dut_host.stop_sampling()
+                except AgentError:
+                    pass
+            if pktgen_running:
+                self.pktgen.stop()
             self.dut.stop()
 
-            with open(self.base_save_name, "a") as f:
-                f.write(f"{exp_str},{self.pktgen.get_rx_throughput()}\n")
+        return self.pktgen.get_rx_throughput()
 
-            step_progress.update(task_id, advance=1)
+    def measure_dut(self, save_file_name: Path) -> None:
+        """Measure the DUT while it is under load.
 
-        step_progress.update(task_id, visible=False)
+        Runs in a separate thread while `measure_point` watches the DUT and
+        the packet generator.
+        """
+        raise NotImplementedError
+
+
+class DutProfileExperiment(MeasureDutExperiment):
+    """Profile the DUT with a tool that saves its output on the DUT host.
+
+    The output of every point is kept on the DUT and collected in bulk at the
+    end of every run (see `ArtifactCollector`).
+
+    Args:
+        remote_dir: Directory of the DUT host where the output is saved.
+        **kwargs: Arguments for `MeasureDutExperiment`.
+    """
 
-    def measure_dut(self, save_file_name):
+    def __init__(
+        self,
+        name: str,
+        iterations: int,
+        base_save_name: Path,
+        remote_dir: str,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(name, iterations, base_save_name, **kwargs)
+        self.remote_dir = remote_dir
+        self.collector = ArtifactCollector.get(self.base_save_name.parent)
+
+    def run(self, step_progress: Progress, current_iter: int) -> None:
+        super().run(step_progress, current_iter)
+        collect_artifacts(self.collector, self.dut.log_file)
+
+    def profile_command(self, remote_file: str) -> str:
+        """Command that profiles the DUT and saves the output to
+        `remote_file`."""
         raise NotImplementedError
 
+    def measure_dut(self, save_file_name: Path) -> None:
+        hostname = self.dut.get_hostname()
+        remote_file = f"{self.remote_dir}/{save_file_name.name}"
+
+        cmd = host_pool.get(hostname).run_command(
+            f"mkdir -p {self.remote_dir} && "
+            f"{self.profile_command(remote_file)}",
+            print_command=self.dut.log_file,
+        )
+        cmd.watch(stdout=self.dut.log_file, stderr=self.dut.log_file)
+        if cmd.recv_exit_status() != 0:
+            raise RuntimeError(f"Failed to profile DUT ({self.name})")
+
+        self.collector.register(hostname, remote_file, save_file_name)
+
+
+class PcieBandwidthExperiment(DutProfileExperiment):
+    """Measure the PCIe bandwidth of the DUT with `pcm-iio`.
+
+    `pcm-iio` samples the traffic of every IIO stack of the DUT once per
+    second for `target_duration` seconds.
+
+    Args:
+        pcm_iio_cmd: Command to run `pcm-iio` on the DUT host.
+        **kwargs: Arguments for `DutProfileExperiment`.
+    """
+
+    def __init__(self, *args: Any, pcm_iio_cmd: str, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.pcm_iio_cmd = pcm_iio_cmd
+
+    def profile_command(self, remote_file: str) -> str:
+        return (
+            f"{self.pcm_iio_cmd} 1 -csv={remote_file} "
+            f"-i={self.target_duration}"
+        )
+
+
+class CacheProfileExperiment(DutProfileExperiment):
+    """Count the cache accesses and misses of the DUT cores with `perf stat`.
+
+    Counts `CACHE_EVENTS` on the cores running the DUT (cores 0 to
+    `nb_cores - 1`) for `target_duration` seconds. The output is saved in the
+    CSV format of `perf stat -x,`, with one line per event.
+
+    Args:
+        perf_stat_cmd: Command to run `perf stat` on the DUT host.
+        events: Events to count.
+        **kwargs: Arguments for `DutProfileExperiment`.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        perf_stat_cmd: str,
+        events: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.perf_stat_cmd = perf_stat_cmd
+        self.events = events or CACHE_EVENTS
+
+    def profile_command(self, remote_file: str) -> str:
+        last_core = self.dut.running_nb_cores - 1
+        return (
+            f"{self.perf_stat_cmd} -x, -e {','.join(self.events)} "
+            f"-C 0-{last_core} -o {remote_file} "
+            f"-- sleep {self.target_duration}"
+        )
+
 
 class ExperimentTracker:
     def __init__(self) -> None:
@@ -1076,7 +2291,50 @@ class ExperimentTracker:
     def add_experiment(self, experiment: Experiment) -> None:
         self.experiments.append(experiment)
 
+    def plan(self) -> None:
+        """Merge the points requested by all experiments.
+
+        Points requested by more than one experiment run once per iteration,
+        by the first experiment that reaches them, and their results are
+        attributed to every experiment that requested them.
+        """
+        requested_by: dict[tuple[Path, Hashable], list[str]] = {}
+        iterations: dict[tuple[Path, Hashable], int] = {}
+        nb_points = 0
+        for exp in self.experiments:
+            points = exp.points()
+            nb_points += len(points) * exp.iterations
+            for point in points:
+                names = requested_by.setdefault(point, [])
+                if exp.name not in names:
+                    names.append(exp.name)
+                iterations[point] = max(
+                    iterations.get(point, 0), exp.iterations
+                )
+
+        for exp in self.experiments:
+            exp.set_requested_by(requested_by)
+
+        nb_shared = nb_points - sum(iterations.values())
+        if nb_shared > 0:
+            console.log(
+                f"[cyan]{nb_points} points requested, {nb_shared} shared "
+                "by more than one experiment will run once per iteration"
+            )
+
+    def log_shared_points(self) -> None:
+        """Log how many points of each experiment were measured by others."""
+        for exp in self.experiments:
+            nb_shared = exp.nb_shared_points()
+            if nb_shared > 0:
+                console.log(
+                    f"[cyan]{exp.name}: {nb_shared} points measured by other "
+                    "experiments"
+                )
+
     def run_experiments(self):
+        self.plan()
+
         with Live(self.progress_group):
             nb_exps = len(self.experiments)
             overall_task_id = self.overall_progress.add_task("", total=nb_exps)
@@ -1097,6 +2355,8 @@ class ExperimentTracker:
                 overall_task_id, description="[bold green] All done!"
             )
 
+        self.log_shared_points()
+
 
 max_clock = 3100000
 
@@ -1106,73 +2366,239 @@ throughput_loads = [load * 1_000_000_000 for load in throughput_loads_gbps]
 pkt_sizes = [64, 128, 256, 512, 1024, 1518]
 
 
-async def load_dut_nic(
+# Bitstream synced to the remote repos and file where we record the bitstream
+# loaded on each FPGA (both relative to the enso path).
+BITSTREAM_FILE = "scripts/alt_ehipc2_hw.sof"
+LOADED_BITSTREAM_FILE = "scripts/.loaded_bitstream_{fpga_id}"
+
+
+def parse_bitstream_ids(output: str) -> dict[str, str]:
+    """Parse the bitstream IDs printed by the check in `load_enso_nic`.
+
+    Every line is labelled with its key (`bitstream: <hash> <boot_id>` and
+    `loaded: <hash> <boot_id>`). The loaded ID is empty if no bitstream was
+    recorded yet.
+
+    Raises:
+        RuntimeError: If a key is missing or the bitstream ID is incomplete.
+    """
+    ids = {}
+    for line in output.splitlines():
+        key, sep, value = line.partition(":")
+        if sep:
+            ids[key.strip()] = " ".join(value.split())
+
+    for key in ("bitstream", "loaded"):
+        if key not in ids:
+            raise RuntimeError(f"Missing {key} ID in output: {output!r}")
+
+    if len(ids["bitstream"].split()) != 2:
+        raise RuntimeError(f"Failed to get the bitstream ID: {output!r}")
+
+    return ids
+
+
+def load_enso_nic(
+    fpga_id: str,
+    enso_path: str,
+    hostname: str,
+    log_file: TextIO,
+    load_bitstream: bool,
+    skip_config: bool,
+    force_load_bitstream: bool = False,
+) -> EnsoNic:
+    """Create an EnsoNic, only loading the bitstream if needed.
+
+    After every load, we record the hash of the bitstream and the boot ID of
+    the host. The bitstream is only loaded again if the synced bitstream
+    changed or the host rebooted since then.
+
+    Args:
+        fpga_id: FPGA ID of the NIC.
+        enso_path: Path to the enso repo on the host.
+        hostname: Host name.
+        log_file: File to log the commands to.
+        load_bitstream: Load the bitstream if the FPGA is not running the
+          synced bitstream. If False, the bitstream is never loaded.
+        skip_config: Skip NIC configuration. Always skipped when the
+          bitstream is not loaded.
+        force_load_bitstream: Load the bitstream even if the FPGA is already
+          running it.
+    """
+    loaded_file = LOADED_BITSTREAM_FILE.format(fpga_id=fpga_id)
+    loaded_file = f"{enso_path}/{loaded_file}"
+    host = get_host(hostname)
+
+    if load_bitstream:
+        check_cmd = host.run_command(
+            f"echo bitstream: $(sha256sum {enso_path}/{BITSTREAM_FILE} | "
+            "cut -d ' ' -f 1) $(cat /proc/sys/kernel/random/boot_id); "
+            f"echo loaded: $(cat {loaded_file} 2>/dev/null)",
+            print_command=log_file,
+        )
+        output = check_cmd.watch(stdout=log_file, stderr=log_file)
+        ids = parse_bitstream_ids(output)
+        bitstream_id = ids["bitstream"]
+        loaded_bitstream_id = ids["loaded"]
+
+        if force_load_bitstream:
+            console.log(f"[cyan]Forcing bitstream load on {hostname}")
+        elif bitstream_id == loaded_bitstream_id:
+            console.log(
+                f"[cyan]FPGA {fpga_id} on {hostname} already runs the synced "
+                "bitstream, skipping load"
+            )
+            load_bitstream = False
+        else:
+            console.log(
+                f"[cyan]FPGA {fpga_id} on {hostname} runs a different "
+                "bitstream, loading it"
+            )
+
+    if load_bitstream:
+        # Remove the record first so that a failed load is retried.
+        host.run_command(f"rm -f {loaded_file}", print_command=log_file).watch(
+            stdout=log_file, stderr=log_file
+        )
+    else:
+        skip_config = True
+
+    nic = EnsoNic(
+        fpga_id,
+        enso_path,
+        host_name=hostname,
+        verbose=False,
+        log_file=log_file,
+        load_bitstream=load_bitstream,
+        skip_config=skip_config,
+    )
+
+    if load_bitstream:
+        host.run_command(
+            f"echo {bitstream_id} > {loaded_file}", print_command=log_file
+        ).watch(stdout=log_file, stderr=log_file)
+
+    return nic
+
+
+def load_dut_nic(
     dut_log_file: TextIO,
     load_bitstream: bool,
     skip_config: bool,
     config: dict[str, Any],
+    force_load_bitstream: bool = False,
 ) -> EnsoNic:
-    with console.status("Loading DUT NIC"):
-        dut_nic = EnsoNic(
-            config["devices"]["dut_fpga_id"],
-            config["paths"]["dut_enso_path"],
-            host_name=config["hosts"]["dut"],
-            verbose=False,
-            log_file=dut_log_file,
-            load_bitstream=load_bitstream,
-            skip_config=skip_config,
-        )
-        dut_nic.get_stats()
+    dut_nic = load_enso_nic(
+        config["devices"]["dut_fpga_id"],
+        config["paths"]["dut_enso_path"],
+        config["hosts"]["dut"],
+        dut_log_file,
+        load_bitstream,
+        skip_config,
+        force_load_bitstream,
+    )
+    dut_nic.get_stats()
 
     console.log("[green]Done loading DUT NIC")
     return dut_nic
 
 
-async def load_pktgen(
+def load_pktgen(
     pktgen_log_file: TextIO,
     load_bitstream: bool,
     skip_config: bool,
     fpga_id: str,
     pcie_addr: str,
     config: dict[str, Any],
+    force_load_bitstream: bool = False,
 ) -> EnsoGen:
-    with console.status("Loading Pktgen NIC"):
-        pktgen_nic = EnsoNic(
-            fpga_id,
-            config["paths"]["pktgen_enso_path"],
-            host_name=config["hosts"]["pktgen"],
-            verbose=False,
-            log_file=pktgen_log_file,
-            load_bitstream=load_bitstream,
-            skip_config=skip_config,
-        )
+    pktgen_nic = load_enso_nic(
+        fpga_id,
+        config["paths"]["pktgen_enso_path"],
+        config["hosts"]["pktgen"],
+        pktgen_log_file,
+        load_bitstream,
+        skip_config,
+        force_load_bitstream,
+    )
 
-        pktgen = EnsoGen(
-            pktgen_nic,
-            pcie_addr=pcie_addr,
-            log_file=pktgen_log_file,
-        )
+    pktgen = EnsoGen(
+        pktgen_nic,
+        pcie_addr=pcie_addr,
+        log_file=pktgen_log_file,
+    )
 
     console.log("[green]Done loading Pktgen NIC")
     return pktgen
 
 
-async def run_setup(dut_log_file: TextIO, config: dict[str, Any]) -> None:
-    with console.status("Running setup"):
-        client = get_host_from_hostname(config["hosts"]["dut"])
-        setup_cmd = client.run_command(
-            (
-                f"{config['paths']['dut_setup_cmd']} "
-                f"{config['devices']['dpdk_dut_pcie']}"
-            ),
-            pty=True,
-            print_command=dut_log_file,
-        )
-        setup_cmd.watch(stdout=dut_log_file, stderr=dut_log_file)
-        del client
+def run_setup(dut_log_file: TextIO, config: dict[str, Any]) -> None:
+    client = get_host(config["hosts"]["dut"])
+    setup_cmd = client.run_command(
+        (
+            f"{config['paths']['dut_setup_cmd']} "
+            f"{config['devices']['dpdk_dut_pcie']}"
+        ),
+        pty=True,
+        print_command=dut_log_file,
+    )
+    output = setup_cmd.watch(stdout=dut_log_file, stderr=dut_log_file)
+    log_build_report(config["hosts"]["dut"], output)
     console.log("[green]Done running setup")
 
 
+async def bring_up_hosts(
+    steps: dict[str, Callable[[], Any]]
+) -> dict[str, Any]:
+    """Run the bring-up steps of different hosts concurrently.
+
+    Loading bitstreams and configuring NICs block for minutes, so every step
+    runs in its own thread. Steps for the same host must be chained in a
+    single function, since they run in no particular order.
+
+    Args:
+        steps: Function to run for each host (e.g., "DUT", "Pktgen").
+
+    Returns:
+        Value returned by the function of each host.
+
+    Raises:
+        Exception: The exception raised by the first host that failed. We
+          only raise after all steps finish so that no host is left in the
+          middle of its bring-up.
+    """
+    pending = list(steps)
+
+    def status_message() -> str:
+        return f"Bringing up {', '.join(pending)}"
+
+    status = console.status(status_message())
+
+    async def run_step(name: str, step: Callable[[], Any]) -> Any:
+        try:
+            return await asyncio.to_thread(step)
+        finally:
+            pending.remove(name)
+            status.update(status_message())
+
+    with status:
+        results = await asyncio.gather(
+            *(run_step(name, step) for name, step in steps.items()),
+            return_exceptions=True,
+        )
+
+    errors = []
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            console.log(f"[red]{name} bring-up failed: {result}")
+            errors.append(result)
+
+    if len(errors) > 0:
+        raise errors[0]
+
+    return dict(zip(steps, results))
+
+
 async def enso_experiments(
     data_dir: Path,
     load_bitstream: bool,
@@ -1180,29 +2606,52 @@ async def enso_experiments(
     dut_log_file: TextIO,
     pktgen_log_file: TextIO,
     config: dict[str, Any],
+    throughput_args: Optional[dict[str, Any]] = None,
+    latency_args: Optional[dict[str, Any]] = None,
+    testbed: Optional["SimTestbed"] = None,
+    force_load_bitstream: bool = False,
+    probe_ready: bool = False,
 ) -> list[Experiment]:
     skip_config = not load_bitstream
+    throughput_args = throughput_args or {}
+    latency_args = latency_args or {}
 
-    load_dut_nic_task = asyncio.create_task(
-        load_dut_nic(dut_log_file, load_bitstream, skip_config, config)
-    )
-    load_pktgen_task = asyncio.create_task(
-        load_pktgen(
-            pktgen_log_file,
-            load_bitstream,
-            skip_config,
-            config["devices"]["enso_pktgen_fpga_id"],
-            config["devices"]["enso_pktgen_pcie"],
-            config,
-        )
-    )
-
-    dut_nic = await load_dut_nic_task
+    if testbed is not None:
+        dut_nic = testbed.dut_nic
+        pktgen = testbed.pktgen
+    else:
 
-    run_setup_task = asyncio.create_task(run_setup(dut_log_file, config))
+        def bring_up_dut() -> EnsoNic:
+            # Setup must only run after the DUT NIC is loaded.
+            dut_nic = load_dut_nic(
+                dut_log_file,
+                load_bitstream,
+                skip_config,
+                config,
+                force_load_bitstream,
+            )
+            run_setup(dut_log_file, config)
+            return dut_nic
+
+        hosts = await bring_up_hosts(
+            {
+                "DUT": bring_up_dut,
+                "Pktgen": lambda: load_pktgen(
+                    pktgen_log_file,
+                    load_bitstream,
+                    skip_config,
+                    config["devices"]["enso_pktgen_fpga_id"],
+                    config["devices"]["enso_pktgen_pcie"],
+                    config,
+                    force_load_bitstream,
+                ),
+            }
+        )
+        dut_nic = hosts["DUT"]
+        pktgen = hosts["Pktgen"]
 
-    pktgen = await load_pktgen_task
-    await run_setup_task
+    # The echo application does not signal when it is ready.
+    ready_probe = EnsoGenProbe(pktgen) if probe_ready else None
 
     experiments: list[Experiment] = [
         ThroughputExperiment(
@@ -1227,6 +2676,7 @@ async def enso_experiments(
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
             pktgen_args=dict(nb_src=1, nb_dst=1048576),
+            **throughput_args,
         ),
         ThroughputExperiment(
             "Ensō Maglev throughput (Cached)",
@@ -1248,6 +2698,7 @@ async def enso_experiments(
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
             pktgen_args=dict(nb_src=1, nb_dst=16),
+            **throughput_args,
         ),
         LatencyExperiment(
             "Ensō RTT vs. load",
@@ -1258,6 +2709,7 @@ async def enso_experiments(
                 config["devices"]["enso_dut_pcie"],
                 config=config,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
             ),
             pktgen=pktgen,
             pkt_sizes=[64],
@@ -1266,6 +2718,7 @@ async def enso_experiments(
             cpu_clocks=[max_clock],
             throughput_loads=throughput_loads,
             always_save=True,
+            **latency_args,
         ),
         LatencyExperiment(
             "Ensō (prefetching) RTT vs. load",
@@ -1276,6 +2729,7 @@ async def enso_experiments(
                 config["devices"]["enso_dut_pcie"],
                 config=config,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
                 cmd=config["paths"]["dut_enso_echo_prefetch_cmd"],
             ),
             pktgen=pktgen,
@@ -1285,6 +2739,7 @@ async def enso_experiments(
             cpu_clocks=[max_clock],
             throughput_loads=throughput_loads,
             always_save=True,
+            **latency_args,
         ),
         LatencyExperiment(
             "Ensō (notification per packet) RTT vs. load",
@@ -1296,6 +2751,7 @@ async def enso_experiments(
                 config=config,
                 notif_per_pkt=True,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
             ),
             pktgen=pktgen,
             pkt_sizes=[64],
@@ -1304,6 +2760,7 @@ async def enso_experiments(
             cpu_clocks=[max_clock],
             throughput_loads=throughput_loads,
             always_save=True,
+            **latency_args,
         ),
         ThroughputExperiment(
             "Ensō throughput vs. cores",
@@ -1314,6 +2771,7 @@ async def enso_experiments(
                 config["devices"]["enso_dut_pcie"],
                 config=config,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
             ),
             pktgen=pktgen,
             pkt_sizes=[64],
@@ -1323,6 +2781,7 @@ async def enso_experiments(
             nb_cycles=[0],
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
+            **throughput_args,
         ),
         ThroughputExperiment(
             "Ensō throughput vs. packet size",
@@ -1333,6 +2792,7 @@ async def enso_experiments(
                 config["devices"]["enso_dut_pcie"],
                 config=config,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
             ),
             pktgen=pktgen,
             pkt_sizes=pkt_sizes,
@@ -1342,6 +2802,7 @@ async def enso_experiments(
             nb_cycles=[0],
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
+            **throughput_args,
         ),
         ThroughputExperiment(
             "Ensō throughput vs. ensō pipes (1 core)",
@@ -1352,6 +2813,7 @@ async def enso_experiments(
                 config["devices"]["enso_dut_pcie"],
                 config=config,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
             ),
             pktgen=pktgen,
             pkt_sizes=[64],
@@ -1361,6 +2823,7 @@ async def enso_experiments(
             nb_cycles=[0],
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
+            **throughput_args,
         ),
         ThroughputExperiment(
             "Ensō throughput vs. ensō pipes (2 cores)",
@@ -1371,6 +2834,7 @@ async def enso_experiments(
                 config["devices"]["enso_dut_pcie"],
                 config=config,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
             ),
             pktgen=pktgen,
             pkt_sizes=[64],
@@ -1380,6 +2844,7 @@ async def enso_experiments(
             nb_cycles=[0],
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
+            **throughput_args,
         ),
         ThroughputExperiment(
             "Ensō throughput vs. ensō pipes (4 cores)",
@@ -1390,6 +2855,7 @@ async def enso_experiments(
                 config["devices"]["enso_dut_pcie"],
                 config=config,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
             ),
             pktgen=pktgen,
             pkt_sizes=[64],
@@ -1399,6 +2865,7 @@ async def enso_experiments(
             nb_cycles=[0],
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
+            **throughput_args,
         ),
         ThroughputExperiment(
             "Ensō throughput vs. ensō pipes (8 cores)",
@@ -1409,6 +2876,7 @@ async def enso_experiments(
                 config["devices"]["enso_dut_pcie"],
                 config=config,
                 log_file=dut_log_file,
+                ready_probe=ready_probe,
             ),
             pktgen=pktgen,
             pkt_sizes=[64],
@@ -1418,6 +2886,27 @@ async def enso_experiments(
             nb_cycles=[0],
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
+            **throughput_args,
+        ),
+        PcieBandwidthExperiment(
+            "Ensō PCIe bandwidth",
+            iterations=1,
+            base_save_name=data_dir / Path("enso_pcie_bw.csv"),
+            remote_dir=config["paths"]["dut_artifacts_path"],
+            pcm_iio_cmd=config["paths"]["pcm_iio_cmd"],
+            dut=EnsoEchoDut(
+                dut_nic,
+                config["devices"]["enso_dut_pcie"],
+                config=config,
+                log_file=dut_log_file,
+                ready_probe=ready_probe,
+            ),
+            pktgen=pktgen,
+            pkt_sizes=[64],
+            nb_cores=[1, 2, 4, 8],
+            queues_per_core=[2],
+            cpu_clocks=[max_clock],
+            loads=[100_000_000_000],
         ),
     ]
 
@@ -1432,24 +2921,33 @@ async def dpdk_experiments(
     dut_log_file: TextIO,
     pktgen_log_file: TextIO,
     config: dict[str, Any],
+    throughput_args: Optional[dict[str, Any]] = None,
+    latency_args: Optional[dict[str, Any]] = None,
+    testbed: Optional["SimTestbed"] = None,
+    force_load_bitstream: bool = False,
 ) -> list[Experiment]:
     skip_config = not load_bitstream
+    throughput_args = throughput_args or {}
+    latency_args = latency_args or {}
 
-    run_setup_task = asyncio.create_task(run_setup(dut_log_file, config))
-
-    load_pktgen_task = asyncio.create_task(
-        load_pktgen(
-            pktgen_log_file,
-            load_bitstream,
-            skip_config,
-            config["devices"]["dpdk_pktgen_fpga_id"],
-            config["devices"]["dpdk_pktgen_pcie"],
-            config,
+    if testbed is not None:
+        pktgen = testbed.pktgen
+    else:
+        hosts = await bring_up_hosts(
+            {
+                "DUT": lambda: run_setup(dut_log_file, config),
+                "Pktgen": lambda: load_pktgen(
+                    pktgen_log_file,
+                    load_bitstream,
+                    skip_config,
+                    config["devices"]["dpdk_pktgen_fpga_id"],
+                    config["devices"]["dpdk_pktgen_pcie"],
+                    config,
+                    force_load_bitstream,
+                ),
+            }
         )
-    )
-
-    await run_setup_task
-    pktgen = await load_pktgen_task
+        pktgen = hosts["Pktgen"]
 
     # We use a fixed large number of flows to make good use of RSS. This is
     # generous to DPDK since it ensures good distribution among queues with
@@ -1480,6 +2978,7 @@ async def dpdk_experiments(
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
             pktgen_args=dict(nb_src=1, nb_dst=1048576),
+            **throughput_args,
         ),
         ThroughputExperiment(
             "DPDK Maglev throughput (Cached)",
@@ -1504,6 +3003,7 @@ async def dpdk_experiments(
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
             pktgen_args=dict(nb_src=1, nb_dst=16),
+            **throughput_args,
         ),
         LatencyExperiment(
             "DPDK RTT vs. load",
@@ -1523,6 +3023,7 @@ async def dpdk_experiments(
             throughput_loads=throughput_loads,
             always_save=True,
             pktgen_args=dict(nb_src=1, nb_dst=nb_dst),
+            **latency_args,
         ),
         ThroughputExperiment(
             "DPDK throughput vs. cores",
@@ -1543,6 +3044,47 @@ async def dpdk_experiments(
             ddio_ways=[config["extra"]["default_nb_ddio_ways"]],
             precision=100_000_000,
             pktgen_args=dict(nb_src=1, nb_dst=nb_dst),
+            **throughput_args,
+        ),
+        PcieBandwidthExperiment(
+            "DPDK PCIe bandwidth",
+            iterations=1,
+            base_save_name=data_dir / Path(f"dpdk_{dpdk_type}_pcie_bw.csv"),
+            remote_dir=config["paths"]["dut_artifacts_path"],
+            pcm_iio_cmd=config["paths"]["pcm_iio_cmd"],
+            dut=DpdkEchoDut(
+                config["hosts"]["dut"],
+                config["devices"]["dpdk_dut_pcie"],
+                config=config,
+                log_file=dut_log_file,
+            ),
+            pktgen=pktgen,
+            pkt_sizes=[64],
+            nb_cores=[1, 2, 4, 8],
+            queues_per_core=[1],
+            cpu_clocks=[max_clock],
+            loads=[100_000_000_000],
+            pktgen_args=dict(nb_src=1, nb_dst=nb_dst),
+        ),
+        CacheProfileExperiment(
+            "DPDK cache profile",
+            iterations=1,
+            base_save_name=data_dir / Path(f"dpdk_{dpdk_type}_cache.csv"),
+            remote_dir=config["paths"]["dut_artifacts_path"],
+            perf_stat_cmd=config["paths"]["perf_stat_cmd"],
+            dut=DpdkEchoDut(
+                config["hosts"]["dut"],
+                config["devices"]["dpdk_dut_pcie"],
+                config=config,
+                log_file=dut_log_file,
+            ),
+            pktgen=pktgen,
+            pkt_sizes=[64],
+            nb_cores=[2],
+            queues_per_core=[1],
+            cpu_clocks=[max_clock],
+            loads=[100_000_000_000],
+            pktgen_args=dict(nb_src=1, nb_dst=nb_dst),
         ),
     ]
 
@@ -1573,7 +3115,15 @@ async def set_remote_repos(
     "--load-bitstream/--no-load-bitstream",
     default=True,
     show_default=True,
-    help="Enable/Disable FPGA bitstream reload.",
+    help="Enable/Disable FPGA bitstream reload. The bitstream is only "
+    "reloaded if the FPGA is not already running the synced bitstream.",
+)
+@click.option(
+    "--force-load-bitstream",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Reload the FPGA bitstream even if it is already loaded.",
 )
 @click.option(
     "--dpdk",
@@ -1592,7 +3142,23 @@ async def set_remote_repos(
     type=int,
     default=1,
     show_default=True,
-    help="Number of iterations to run each experiment.",
+    help="Number of iterations to run each experiment. Maximum number of "
+    "iterations when using --ci-width.",
+)
+@click.option(
+    "--ci-width",
+    type=float,
+    default=None,
+    help="Stop running a throughput point once the confidence interval of "
+    "its median is narrower than this fraction of the median (e.g., 0.02).",
+)
+@click.option(
+    "--min-iters",
+    type=int,
+    default=6,
+    show_default=True,
+    help="Minimum number of iterations of each throughput point when using "
+    "--ci-width. At least 6 are needed for a 95% confidence interval.",
 )
 @click.option(
     "--config-file",
@@ -1608,6 +3174,85 @@ async def set_remote_repos(
     show_default=True,
     help="Enable/Disable remote repos sync.",
 )
+@click.option(
+    "--adaptive-trials/--fixed-trials",
+    default=False,
+    show_default=True,
+    help="Use short trials when searching for the zero-loss throughput far "
+    "from the loss boundary.",
+)
+@click.option(
+    "--min-trial-pkts",
+    type=int,
+    default=100_000,
+    show_default=True,
+    help="Minimum number of packets in a short throughput trial.",
+)
+@click.option(
+    "--loss-tolerance",
+    "-l",
+    type=float,
+    multiple=True,
+    help="Also measure the throughput with at most this loss ratio (e.g., "
+    "1e-4) in addition to the zero-loss throughput. May be repeated.",
+)
+@click.option(
+    "--ramp-search",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Estimate the zero-loss throughput with a staircase of short trials "
+    "at increasing rates (up to 10 separate trials) and confirm it with a "
+    "short bisection. Useful for wide exploratory sweeps.",
+)
+@click.option(
+    "--reuse-dut/--restart-dut",
+    default=False,
+    show_default=True,
+    help="Keep the DUT running for all the loads of a latency experiment "
+    "instead of restarting it for every load.",
+)
+@click.option(
+    "--refine-loads",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Number of extra loads that each latency experiment configuration "
+    "may add to the load grid, where the p99 RTT changes the most or where "
+    "EnsōGen first loses packets.",
+)
+@click.option(
+    "--remote-hist-summary",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Summarize RTT histograms on the packet generator host after every "
+    "load and only collect the raw histograms at the end of each latency "
+    "experiment.",
+)
+@click.option(
+    "--simulate",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Run the experiments against a simulated testbed instead of the "
+    "DUT and packet generator machines. Implies --no-sync.",
+)
+@click.option(
+    "--probe-ready",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Check that the Ensō echo DUT is ready by sending it probe packets "
+    "instead of waiting for its first stats line.",
+)
+@click.option(
+    "--agent/--no-agent",
+    default=False,
+    show_default=True,
+    help="Run DUT and pktgen commands through a long-lived agent on each host "
+    "(see `remote_agent.py`) instead of a new SSH channel per command.",
+)
 @click.option(
     "--setup-only",
     is_flag=True,
@@ -1618,15 +3263,43 @@ async def set_remote_repos(
 def main(
     data_dir,
     load_bitstream,
+    force_load_bitstream,
     dpdk,
     filter,
     iters,
+    ci_width,
+    min_iters,
     config_file,
     sync,
+    adaptive_trials,
+    min_trial_pkts,
+    loss_tolerance,
+    ramp_search,
+    reuse_dut,
+    refine_loads,
+    remote_hist_summary,
+    simulate,
+    probe_ready,
+    agent,
     setup_only,
 ):
     data_dir = Path(data_dir)
 
+    if ci_width is not None:
+        # Otherwise no point could ever converge.
+        if min_iters < min_samples():
+            raise click.BadParameter(
+                f"must be at least {min_samples()} for a 95% confidence "
+                "interval",
+                param_hint="--min-iters",
+            )
+        if iters < min_iters:
+            raise click.BadParameter(
+                f"must be at least --min-iters ({min_iters}) when using "
+                "--ci-width",
+                param_hint="--iters",
+            )
+
     data_dir.mkdir(parents=True, exist_ok=True)
 
     config = set_constants(config_file)
@@ -1634,6 +3307,18 @@ def main(
     dut_log_file = open(config["logs"]["dut_log"], "a")
     pktgen_log_file = open(config["logs"]["pktgen_log"], "a")
 
+    testbed = None
+    if simulate:
+        from sim_testbed import SimTestbed
+
+        testbed = SimTestbed(config, log_file=pktgen_log_file)
+        host_pool.set_host(config["hosts"]["dut"], testbed.dut_host)
+
+        # Files of the simulated DUT are local.
+        config["paths"]["dut_artifacts_path"] = testbed.tmp_dir.name
+        ArtifactCollector.get(data_dir).set_local_host(config["hosts"]["dut"])
+        sync = False
+
     if sync:
         asyncio.run(set_remote_repos(dut_log_file, pktgen_log_file, config))
         console.log("[green]Done setting up remote repos")
@@ -1643,6 +3328,37 @@ def main(
     if setup_only:
         return
 
+    if agent and testbed is None:
+        # Agents are synced with the repos, so they may only start now.
+        for role in ["dut", "pktgen"]:
+            hostname = config["hosts"][role]
+            agent_cmd = config["paths"][f"{role}_agent_cmd"]
+            host_pool.set_host(hostname, AgentHost(hostname, agent_cmd))
+
+    throughput_args = {
+        "loss_tolerances": [0.0] + sorted(set(loss_tolerance) - {0.0}),
+        "search_args": {
+            "adaptive_duration": adaptive_trials,
+            "min_trial_pkts": min_trial_pkts,
+            "ramp": ramp_search,
+        },
+    }
+    if ci_width is not None:
+        throughput_args["adaptive_iterations"] = AdaptiveIterations(
+            ci_width, min_iters
+        )
+
+    latency_args = {"reuse_dut": reuse_dut}
+    if refine_loads > 0:
+        latency_args["load_refinement"] = LoadRefinement(refine_loads)
+    if remote_hist_summary:
+        hist_summary_cmd = config["paths"]["pktgen_hist_summary_cmd"]
+        if testbed is not None:
+            # Simulated histograms are saved locally.
+            script = Path(__file__).resolve().parent / "hist_summary.py"
+            hist_summary_cmd = f"{sys.executable} {script}"
+        latency_args["hist_summary_cmd"] = hist_summary_cmd
+
     if dpdk is not None:
         experiments = asyncio.run(
             dpdk_experiments(
@@ -1653,6 +3369,10 @@ def main(
                 dut_log_file,
                 pktgen_log_file,
                 config,
+                throughput_args=throughput_args,
+                latency_args=latency_args,
+                testbed=testbed,
+                force_load_bitstream=force_load_bitstream,
             )
         )
     else:
@@ -1664,6 +3384,11 @@ def main(
                 dut_log_file,
                 pktgen_log_file,
                 config,
+                throughput_args=throughput_args,
+                latency_args=latency_args,
+                testbed=testbed,
+                force_load_bitstream=force_load_bitstream,
+                probe_ready=probe_ready,
             )
         )
 
@@ -1678,7 +3403,34 @@ def main(
                 continue
         exp_tracker.add_experiment(exp)
 
-    exp_tracker.run_experiments()
+    try:
+        exp_tracker.run_experiments()
+    finally:
+        # Clocks, DDIO and NIC settings are kept between experiments and only
+        # restored once all experiments are done.
+        restore_host_defaults()
+        collect_artifacts(ArtifactCollector.get(data_dir), pktgen_log_file)
+        host_pool.close()
+
+    if testbed is not None:
+        console.log(
+            f"[cyan]Simulated testbed time: {testbed.virtual_time:.0f}s "
+            f"({testbed.dut_host.nb_commands} DUT commands)"
+        )
+
+    for hostname, host_state in host_states.items():
+        settle_times = host_state.clock_settle_times
+        if settle_times:
+            console.log(
+                f"[cyan]{hostname}: CPU frequency settle time "
+                f"{statistics.median(settle_times):.3f}s (median), "
+                f"{max(settle_times):.3f}s (max) over {len(settle_times)} "
+                "changes"
+            )
+
+    # How much of the campaign was spent on SSH round trips.
+    for hostname, stats in host_pool.stats.items():
+        console.log(f"[cyan]{hostname}: {stats.summary()}")
 
 
 if __name__ == "__main__":
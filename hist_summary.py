@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# Summary of an RTT histogram saved by EnsōGen.
+#
+# Runs on the packet generator host right after every latency point, so that
+# only the summary has to be transferred on the critical path. The raw
+# histogram may be moved to a pending directory to be collected later, in
+# bulk, with the histograms of other points.
+#
+# Only depends on the standard library, like `remote_agent.py`.
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+# Percentiles included in the summary.
+PERCENTILES = {"p50": 0.5, "p99": 0.99, "p99_9": 0.999}
+
+# Relative width of the bins of the compacted histogram.
+COMPACT_PRECISION = 0.01
+
+Histogram = list[tuple[float, float]]
+
+
+def summary_path(hist_file: Path) -> Path:
+    """Where the summary of a histogram is saved locally."""
+    return hist_file.with_suffix(".summary.json")
+
+
+def read_histogram(hist_file: Path) -> Histogram:
+    """Read a histogram with one `rtt,count` line per bin, sorted by RTT."""
+    bins = []
+    with open(hist_file, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2:
+                bins.append((float(row[0]), float(row[1])))
+
+    if len(bins) == 0:
+        raise ValueError(f"Empty histogram: {hist_file}")
+
+    bins.sort()
+    return bins
+
+
+def percentile(bins: Histogram, fraction: float) -> float:
+    """RTT of the first bin where the cumulative count reaches `fraction` of
+    the total (same as `paper_plots.py`)."""
+    total = sum(count for _, count in bins)
+    cumulative = 0.0
+    for rtt, count in bins:
+        cumulative += count
+        if cumulative >= fraction * total:
+            return rtt
+    return bins[-1][0]
+
+
+def compact(
+    bins: Histogram, precision: float = COMPACT_PRECISION
+) -> Histogram:
+    """Merge bins whose RTTs are within `precision` of each other.
+
+    Bins are grouped in log-spaced buckets and each bucket is represented by
+    the mean RTT of its packets. Preserves the shape of the distribution up to
+    `precision` with a number of bins that only grows with the range of RTTs.
+    """
+    buckets: dict[Optional[int], list[float]] = {}
+    for rtt, count in bins:
+        if count == 0:
+            continue
+        if rtt <= 0:
+            key = None
+        else:
+            key = math.floor(math.log(rtt) / math.log1p(precision))
+        bucket = buckets.setdefault(key, [0.0, 0.0])
+        bucket[0] += rtt * count
+        bucket[1] += count
+
+    return sorted(
+        (weighted_rtt / count, count)
+        for weighted_rtt, count in buckets.values()
+    )
+
+
+def summarize(bins: Histogram) -> Optional[dict[str, Any]]:
+    """Summary of a histogram, in the same unit as the histogram.
+
+    Returns:
+        Summary of the histogram or None if it has no packets.
+    """
+    total = sum(count for _, count in bins)
+    if total == 0:
+        return None
+
+    summary: dict[str, Any] = {
+        "count": total,
+        "mean": sum(rtt * count for rtt, count in bins) / total,
+    }
+    for name, fraction in PERCENTILES.items():
+        summary[name] = percentile(bins, fraction)
+    summary["hist"] = compact(bins)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Summarize an RTT histogram saved by EnsōGen. Prints the "
+        "summary as JSON, or null if the histogram has no packets."
+    )
+    parser.add_argument("hist_file", help="Histogram saved by EnsōGen.")
+    parser.add_argument(
+        "--keep",
+        help="Move the histogram to this path once it is summarized.",
+    )
+    args = parser.parse_args()
+
+    summary = summarize(read_histogram(Path(args.hist_file)))
+
+    if summary is not None and args.keep is not None:
+        Path(args.keep).parent.mkdir(parents=True, exist_ok=True)
+        os.replace(args.hist_file, args.keep)
+
+    json.dump(summary, sys.stdout)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
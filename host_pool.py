@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Connections to the hosts used in the experiments.
+
+import statistics
+import threading
+import time
+from typing import Any, Union
+
+from netexp.helpers import LocalHost, RemoteHost, get_host_from_hostname
+
+from remote_agent import AgentHost
+
+
+class CommandStats:
+    """Latency of the commands run on a host.
+
+    Attributes:
+        open_latencies: Time to open a channel and start each command (in
+          seconds). This is pure SSH overhead.
+        round_trips: Time from starting each command until its exit status
+          was received (in seconds). Only recorded for commands whose exit
+          status is checked.
+    """
+
+    def __init__(self) -> None:
+        self.open_latencies: list[float] = []
+        self.round_trips: list[float] = []
+        self.lock = threading.Lock()
+
+    def add_open_latency(self, latency: float) -> None:
+        with self.lock:
+            self.open_latencies.append(latency)
+
+    def add_round_trip(self, round_trip: float) -> None:
+        with self.lock:
+            self.round_trips.append(round_trip)
+
+    def summary(self) -> str:
+        with self.lock:
+            nb_commands = len(self.open_latencies)
+            if nb_commands == 0:
+                return "no commands"
+
+            open_ms = statistics.median(self.open_latencies) * 1000
+            summary = (
+                f"{nb_commands} commands, open latency {open_ms:.1f}ms "
+                f"median ({sum(self.open_latencies):.1f}s total)"
+            )
+            if len(self.round_trips) > 0:
+                round_trip_ms = statistics.median(self.round_trips) * 1000
+                summary += f", round trip {round_trip_ms:.1f}ms median"
+            return summary
+
+
+class TimedCommand:
+    """Command that records its round trip once its exit status is received.
+
+    Other attributes are forwarded to the wrapped command.
+    """
+
+    def __init__(
+        self, command: Any, start_time: float, stats: CommandStats
+    ) -> None:
+        self.command = command
+        self.start_time = start_time
+        self.stats = stats
+        self.recorded = False
+
+    def recv_exit_status(self) -> int:
+        status = self.command.recv_exit_status()
+        if not self.recorded:
+            self.stats.add_round_trip(time.perf_counter() - self.start_time)
+            self.recorded = True
+        return status
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.command, name)
+
+
+class PooledHost:
+    """Host that is shared by all users of the pool.
+
+    Remote hosts keep a single SSH connection open and open a new channel
+    over it for every command.
+
+    Args:
+        host: Host to run the commands on.
+        stats: Where to record the latency of the commands.
+    """
+
+    def __init__(self, host: Any, stats: CommandStats) -> None:
+        self.host = host
+        self.stats = stats
+
+    def run_command(self, *args: Any, **kwargs: Any) -> TimedCommand:
+        start_time = time.perf_counter()
+        command = self.host.run_command(*args, **kwargs)
+        self.stats.add_open_latency(time.perf_counter() - start_time)
+        return TimedCommand(command, start_time, self.stats)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.host, name)
+
+
+class HostPool:
+    """Hosts used in the campaign, keyed by hostname.
+
+    Use `get` instead of `get_host_from_hostname` so that all remote commands
+    reuse the same connection to each host throughout the campaign.
+    """
+
+    def __init__(self) -> None:
+        self.hosts: dict[str, PooledHost] = {}
+        self.stats: dict[str, CommandStats] = {}
+        self.lock = threading.Lock()
+
+    def get(self, hostname: str) -> PooledHost:
+        with self.lock:
+            if hostname not in self.hosts:
+                self._add(hostname, get_host_from_hostname(hostname))
+            return self.hosts[hostname]
+
+    def set_host(
+        self, hostname: str, host: Union[LocalHost, RemoteHost, Any]
+    ) -> None:
+        """Use `host` instead of connecting to `hostname` (e.g., simulated
+        hosts, see `sim_testbed.py`)."""
+        with self.lock:
+            self._add(hostname, host)
+
+    def _add(self, hostname: str, host: Any) -> None:
+        stats = self.stats.setdefault(hostname, CommandStats())
+        self.hosts[hostname] = PooledHost(host, stats)
+
+    def close(self) -> None:
+        """Close the connections to all hosts."""
+        with self.lock:
+            for pooled_host in self.hosts.values():
+                if isinstance(pooled_host.host, RemoteHost):
+                    del pooled_host.host.ssh_client
+                elif isinstance(pooled_host.host, AgentHost):
+                    pooled_host.host.close()
+            self.hosts.clear()
+
+
+host_pool = HostPool()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# Hardware state applied to the hosts used in the experiments.
+
+from typing import Any, Callable, Optional
+
+
+class HostState:
+    """Hardware state applied to a host.
+
+    There is a single instance per hostname (see `get_host_state`) that is
+    shared by all the DUTs running on that host. Settings applied by one
+    experiment are therefore not applied again by the next one.
+
+    Settings that differ from the host defaults register how to restore them
+    (see `set_restore`). They are only restored at the end of the campaign
+    (see `restore_host_defaults`).
+
+    Args:
+        hostname: Host name.
+
+    Attributes:
+        core_clocks: CPU frequency applied to each core (in kHz).
+        ddio_ways: Number of DDIO ways applied to each PCIe bus.
+        nic_modes: NIC settings (e.g., `desc_per_pkt`, `fallback_queues`).
+        clock_settle_times: Time it took for the CPU frequency to settle
+          after each change (in seconds).
+    """
+
+    def __init__(self, hostname: str) -> None:
+        self.hostname = hostname
+        self.core_clocks: dict[int, int] = {}
+        self.ddio_ways: dict[str, int] = {}
+        self.nic_modes: dict[str, Any] = {}
+        self.clock_settle_times: list[float] = []
+        self.restore_funcs: dict[str, Callable[[], None]] = {}
+
+    def set_restore(
+        self, setting: str, restore_func: Optional[Callable[[], None]]
+    ) -> None:
+        """Set how to restore `setting` to its default.
+
+        Args:
+            setting: Name of the setting.
+            restore_func: Function that restores the setting. None if the
+              setting is already at its default.
+        """
+        if restore_func is None:
+            self.restore_funcs.pop(setting, None)
+        else:
+            self.restore_funcs[setting] = restore_func
+
+    def restore_defaults(self) -> None:
+        for restore_func in self.restore_funcs.values():
+            restore_func()
+
+        self.restore_funcs.clear()
+        self.core_clocks.clear()
+        self.ddio_ways.clear()
+        self.nic_modes.clear()
+
+
+host_states: dict[str, HostState] = {}
+
+
+def get_host_state(hostname: str) -> HostState:
+    if hostname not in host_states:
+        host_states[hostname] = HostState(hostname)
+    return host_states[hostname]
+
+
+def restore_host_defaults() -> None:
+    """Restore the default hardware settings of all hosts."""
+    for host_state in host_states.values():
+        host_state.restore_defaults()
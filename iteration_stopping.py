@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Statistical early stopping for the iterations of an experiment.
+
+import math
+import statistics
+from typing import Optional
+
+
+def median_ci(
+    samples: list[float], confidence: float = 0.95
+) -> Optional[tuple[float, float]]:
+    """Confidence interval of the median of `samples`.
+
+    Uses order statistics, which makes no assumption about the distribution
+    of the samples. The interval is [x_(k), x_(n-k+1)] for the largest k such
+    that the median is outside of it with probability at most
+    `1 - confidence`.
+
+    Args:
+        samples: Measurements.
+        confidence: Minimum coverage of the interval.
+
+    Returns:
+        Lower and upper bounds of the interval, or None if there are too few
+        samples for the requested confidence (e.g., fewer than 6 samples for
+        95% confidence).
+    """
+    n = len(samples)
+    alpha = 1 - confidence
+
+    # Largest k with 2 * P(Binomial(n, 0.5) <= k - 1) <= alpha.
+    k = 0
+    tail = 0.0
+    while k < n // 2:
+        tail += math.comb(n, k) / 2**n
+        if 2 * tail > alpha:
+            break
+        k += 1
+
+    if k == 0:
+        return None
+
+    sorted_samples = sorted(samples)
+    return (sorted_samples[k - 1], sorted_samples[n - k])
+
+
+def min_samples(confidence: float = 0.95) -> int:
+    """Smallest number of samples for which `median_ci` gives an interval
+    (e.g., 6 for 95% confidence)."""
+    n = 1
+    while 2 / 2**n > 1 - confidence:
+        n += 1
+    return n
+
+
+def relative_ci_width(samples: list[float], confidence: float = 0.95) -> float:
+    """Width of the confidence interval of the median of `samples`, relative
+    to the median. Infinite if there are too few samples."""
+    ci = median_ci(samples, confidence)
+    if ci is None:
+        return math.inf
+
+    low, high = ci
+    median = statistics.median(samples)
+    if high == low:
+        return 0.0
+    if median == 0:
+        return math.inf
+    return (high - low) / abs(median)
+
+
+class AdaptiveIterations:
+    """Decides when a point ran enough iterations.
+
+    A point keeps running until the confidence interval of its median is
+    narrower than `max_ci_width` (relative to the median), as long as it ran
+    at least `min_iterations` times. The maximum number of iterations is the
+    number of iterations of the experiment. Points with little variance
+    therefore stop early, and the remaining iterations only go to the points
+    that still have a wide interval.
+
+    Args:
+        max_ci_width: Maximum width of the confidence interval of the median,
+          relative to the median (e.g., 0.02 for 2%).
+        min_iterations: Minimum number of iterations of each point. Must be
+          at least `min_samples(confidence)`, otherwise no point would ever
+          stop.
+        confidence: Confidence level of the interval.
+
+    Raises:
+        ValueError: If `min_iterations` is too small for `confidence`.
+    """
+
+    def __init__(
+        self,
+        max_ci_width: float,
+        min_iterations: int = 6,
+        confidence: float = 0.95,
+    ) -> None:
+        if min_iterations < min_samples(confidence):
+            raise ValueError(
+                f"At least {min_samples(confidence)} iterations are needed "
+                f"for {confidence:.0%} confidence"
+            )
+
+        self.max_ci_width = max_ci_width
+        self.min_iterations = min_iterations
+        self.confidence = confidence
+
+    def is_done(self, samples: list[float]) -> bool:
+        """Check if a point with the given results needs no more runs."""
+        if len(samples) < self.min_iterations:
+            return False
+        width = relative_ci_width(samples, self.confidence)
+        return width <= self.max_ci_width
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# Adaptive refinement of the loads swept by latency experiments.
+
+import math
+from typing import Optional
+
+
+class LoadRefinement:
+    """Chooses extra loads to resolve the knee of a latency curve.
+
+    After the coarse grid of loads runs, extra loads are inserted one at a
+    time in the middle of the interval between two measured loads that needs
+    it the most:
+      1. The interval between the highest load without packet loss and the
+         load where EnsōGen first lost packets, so that we find the highest
+         load the DUT sustains.
+      2. The interval where the p99 RTT changes the most (relative to the
+         smaller of the two). Intervals where it changes by less than
+         `min_p99_change` are considered flat and are never refined.
+
+    Args:
+        budget: Maximum number of extra loads per configuration.
+        min_step: Smallest distance between two loads (in bps). Extra loads
+          are multiples of it.
+        min_p99_change: Smallest relative change in p99 RTT worth refining.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        min_step: int = 1_000_000_000,
+        min_p99_change: float = 0.05,
+    ) -> None:
+        self.budget = budget
+        self.min_step = min_step
+        self.min_p99_change = min_p99_change
+
+    def _midpoint(self, low: int, high: int) -> Optional[int]:
+        mid = round((low + high) / 2 / self.min_step) * self.min_step
+        if mid <= low or mid >= high:
+            return None
+        return mid
+
+    def _p99_change(self, low_p99: float, high_p99: float) -> float:
+        if low_p99 == high_p99:
+            return 0.0
+        smallest = min(low_p99, high_p99)
+        if smallest <= 0:
+            return math.inf
+        return abs(high_p99 - low_p99) / smallest
+
+    def next_load(
+        self, p99s: dict[int, float], lossy_loads: set[int]
+    ) -> Optional[int]:
+        """Get the next load to measure.
+
+        Args:
+            p99s: p99 RTT of every load whose histogram was saved.
+            lossy_loads: Loads where EnsōGen lost packets, whether or not
+              their histogram was saved.
+
+        Returns:
+            Next load to measure, or None if no interval can be refined.
+        """
+        loads = sorted(set(p99s) | lossy_loads)
+        best_load = None
+        best_score = self.min_p99_change
+
+        for low, high in zip(loads, loads[1:]):
+            mid = self._midpoint(low, high)
+            if mid is None:
+                continue
+
+            if low in lossy_loads:
+                continue
+            if high in lossy_loads:
+                score = math.inf
+            else:
+                score = self._p99_change(p99s[low], p99s[high])
+
+            if score >= best_score:
+                best_load = mid
+                best_score = score
+
+        return best_load
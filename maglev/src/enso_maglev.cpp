@@ -40,6 +40,7 @@
 #include <rte_ip.h>
 #include <x86intrin.h>
 
+#include <atomic>
 #include <cerrno>
 #include <chrono>
 #include <csignal>
@@ -55,7 +56,8 @@
 #include "maglev.hpp"
 
 static volatile bool keep_running = true;
-static volatile bool setup_done = false;
+// Number of cores that finished their setup and started polling.
+static std::atomic<uint32_t> nb_ready_cores{0};
 
 void int_handler([[maybe_unused]] int signal) { keep_running = 0; }
 
@@ -101,7 +103,7 @@ void run_maglev(uint32_t nb_queues, uint32_t core_id, uint32_t nb_backends,
     exit(3);
   }
 
-  setup_done = true;
+  ++nb_ready_cores;
 
   while (keep_running) {
     for (auto& pipe : pipes) {
@@ -164,7 +166,10 @@ int main(int argc, char* argv[]) {
     std::this_thread::sleep_for(std::chrono::milliseconds(100));
   }
 
-  while (!setup_done) continue;  // Wait for setup to be done.
+  while (nb_ready_cores < nb_cores) continue;  // Wait for setup to be done.
+
+  // Tells the experiment scripts that the DUT is ready to receive packets.
+  std::cout << "DUT ready (" << nb_cores << " cores polling)" << std::endl;
 
   enso::show_stats(thread_stats, &keep_running);
 
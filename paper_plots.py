@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import csv
+import json
 import math
 import statistics
 import sys
@@ -21,6 +22,8 @@ import numpy as np
 from pubplot import Document
 from pubplot.document_classes import usenix
 
+from hist_summary import summary_path
+
 
 if sys.version_info < (3, 9, 0):
     raise RuntimeError("Python 3.9 or a more recent version is required.")
@@ -332,6 +335,10 @@ def bar_plot(
 
 
 def filter_row(row: dict[str, str], filter: dict[str, str]) -> bool:
+    # Bounded-loss throughput is saved alongside the zero-loss throughput but
+    # we only plot the latter.
+    if float(row.get("loss_tolerance", 0)) != 0:
+        return True
     for k, v in filter.items():
         if row[k] != v:
             return True
@@ -995,10 +1002,34 @@ def _generic_subplot_rtt_vs_load(
                 throughput_gbps = float(row["throughput"]) / 1e9
                 throughput_by_load[load].append(throughput_gbps)
 
-        for load in loads:
+        # Latency experiments may add loads to the grid (see
+        # `LoadRefinement` in `load_refinement.py`).
+        for load in sorted(set(loads) | set(throughput_by_load)):
             csv_file = csv_file_pattern.replace("{load}", str(load))
             file_path = data_dir / csv_file
+
+            if load not in throughput_by_load:
+                warn(f"{label}: no data for load {load / 1e9:g} Gbps")
+                continue
+
+            # Use the summary computed on the packet generator, if any, since
+            # the raw histogram may not have been collected yet.
+            if summary_path(file_path).exists():
+                with open(summary_path(file_path)) as f:
+                    summary = json.load(f)
+
+                throughput = statistics.median(throughput_by_load[load])
+                throughputs.append(throughput)
+
+                # Convert from ns to us.
+                means.append(summary["mean"] / 1e3)
+                p50s.append(summary["p50"] / 1e3)
+                p99s.append(summary["p99"] / 1e3)
+                p99_9s.append(summary["p99_9"] / 1e3)
+                continue
+
             if not file_path.exists():
+                warn(f"{label}: missing {file_path}")
                 continue
 
             throughput = statistics.median(throughput_by_load[load])
@@ -1085,6 +1116,53 @@ def _generic_subplot_rtt_vs_load(
     return True
 
 
+def read_pcie_bw(
+    file_path: Path, line_start: str
+) -> tuple[list[float], list[float]]:
+    """Read the DMA bandwidth samples of a PCIe device saved by `pcm-iio`.
+
+    Args:
+        file_path: CSV file saved by `pcm-iio`.
+        line_start: Beginning of the lines of the device (socket, IIO stack
+          and part).
+
+    Returns:
+        DMA read and DMA write samples (in Gbps).
+    """
+    dma_reads = []
+    dma_writes = []
+
+    with open(file_path, "r") as f:
+        lines = f.readlines()
+
+    for line in (ln for ln in lines if ln.startswith(line_start)):
+        values = line.split(line_start)[1].split(",")
+        dma_wr = int(values[0])  # Called "Inbound write" by PCM.
+        dma_rd = int(values[1])  # Called "Inbound read" by PCM.
+
+        dma_reads.append(dma_rd * 8 / 1e9)
+        dma_writes.append(dma_wr * 8 / 1e9)
+
+    return dma_reads, dma_writes
+
+
+def read_perf_stat(file_path: Path) -> dict[str, float]:
+    """Read the event counts saved by `perf stat -x,`.
+
+    Events that perf could not count are left out.
+    """
+    counts = {}
+    with open(file_path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or row[0].startswith("#"):
+                continue
+            try:
+                counts[row[2]] = float(row[0])
+            except ValueError:  # E.g., "<not counted>".
+                continue
+    return counts
+
+
 def plot_pcie_bw(data_dir: Path, dest_dir: Path, opts: dict) -> None:
     pcie_bw_prefix = "pcie_bw-64_{cores}"
     configs = {
@@ -1138,25 +1216,7 @@ def plot_pcie_bw(data_dir: Path, dest_dir: Path, opts: dict) -> None:
             if not file_path.exists():
                 continue
 
-            dma_reads = []
-            dma_writes = []
-            mmio_reads = []
-            mmio_writes = []
-
-            with open(file_path, "r") as f:
-                lines = f.readlines()
-
-            for line in (ln for ln in lines if ln.startswith(line_start)):
-                values = line.split(line_start)[1].split(",")
-                dma_wr = int(values[0])  # Called "Inbound write" by PCM.
-                dma_rd = int(values[1])  # Called "Inbound read" by PCM.
-                mmio_rd = int(values[2])  # Called "Outbound read" by PCM.
-                mmio_wr = int(values[3])  # Called "Outbound write" by PCM.
-
-                dma_reads.append(dma_rd * 8 / 1e9)
-                dma_writes.append(dma_wr * 8 / 1e9)
-                mmio_reads.append(mmio_rd)
-                mmio_writes.append(mmio_wr)
+            dma_reads, dma_writes = read_pcie_bw(file_path, line_start)
 
             dma_reads.sort()
 
@@ -1661,11 +1721,34 @@ def plot_log_monitor(data_dir: Path, dest_dir: Path, opts: dict) -> None:
 def plot_motivation_pcie_bw(
     data_dir: Path, dest_dir: Path, opts: dict
 ) -> None:
-    fig, ax = plt.subplots()
+    # Measured by the "DPDK PCIe bandwidth" experiment with 2 cores.
+    nb_cores = 2
+    throughput_file = data_dir / "dpdk_e810_pcie_bw.csv"
+    pcm_file = data_dir / (
+        f"dpdk_e810_pcie_bw-64_{nb_cores}_1_3100000_100000000000.csv"
+    )
+    line_start = "Socket0,IIO Stack 1 - PCIe0,Part0 (1st x16/x8/x4),"
+
+    if not throughput_file.exists() or not pcm_file.exists():
+        warn(f"Missing {throughput_file} or {pcm_file}")
+        return
+
+    e810_2_cores_goodput_gbps = None
+    with open(throughput_file, newline="") as f:
+        for row in csv.DictReader(f):
+            if int(row["nb_cores"]) == nb_cores:
+                throughput_gbps = float(row["throughput"]) / 1e9
+                e810_2_cores_goodput_gbps = throughput_gbps * 64 / 84
 
-    e810_2_cores_goodput_gbps = 51.389896512315275
-    e810_2_cores_pcie_rd_bw = 84.15157618
-    e810_2_cores_pcie_wr_bw = 74.46466083199999
+    dma_reads, dma_writes = read_pcie_bw(pcm_file, line_start)
+    if e810_2_cores_goodput_gbps is None or not dma_reads:
+        warn(f"No {nb_cores}-core E810 PCIe bandwidth in {data_dir}")
+        return
+
+    e810_2_cores_pcie_rd_bw = statistics.median(dma_reads)
+    e810_2_cores_pcie_wr_bw = statistics.median(dma_writes)
+
+    fig, ax = plt.subplots()
 
     labels = ["RD", "WR"]
 
@@ -1719,12 +1802,24 @@ def plot_motivation_pcie_bw(
 
 
 def plot_motivation_cache(data_dir: Path, dest_dir: Path, opts: dict) -> None:
-    fig, ax = plt.subplots()
+    # Measured by the "DPDK cache profile" experiment.
+    perf_file = data_dir / "dpdk_e810_cache-64_2_1_3100000_100000000000.csv"
 
-    l1d_access = 21_339 / 10
-    l1d_miss = 1_357 / 10
-    l2_access = 1357 / 10
-    l2_miss = 747 / 10
+    if not perf_file.exists():
+        warn(f"Missing {perf_file}")
+        return
+
+    counts = read_perf_stat(perf_file)
+    try:
+        l1d_access = counts["L1-dcache-loads"]
+        l1d_miss = counts["L1-dcache-load-misses"]
+        l2_access = counts["l2_rqsts.references"]
+        l2_miss = counts["l2_rqsts.miss"]
+    except KeyError as e:
+        warn(f"{e} not counted in {perf_file}")
+        return
+
+    fig, ax = plt.subplots()
 
     labels = ["L1d", "L2"]
 
@@ -1777,15 +1872,15 @@ def main(data_dir, plot_dir, pick, png):
             plot_rate_vs_cores,
             plot_rate_vs_cores_vs_pkt_sizes,
             plot_maglev,
-            # plot_pcie_bw,
+            plot_pcie_bw,
             plot_rtt_vs_load_reactive_notif,
             plot_rtt_vs_load_pref_notif,
             plot_rate_vs_nb_pipes,
             # plot_mica_throughput,
             # plot_mica_latency,
             # plot_log_monitor,
-            # plot_motivation_pcie_bw,
-            # plot_motivation_cache,
+            plot_motivation_pcie_bw,
+            plot_motivation_cache,
         ]
     else:
         function_name = f"plot_{pick}"
@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+# Long-lived agent that runs commands and samples counters on a host.
+#
+# The agent is synced to the hosts with the rest of the repo and only depends
+# on the standard library. `AgentHost` starts it over a single ssh connection
+# and implements the same interface as the `netexp` hosts, so that it can be
+# used in their place (see `host_pool.py`).
+#
+# Requests and responses are length-prefixed frames. Every request carries a
+# batch of calls that run in order. Requests run concurrently, each in its own
+# thread, so that a call that blocks (e.g., watching a command without a
+# timeout) does not delay the others. Responses carry the id of their request.
+# Bulk data (files and counter samples) are sent as separate binary frames
+# instead of being encoded as JSON.
+
+import fcntl
+import json
+import os
+import pty
+import re
+import signal
+import struct
+import subprocess
+import sys
+import termios
+import threading
+import time
+from concurrent.futures import Future
+from typing import IO, Any, Optional, TextIO, Union
+
+FRAME_HEADER = struct.Struct("<IB")
+JSON_FRAME = 0
+BLOB_FRAME = 1
+
+# Like in `netexp`, only the last bytes of the output are searched for stop
+# patterns.
+DEFAULT_MAX_MATCH_LENGTH = 1024
+
+
+def send_frame(f: IO[bytes], kind: int, payload: bytes) -> None:
+    f.write(FRAME_HEADER.pack(len(payload), kind))
+    f.write(payload)
+
+
+def recv_frame(f: IO[bytes]) -> tuple[int, bytes]:
+    header = f.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        raise EOFError("Agent connection closed")
+    length, kind = FRAME_HEADER.unpack(header)
+    payload = f.read(length)
+    if len(payload) < length:
+        raise EOFError("Agent connection closed")
+    return kind, payload
+
+
+def send_message(f: IO[bytes], message: Any, blobs: list[bytes]) -> None:
+    """Send a JSON message followed by its binary attachments.
+
+    Attachments are referenced in the message as `{"blob": <index>}`.
+    """
+    message = {"message": message, "nb_blobs": len(blobs)}
+    send_frame(f, JSON_FRAME, json.dumps(message).encode())
+    for blob in blobs:
+        send_frame(f, BLOB_FRAME, blob)
+    f.flush()
+
+
+def recv_message(f: IO[bytes]) -> tuple[Any, list[bytes]]:
+    kind, payload = recv_frame(f)
+    if kind != JSON_FRAME:
+        raise RuntimeError("Unexpected agent frame")
+    message = json.loads(payload)
+
+    blobs = []
+    for _ in range(message["nb_blobs"]):
+        kind, payload = recv_frame(f)
+        if kind != BLOB_FRAME:
+            raise RuntimeError("Unexpected agent frame")
+        blobs.append(payload)
+
+    return message["message"], blobs
+
+
+class Process:
+    """Command started by the agent.
+
+    Output is read in the background, so that the command never blocks on
+    a full pipe and so that stop patterns are matched as soon as the output
+    arrives.
+
+    Args:
+        command: Shell command.
+        use_pty: Run the command in a pseudo-terminal. Ctrl+C sent to the
+          command then interrupts its whole foreground process group (even
+          if it runs with sudo), as it does over ssh.
+    """
+
+    def __init__(self, command: str, use_pty: bool) -> None:
+        if use_pty:
+            master, slave = pty.openpty()
+
+            def set_controlling_terminal() -> None:
+                fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+            self.proc = subprocess.Popen(
+                command,
+                shell=True,
+                executable="/bin/bash",
+                stdin=slave,
+                stdout=slave,
+                stderr=slave,
+                start_new_session=True,
+                preexec_fn=set_controlling_terminal,
+            )
+            os.close(slave)
+            self.out_fd = master
+            self.in_fd = master
+        else:
+            self.proc = subprocess.Popen(
+                command,
+                shell=True,
+                executable="/bin/bash",
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+            self.out_fd = self.proc.stdout.fileno()
+            self.in_fd = self.proc.stdin.fileno()
+
+        self.use_pty = use_pty
+        self.output = bytearray()
+        self.read_offset = 0
+        self.eof = False
+        self.cond = threading.Condition()
+
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self) -> None:
+        while True:
+            try:
+                data = os.read(self.out_fd, 65536)
+            except OSError:  # Raised by the pty once the command exits.
+                data = b""
+            with self.cond:
+                if len(data) == 0:
+                    self.eof = True
+                    self.cond.notify_all()
+                    return
+                self.output += data
+                self.cond.notify_all()
+
+    def write(self, data: bytes) -> None:
+        if data == b"\x03" and not self.use_pty:
+            os.killpg(self.proc.pid, signal.SIGINT)
+            return
+        os.write(self.in_fd, data)
+
+    def done(self) -> bool:
+        return self.eof and self.proc.poll() is not None
+
+    def watch(
+        self,
+        stop_pattern: Optional[str],
+        timeout: Optional[float],
+        max_match_length: Optional[int],
+    ) -> tuple[str, Optional[int]]:
+        """Wait until the command finishes, `stop_pattern` shows up in the
+        output or `timeout` expires.
+
+        Returns:
+            Output since the last call and the exit status of the command,
+            if it finished.
+        """
+        if max_match_length is None:
+            max_match_length = DEFAULT_MAX_MATCH_LENGTH
+        deadline = None if timeout is None else time.time() + timeout
+        start = self.read_offset
+
+        with self.cond:
+            while True:
+                if self.eof:
+                    # Output is complete, the command is exiting.
+                    self.proc.wait()
+                    break
+
+                if stop_pattern is not None:
+                    search_start = max(
+                        start, len(self.output) - max_match_length
+                    )
+                    text = self.output[search_start:].decode(errors="replace")
+                    if re.search(stop_pattern, text):
+                        break
+
+                wait_time = None
+                if deadline is not None:
+                    wait_time = deadline - time.time()
+                    if wait_time <= 0:
+                        break
+                self.cond.wait(wait_time)
+
+            output = self.output[start:].decode(errors="replace")
+            self.read_offset = len(self.output)
+
+        return output, self.proc.poll() if self.eof else None
+
+    def wait(self) -> int:
+        self.reader.join()
+        return self.proc.wait()
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            try:
+                self.write(b"\x03")
+            except OSError:
+                pass
+        if self.use_pty:
+            self.reader.join(timeout=1)
+            os.close(self.out_fd)
+
+
+class Sampler:
+    """Samples CPU utilization and frequency in the background.
+
+    Each sample has the time since sampling started followed by the
+    utilization (between 0 and 1) and the frequency (in kHz) of every core.
+
+    Args:
+        interval: Time between samples (in seconds).
+        cores: Cores to sample.
+    """
+
+    def __init__(self, interval: float, cores: list[int]) -> None:
+        self.interval = interval
+        self.cores = cores
+        self.columns = (
+            ["time"]
+            + [f"cpu{core}_busy" for core in cores]
+            + [f"cpu{core}_khz" for core in cores]
+        )
+        self.row = struct.Struct(f"<{len(self.columns)}d")
+        self.samples = bytearray()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+
+    def _read_cpu_times(self) -> dict[int, tuple[int, int]]:
+        times = {}
+        with open("/proc/stat") as f:
+            for line in f:
+                if not line.startswith("cpu") or line.startswith("cpu "):
+                    continue
+                name, *fields = line.split()
+                values = [int(v) for v in fields]
+                idle = values[3] + values[4]  # idle + iowait.
+                times[int(name[3:])] = (sum(values), idle)
+        return times
+
+    def _read_freq(self, core: int) -> float:
+        path = f"/sys/devices/system/cpu/cpu{core}/cpufreq/scaling_cur_freq"
+        try:
+            with open(path) as f:
+                return float(f.read())
+        except OSError:
+            return 0.0
+
+    def _sample(self) -> None:
+        start = time.time()
+        last_times = self._read_cpu_times()
+        while not self.stopped.wait(self.interval):
+            times = self._read_cpu_times()
+            busy = []
+            for core in self.cores:
+                total, idle = times.get(core, (0, 0))
+                last_total, last_idle = last_times.get(core, (0, 0))
+                delta = total - last_total
+                busy.append(1 - (idle - last_idle) / delta if delta else 0.0)
+            freqs = [self._read_freq(core) for core in self.cores]
+            last_times = times
+            self.samples += self.row.pack(time.time() - start, *busy, *freqs)
+
+    def stop(self) -> bytes:
+        self.stopped.set()
+        self.thread.join()
+        return bytes(self.samples)
+
+
+class Agent:
+    """Runs the calls received from `AgentClient`."""
+
+    def __init__(self) -> None:
+        self.processes: dict[int, Process] = {}
+        self.next_id = 0
+        self.sampler: Optional[Sampler] = None
+        self.lock = threading.Lock()
+
+    def spawn(self, blobs: list[bytes], command: str, pty: bool) -> int:
+        process = Process(command, pty)
+        with self.lock:
+            process_id = self.next_id
+            self.next_id += 1
+            self.processes[process_id] = process
+        return process_id
+
+    def watch(
+        self,
+        blobs: list[bytes],
+        process_id: int,
+        stop_pattern: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_match_length: Optional[int] = None,
+    ) -> tuple[str, Optional[int]]:
+        process = self.processes[process_id]
+        output, status = process.watch(stop_pattern, timeout, max_match_length)
+        if status is not None:
+            # All output was consumed, the client keeps the exit status.
+            process.close()
+            with self.lock:
+                self.processes.pop(process_id, None)
+        return output, status
+
+    def write(self, blobs: list[bytes], process_id: int, data: str) -> None:
+        self.processes[process_id].write(data.encode("latin-1"))
+
+    def poll(self, blobs: list[bytes], process_id: int) -> Optional[int]:
+        process = self.processes[process_id]
+        if not process.done():
+            return None
+        # The client keeps the exit status.
+        process.close()
+        with self.lock:
+            self.processes.pop(process_id, None)
+        return process.proc.returncode
+
+    def run(self, blobs: list[bytes], command: str) -> tuple[str, int]:
+        """Run a command until it finishes.
+
+        Returns:
+            Output and exit status of the command.
+        """
+        process = Process(command, use_pty=False)
+        output, status = process.watch(None, None, None)
+        process.close()
+        assert status is not None
+        return output, status
+
+    def stop(self, blobs: list[bytes], process_id: int) -> tuple[str, int]:
+        """Interrupt a command with Ctrl+C and wait until it finishes.
+
+        Returns:
+            Remaining output and exit status of the command.
+        """
+        process = self.processes[process_id]
+        if process.proc.poll() is None:
+            try:
+                process.write(b"\x03")
+            except OSError:  # Exited in the meantime.
+                pass
+        output, status = self.watch(blobs, process_id)
+        assert status is not None
+        return output, status
+
+    def wait(self, blobs: list[bytes], process_id: int) -> int:
+        return self.processes[process_id].wait()
+
+    def read_file(self, blobs: list[bytes], path: str) -> dict[str, int]:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+        return {"blob": len(blobs) - 1}
+
+    def start_sampling(
+        self, blobs: list[bytes], interval: float, cores: list[int]
+    ) -> None:
+        with self.lock:
+            sampler, self.sampler = self.sampler, Sampler(interval, cores)
+        if sampler is not None:
+            sampler.stop()
+
+    def stop_sampling(self, blobs: list[bytes]) -> dict[str, Any]:
+        with self.lock:
+            sampler, self.sampler = self.sampler, None
+        if sampler is None:
+            raise RuntimeError("Not sampling")
+        blobs.append(sampler.stop())
+        return {"columns": sampler.columns, "samples": len(blobs) - 1}
+
+    def close(self) -> None:
+        with self.lock:
+            processes = list(self.processes.values())
+            sampler, self.sampler = self.sampler, None
+        for process in processes:
+            process.close()
+        if sampler is not None:
+            sampler.stop()
+
+    def _serve_request(
+        self,
+        request: dict[str, Any],
+        f_out: IO[bytes],
+        write_lock: threading.Lock,
+    ) -> None:
+        results = []
+        blobs: list[bytes] = []
+        for method, params in request["calls"]:
+            try:
+                value = getattr(self, method)(blobs, **params)
+                results.append({"value": value})
+            except Exception as e:
+                results.append({"error": f"{type(e).__name__}: {e}"})
+
+        response = {"id": request["id"], "results": results}
+        try:
+            with write_lock:
+                send_message(f_out, response, blobs)
+        except OSError:  # The client is gone.
+            pass
+
+    def serve(self, f_in: IO[bytes], f_out: IO[bytes]) -> None:
+        write_lock = threading.Lock()
+        while True:
+            try:
+                request, _ = recv_message(f_in)
+            except EOFError:
+                break
+
+            threading.Thread(
+                target=self._serve_request,
+                args=(request, f_out, write_lock),
+                daemon=True,
+            ).start()
+
+        self.close()
+
+
+class AgentError(RuntimeError):
+    pass
+
+
+class AgentClient:
+    """Connection to an agent.
+
+    Calls may come from multiple threads. Batches from different threads run
+    concurrently on the agent, so a blocking call (e.g., watching a command
+    without a timeout) only blocks the thread that made it.
+
+    Args:
+        agent_cmd: Command that starts the agent (e.g., through ssh).
+    """
+
+    def __init__(self, agent_cmd: list[str]) -> None:
+        self.proc = subprocess.Popen(
+            agent_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.pending: dict[int, Future] = {}
+        self.next_id = 0
+        self.closed = False
+
+        self.receiver = threading.Thread(target=self._receive, daemon=True)
+        self.receiver.start()
+
+    def _receive(self) -> None:
+        """Hand every response to the call waiting for it."""
+        while True:
+            try:
+                response, blobs = recv_message(self.proc.stdout)
+            except (EOFError, OSError, ValueError):
+                break
+            with self.lock:
+                future = self.pending.pop(response["id"], None)
+            if future is not None:
+                future.set_result((response["results"], blobs))
+
+        with self.lock:
+            self.closed = True
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for future in pending:
+            future.set_exception(AgentError("Agent connection closed"))
+
+    def batch(
+        self, calls: list[tuple[str, dict[str, Any]]]
+    ) -> tuple[list[Any], list[bytes]]:
+        """Run several calls in a single round trip.
+
+        Returns:
+            Value returned by each call and the binary attachments referenced
+            by them.
+
+        Raises:
+            AgentError: If any of the calls failed.
+        """
+        future: Future = Future()
+        with self.lock:
+            if self.closed or self.proc.poll() is not None:
+                raise AgentError("Agent is not running")
+            request_id = self.next_id
+            self.next_id += 1
+            self.pending[request_id] = future
+
+        try:
+            with self.send_lock:
+                send_message(
+                    self.proc.stdin, {"id": request_id, "calls": calls}, []
+                )
+        except BaseException:
+            # The connection may be in the middle of a frame, so it cannot be
+            # used anymore. The agent stops its commands once the connection
+            # closes.
+            self.close()
+            raise
+
+        try:
+            results, blobs = future.result()
+        except BaseException:
+            with self.lock:
+                self.pending.pop(request_id, None)
+            raise
+
+        values = []
+        for (method, _), result in zip(calls, results):
+            if "error" in result:
+                raise AgentError(f"{method} failed: {result['error']}")
+            values.append(result["value"])
+        return values, blobs
+
+    def call(self, method: str, **params: Any) -> Any:
+        values, _ = self.batch([(method, params)])
+        return values[0]
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+
+
+def write_log(log_file: Union[bool, TextIO], data: str) -> None:
+    if log_file is True:
+        log_file = sys.stdout
+    if log_file:
+        log_file.write(data)
+        log_file.flush()
+
+
+class AgentCommand:
+    """Command running through an agent. Implements the subset of the
+    `netexp` command interface used by `experiment.py`."""
+
+    def __init__(self, client: AgentClient, process_id: int) -> None:
+        self.client = client
+        self.process_id = process_id
+        self.exit_status: Optional[int] = None
+
+    def watch(
+        self,
+        stop_condition: Any = None,
+        keyboard_int: Any = None,
+        timeout: Optional[float] = None,
+        stdout: Union[bool, TextIO] = False,
+        stderr: Union[bool, TextIO] = False,
+        stop_pattern: Optional[str] = None,
+        max_match_length: Optional[int] = None,
+    ) -> str:
+        if self.exit_status is not None:
+            return ""
+        try:
+            output, status = self.client.call(
+                "watch",
+                process_id=self.process_id,
+                stop_pattern=stop_pattern,
+                timeout=timeout,
+                max_match_length=max_match_length,
+            )
+        except KeyboardInterrupt:
+            if keyboard_int is not None:
+                keyboard_int()
+            raise
+
+        self.exit_status = status
+        write_log(stdout, output)
+        return output
+
+    def send(self, data: Union[str, bytes]) -> None:
+        if isinstance(data, bytes):
+            data = data.decode("latin-1")
+        self.client.call("write", process_id=self.process_id, data=data)
+
+    def exit_status_ready(self) -> bool:
+        if self.exit_status is None:
+            self.exit_status = self.client.call(
+                "poll", process_id=self.process_id
+            )
+        return self.exit_status is not None
+
+    def recv_exit_status(self) -> int:
+        if self.exit_status is None:
+            self.exit_status = self.client.call(
+                "wait", process_id=self.process_id
+            )
+        return self.exit_status
+
+
+class AgentHost:
+    """Host that runs commands through an agent.
+
+    The agent is only started on first use, so that it can be created before
+    the repo is synced to the host.
+
+    Args:
+        hostname: Host to start the agent on. If "localhost", the agent runs
+          locally.
+        agent_cmd: Command that starts the agent on the host.
+    """
+
+    def __init__(self, hostname: str, agent_cmd: str) -> None:
+        self.hostname = hostname
+        self.agent_cmd = agent_cmd
+        self._client: Optional[AgentClient] = None
+        self.lock = threading.Lock()
+
+    @property
+    def client(self) -> AgentClient:
+        with self.lock:
+            if self._client is None:
+                if self.hostname == "localhost":
+                    cmd = ["bash", "-c", self.agent_cmd]
+                else:
+                    cmd = ["ssh", self.hostname, self.agent_cmd]
+                self._client = AgentClient(cmd)
+            return self._client
+
+    def run_command(
+        self,
+        command: str,
+        pty: bool = False,
+        dir: Optional[str] = None,
+        source_bashrc: bool = False,
+        print_command: Union[bool, TextIO] = False,
+    ) -> AgentCommand:
+        if dir is not None:
+            command = f"cd {dir}; {command}"
+
+        if source_bashrc:
+            command = f"source $HOME/.bashrc; {command}"
+
+        write_log(print_command, f"command: {command}\n")
+
+        client = self.client
+        process_id = client.call("spawn", command=command, pty=pty)
+        return AgentCommand(client, process_id)
+
+    def run(
+        self,
+        commands: list[str],
+        start: Optional[str] = None,
+        pty: bool = False,
+        print_command: Union[bool, TextIO] = False,
+    ) -> tuple[list[tuple[str, int]], Optional[AgentCommand]]:
+        """Run commands until they finish and then start another command,
+        all in a single round trip.
+
+        Commands run in order, even if some of them fail.
+
+        Args:
+            commands: Commands to run until they finish.
+            start: Command to start after the others finished (e.g., an
+              application that keeps running).
+            pty: Run `start` in a pseudo-terminal.
+            print_command: Where to log the commands.
+
+        Returns:
+            Output and exit status of every command in `commands`, and the
+            started command, if any.
+        """
+        calls = [("run", {"command": command}) for command in commands]
+        if start is not None:
+            calls.append(("spawn", {"command": start, "pty": pty}))
+
+        for _, params in calls:
+            write_log(print_command, f"command: {params['command']}\n")
+
+        client = self.client
+        values, _ = client.batch(calls)
+
+        started = None
+        if start is not None:
+            started = AgentCommand(client, values.pop())
+        results = [(output, status) for output, status in values]
+        return results, started
+
+    def stop(self, command: AgentCommand) -> str:
+        """Interrupt a command started by the agent with Ctrl+C and wait until
+        it finishes, in a single round trip.
+
+        Returns:
+            Remaining output of the command.
+        """
+        if command.exit_status is not None:
+            return ""
+        output, command.exit_status = command.client.call(
+            "stop", process_id=command.process_id
+        )
+        return output
+
+    def read_file(self, path: str) -> bytes:
+        values, blobs = self.client.batch([("read_file", {"path": path})])
+        return blobs[values[0]["blob"]]
+
+    def start_sampling(self, interval: float, cores: list[int]) -> None:
+        """Start sampling CPU utilization and frequency on the host."""
+        self.client.call("start_sampling", interval=interval, cores=cores)
+
+    def stop_sampling(self) -> tuple[list[str], list[tuple[float, ...]]]:
+        """Stop sampling and get the samples (see `Sampler`)."""
+        values, blobs = self.client.batch([("stop_sampling", {})])
+        columns = values[0]["columns"]
+        row = struct.Struct(f"<{len(columns)}d")
+        samples = blobs[values[0]["samples"]]
+        return columns, list(row.iter_unpack(samples))
+
+    def close(self) -> None:
+        with self.lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+def main() -> None:
+    # Keep our own stdout free for frames.
+    f_in = os.fdopen(sys.stdin.fileno(), "rb")
+    f_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    Agent().serve(f_in, f_out)
+
+
+if __name__ == "__main__":
+    main()
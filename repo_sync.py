@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# Incremental sync of the local repo to the remote hosts.
+
+import asyncio
+import hashlib
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import TextIO
+
+# Manifest with the hash of every file synced to a remote repo. It is stored
+# at the root of the remote repo and only updated after a successful sync.
+MANIFEST_NAME = ".sync_manifest"
+
+# Bitstream is ignored by git but must also be synced.
+BITSTREAM_PATH = "enso/scripts/alt_ehipc2_hw.sof"
+
+Manifest = dict[str, str]
+
+
+def list_repo_files(repo_path: Path) -> list[str]:
+    """List the files to sync, relative to `repo_path`.
+
+    Includes tracked and untracked files in the repo and in the enso
+    submodule, except for the ones ignored by git, as well as the bitstream.
+    """
+    files = []
+    for subdir in [Path("."), Path("enso")]:
+        if not (repo_path / subdir).is_dir():
+            continue
+        ls_files = subprocess.run(
+            [
+                "git",
+                "ls-files",
+                "--cached",
+                "--others",
+                "--exclude-standard",
+                "-z",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=repo_path / subdir,
+        )
+        for name in ls_files.stdout.decode().split("\0"):
+            if name != "":
+                files.append(str(subdir / name))
+
+    files.append(BITSTREAM_PATH)
+
+    # Skip submodules and tracked files that were deleted.
+    return sorted(
+        set(
+            name
+            for name in files
+            if (repo_path / name).is_file() or (repo_path / name).is_symlink()
+        )
+    )
+
+
+def file_digest(path: Path) -> str:
+    """Hash of the content and permissions of a file.
+
+    Symlinks are hashed by their target, since they are synced as links.
+    """
+    if path.is_symlink():
+        return "l" + hashlib.sha256(os.readlink(path).encode()).hexdigest()
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    mode = path.stat().st_mode & 0o777
+    return f"{mode:o}{sha.hexdigest()}"
+
+
+def build_manifest(repo_path: Path) -> Manifest:
+    return {
+        name: file_digest(repo_path / name)
+        for name in list_repo_files(repo_path)
+    }
+
+
+def format_manifest(manifest: Manifest) -> str:
+    return "".join(
+        f"{digest} {name}\n" for name, digest in sorted(manifest.items())
+    )
+
+
+def parse_manifest(content: str) -> Manifest:
+    manifest = {}
+    for line in content.splitlines():
+        digest, _, name = line.partition(" ")
+        if name != "":
+            manifest[name] = digest
+    return manifest
+
+
+async def run_async(cmd: list[str], log: TextIO) -> int:
+    """Run a local command without blocking the event loop."""
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=log, stderr=log)
+    return await proc.wait()
+
+
+async def get_remote_manifest(hostname: str, path: str) -> Manifest:
+    """Get the manifest of the remote repo, creating the repo directory if
+    it does not exist yet."""
+    proc = await asyncio.create_subprocess_exec(
+        "ssh",
+        hostname,
+        f"mkdir -p {path} && cat {path}/{MANIFEST_NAME} 2>/dev/null; true",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    stdout, _ = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"Failed to reach {hostname}.")
+    return parse_manifest(stdout.decode())
+
+
+async def sync_remote_repo(
+    hostname: str,
+    path: str,
+    repo_path: Path,
+    local_manifest: Manifest,
+    log: TextIO,
+) -> int:
+    """Transfer the files that changed since the last sync to a remote repo.
+
+    Files are only compared by their hash in the manifests, so files that
+    were modified directly on the remote host are not synced again. Remove
+    the remote manifest to force a full sync.
+
+    Args:
+        hostname: Remote host.
+        path: Path of the repo in the remote host.
+        repo_path: Path of the local repo.
+        local_manifest: Manifest of the local repo (see `build_manifest`).
+        log: File to log the transfer to.
+
+    Returns:
+        Number of files transferred.
+    """
+    remote_manifest = await get_remote_manifest(hostname, path)
+
+    changed = [
+        name
+        for name, digest in local_manifest.items()
+        if remote_manifest.get(name) != digest
+    ]
+    if len(changed) == 0:
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files_from = Path(tmp_dir) / "files"
+        files_from.write_text("".join(f"{name}\n" for name in changed))
+
+        manifest_file = Path(tmp_dir) / MANIFEST_NAME
+        manifest_file.write_text(format_manifest(local_manifest))
+
+        rsync_cmd = [
+            "rsync",
+            "-lptzv",
+            "--files-from",
+            str(files_from),
+            f"{repo_path}/",
+            f"{hostname}:{path}",
+        ]
+        if await run_async(rsync_cmd, log) != 0:
+            raise RuntimeError(f"Failed to sync repo to {hostname}.")
+
+        # Only update the manifest once all files are in place, so that an
+        # interrupted sync is retried next time.
+        rsync_cmd = [
+            "rsync",
+            "-t",
+            str(manifest_file),
+            f"{hostname}:{path}/{MANIFEST_NAME}",
+        ]
+        if await run_async(rsync_cmd, log) != 0:
+            raise RuntimeError(f"Failed to update manifest on {hostname}.")
+
+    return len(changed)
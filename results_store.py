@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# Indexed store for the results saved by `experiment.py`.
+
+import os
+import sqlite3
+from pathlib import Path
+from typing import Union
+
+THROUGHPUT_HEADER = (
+    "pkt_size,nb_cores,queues_per_core,cpu_clock,nb_cycles,ddio_ways,"
+    "precision,loss_tolerance,throughput\n"
+)
+
+# Files created before we supported bounded-loss throughput only have
+# zero-loss results.
+LEGACY_THROUGHPUT_HEADER = (
+    "pkt_size,nb_cores,queues_per_core,cpu_clock,nb_cycles,ddio_ways,"
+    "precision,throughput\n"
+)
+
+POINT_HEADER = "pkt_size,nb_cores,queues_per_core,cpu_clock,load,throughput\n"
+
+ThroughputConfig = tuple[int, int, int, int, int, int, int, float]
+PointConfig = tuple[int, int, int, int, int]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS throughput (
+    save_name TEXT NOT NULL,
+    pkt_size INTEGER NOT NULL,
+    nb_cores INTEGER NOT NULL,
+    queues_per_core INTEGER NOT NULL,
+    cpu_clock INTEGER NOT NULL,
+    nb_cycles INTEGER NOT NULL,
+    ddio_ways INTEGER NOT NULL,
+    precision INTEGER NOT NULL,
+    loss_tolerance REAL NOT NULL,
+    throughput NUMERIC NOT NULL
+);
+CREATE INDEX IF NOT EXISTS throughput_config ON throughput (
+    save_name,
+    pkt_size,
+    cpu_clock,
+    nb_cycles,
+    ddio_ways,
+    precision,
+    loss_tolerance,
+    nb_cores,
+    queues_per_core
+);
+CREATE TABLE IF NOT EXISTS point (
+    save_name TEXT NOT NULL,
+    pkt_size INTEGER NOT NULL,
+    nb_cores INTEGER NOT NULL,
+    queues_per_core INTEGER NOT NULL,
+    cpu_clock INTEGER NOT NULL,
+    load INTEGER NOT NULL,
+    throughput NUMERIC NOT NULL
+);
+CREATE INDEX IF NOT EXISTS point_config ON point (
+    save_name,
+    pkt_size,
+    nb_cores,
+    queues_per_core,
+    cpu_clock,
+    load
+);
+CREATE TABLE IF NOT EXISTS imported (
+    save_name TEXT PRIMARY KEY
+);
+"""
+
+
+def replace_file(path: Path, content: str) -> None:
+    """Atomically replace the content of `path`."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ResultsStore:
+    """SQLite store with the results of all experiments in a data directory.
+
+    Results are indexed by their configuration so that checking if a point
+    has already been measured does not depend on how many results there are.
+    Every result is added in its own transaction, so an interrupted run never
+    leaves partial results behind.
+
+    The CSV files read by `paper_plots.py` are exported from the store (see
+    `export_throughput_csv` and `export_points_csv`). CSV files that existed
+    before the store are imported the first time they are used.
+
+    Use `ResultsStore.get` to get the store for a data directory.
+
+    Args:
+        path: Path to the SQLite database.
+    """
+
+    _instances: dict[Path, "ResultsStore"] = {}
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def get(cls, data_dir: Path) -> "ResultsStore":
+        data_dir = data_dir.resolve()
+        if data_dir not in cls._instances:
+            cls._instances[data_dir] = cls(data_dir / "results.db")
+        return cls._instances[data_dir]
+
+    def _is_imported(self, save_name: Path) -> bool:
+        cursor = self.conn.execute(
+            "SELECT 1 FROM imported WHERE save_name = ?", (save_name.name,)
+        )
+        return cursor.fetchone() is not None
+
+    def _read_csv(self, save_name: Path, headers: list[str]) -> list[list]:
+        if not save_name.exists():
+            return []
+
+        with open(save_name) as f:
+            read_header = f.readline()
+            rows = [line.strip().split(",") for line in f if line.strip()]
+
+        if read_header == "":
+            return []
+
+        assert read_header in headers, f"Unexpected header in {save_name}"
+
+        if read_header == LEGACY_THROUGHPUT_HEADER:
+            rows = [row[:-1] + ["0"] + row[-1:] for row in rows]
+
+        return rows
+
+    def import_throughput_csv(self, save_name: Path) -> None:
+        """Import throughput results from a CSV file, if not imported yet."""
+        if self._is_imported(save_name):
+            return
+
+        rows = self._read_csv(
+            save_name, [THROUGHPUT_HEADER, LEGACY_THROUGHPUT_HEADER]
+        )
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO throughput VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(save_name.name, *row) for row in rows],
+            )
+            self.conn.execute(
+                "INSERT INTO imported VALUES (?)", (save_name.name,)
+            )
+
+    def import_points_csv(self, save_name: Path) -> None:
+        """Import latency or DUT measurement points from a CSV file, if not
+        imported yet."""
+        if self._is_imported(save_name):
+            return
+
+        rows = self._read_csv(save_name, [POINT_HEADER])
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO point VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(save_name.name, *row) for row in rows],
+            )
+            self.conn.execute(
+                "INSERT INTO imported VALUES (?)", (save_name.name,)
+            )
+
+    def nb_throughput_results(
+        self, save_name: Path, config: ThroughputConfig
+    ) -> int:
+        cursor = self.conn.execute(
+            "SELECT COUNT(*) FROM throughput WHERE save_name = ? AND "
+            "pkt_size = ? AND nb_cores = ? AND queues_per_core = ? AND "
+            "cpu_clock = ? AND nb_cycles = ? AND ddio_ways = ? AND "
+            "precision = ? AND loss_tolerance = ?",
+            (save_name.name, *config),
+        )
+        return cursor.fetchone()[0]
+
+    def throughput_history(
+        self, save_name: Path, config: ThroughputConfig
+    ) -> list[Union[int, float]]:
+        cursor = self.conn.execute(
+            "SELECT throughput FROM throughput WHERE save_name = ? AND "
+            "pkt_size = ? AND nb_cores = ? AND queues_per_core = ? AND "
+            "cpu_clock = ? AND nb_cycles = ? AND ddio_ways = ? AND "
+            "precision = ? AND loss_tolerance = ?",
+            (save_name.name, *config),
+        )
+        return [row[0] for row in cursor]
+
+    def throughput_neighbors(
+        self, save_name: Path, config: ThroughputConfig
+    ) -> dict[tuple[int, int], list[Union[int, float]]]:
+        """Get the results of configurations with fewer cores or queues.
+
+        Only configurations that match `config` in every other parameter are
+        considered.
+
+        Returns:
+            Dictionary mapping (nb_cores, queues_per_core) to the throughput
+            results of that configuration.
+        """
+        (
+            pkt_size,
+            nb_cores,
+            queues_per_core,
+            cpu_clock,
+            nb_cycles,
+            ddio_ways,
+            precision,
+            loss_tolerance,
+        ) = config
+        cursor = self.conn.execute(
+            "SELECT nb_cores, queues_per_core, throughput FROM throughput "
+            "WHERE save_name = ? AND pkt_size = ? AND cpu_clock = ? AND "
+            "nb_cycles = ? AND ddio_ways = ? AND precision = ? AND "
+            "loss_tolerance = ? AND nb_cores <= ? AND queues_per_core <= ? "
+            "AND (nb_cores != ? OR queues_per_core != ?)",
+            (
+                save_name.name,
+                pkt_size,
+                cpu_clock,
+                nb_cycles,
+                ddio_ways,
+                precision,
+                loss_tolerance,
+                nb_cores,
+                queues_per_core,
+                nb_cores,
+                queues_per_core,
+            ),
+        )
+        neighbors: dict[tuple[int, int], list[Union[int, float]]] = {}
+        for n_cores, n_q_per_core, throughput in cursor:
+            neighbors.setdefault((n_cores, n_q_per_core), []).append(
+                throughput
+            )
+        return neighbors
+
+    def add_throughput(
+        self,
+        save_name: Path,
+        config: ThroughputConfig,
+        throughput: Union[int, float],
+    ) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO throughput VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (save_name.name, *config, throughput),
+            )
+
+    def is_point_done(self, save_name: Path, config: PointConfig) -> bool:
+        cursor = self.conn.execute(
+            "SELECT 1 FROM point WHERE save_name = ? AND pkt_size = ? AND "
+            "nb_cores = ? AND queues_per_core = ? AND cpu_clock = ? AND "
+            "load = ? LIMIT 1",
+            (save_name.name, *config),
+        )
+        return cursor.fetchone() is not None
+
+    def point_loads(
+        self, save_name: Path, config: tuple[int, int, int, int]
+    ) -> list[int]:
+        """Loads already measured for a configuration.
+
+        Args:
+            save_name: Path to the CSV file.
+            config: Point configuration without the load.
+        """
+        cursor = self.conn.execute(
+            "SELECT DISTINCT load FROM point WHERE save_name = ? AND "
+            "pkt_size = ? AND nb_cores = ? AND queues_per_core = ? AND "
+            "cpu_clock = ? ORDER BY load",
+            (save_name.name, *config),
+        )
+        return [row[0] for row in cursor]
+
+    def add_point(
+        self,
+        save_name: Path,
+        config: PointConfig,
+        throughput: Union[int, float],
+    ) -> None:
+        """Add a latency or DUT measurement point, replacing any result
+        already saved for the same point (e.g., when the files saved with it
+        went missing and it had to run again)."""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM point WHERE save_name = ? AND pkt_size = ? AND "
+                "nb_cores = ? AND queues_per_core = ? AND cpu_clock = ? AND "
+                "load = ?",
+                (save_name.name, *config),
+            )
+            self.conn.execute(
+                "INSERT INTO point VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (save_name.name, *config, throughput),
+            )
+
+    def export_throughput_csv(self, save_name: Path) -> None:
+        """Write the throughput results for `save_name` to the CSV file."""
+        cursor = self.conn.execute(
+            "SELECT pkt_size, nb_cores, queues_per_core, cpu_clock, "
+            "nb_cycles, ddio_ways, precision, loss_tolerance, throughput "
+            "FROM throughput WHERE save_name = ? ORDER BY rowid",
+            (save_name.name,),
+        )
+        lines = [THROUGHPUT_HEADER]
+        for *config, loss_tolerance, throughput in cursor:
+            config_str = ",".join(str(field) for field in config)
+            lines.append(f"{config_str},{loss_tolerance:g},{throughput}\n")
+        replace_file(save_name, "".join(lines))
+
+    def export_points_csv(self, save_name: Path) -> None:
+        """Write the latency or DUT measurement points for `save_name` to the
+        CSV file. Histograms and other per-point files are saved directly by
+        the experiments."""
+        cursor = self.conn.execute(
+            "SELECT pkt_size, nb_cores, queues_per_core, cpu_clock, load, "
+            "throughput FROM point WHERE save_name = ? ORDER BY rowid",
+            (save_name.name,),
+        )
+        lines = [POINT_HEADER]
+        for row in cursor:
+            lines.append(",".join(str(field) for field in row) + "\n")
+        replace_file(save_name, "".join(lines))
@@ -0,0 +1,92 @@
+#!/bin/bash
+# Set the CPU frequency of several cores at once and wait until all of them
+# report the new frequency. Must run as root.
+#
+# Prints the time it took for the frequency to settle as "settle_ms: <ms>".
+
+if [ $# -lt 3 ]; then
+    echo "Must specify frequency, timeout and at least one core."
+    echo
+    echo "Usage: $0 FREQ TIMEOUT_MS CORE [CORE ...]"
+    echo "  FREQ: CPU frequency in kHz. If 0, set to the maximum frequency."
+    echo "  TIMEOUT_MS: Maximum time to wait for the frequency to settle."
+    echo "  CORE: Core to set the frequency to."
+    exit 1
+fi
+
+freq=$1
+timeout_ms=$2
+shift 2
+cores=("$@")
+
+# Number of consecutive polls in which all cores must report the target
+# frequency for it to be considered stable.
+STABLE_POLLS=5
+POLL_INTERVAL=0.01
+
+declare -A targets
+
+for core in "${cores[@]}"; do
+    cpufreq="/sys/devices/system/cpu/cpu${core}/cpufreq"
+    available_freqs=$(cat "${cpufreq}/scaling_available_frequencies")
+
+    target=$freq
+    if [ "$target" -eq 0 ]; then
+        # Set clock to maximum.
+        target=$(echo $available_freqs | cut -d " " -f 1)
+    fi
+
+    if [[ ! " $available_freqs " =~ " $target " ]]; then
+        echo "Clock \"$target\" not supported by CPU."
+        exit 1
+    fi
+
+    # Keep min <= max at all times.
+    if [ "$target" -lt "$(cat ${cpufreq}/scaling_max_freq)" ]; then
+        echo $target > "${cpufreq}/scaling_min_freq" || exit 1
+        echo $target > "${cpufreq}/scaling_max_freq" || exit 1
+    else
+        echo $target > "${cpufreq}/scaling_max_freq" || exit 1
+        echo $target > "${cpufreq}/scaling_min_freq" || exit 1
+    fi
+
+    targets[$core]=$target
+done
+
+start_ns=$(date +%s%N)
+stable=0
+
+while [ $stable -lt $STABLE_POLLS ]; do
+    elapsed_ms=$((($(date +%s%N) - start_ns) / 1000000))
+    if [ $elapsed_ms -gt $timeout_ms ]; then
+        echo "Timed out waiting for the frequency to settle."
+        exit 2
+    fi
+
+    settled=1
+    for core in "${cores[@]}"; do
+        cpufreq="/sys/devices/system/cpu/cpu${core}/cpufreq"
+        cur_freq=$(cat "${cpufreq}/cpuinfo_cur_freq")
+        diff=$((cur_freq - targets[$core]))
+
+        # Reported frequencies may differ slightly from the target.
+        tolerance=$((targets[$core] / 100))
+        if [ ${diff#-} -gt $tolerance ]; then
+            settled=0
+            break
+        fi
+    done
+
+    if [ $settled -eq 1 ]; then
+        if [ $stable -eq 0 ]; then
+            settle_ms=$elapsed_ms
+        fi
+        stable=$((stable + 1))
+    else
+        stable=0
+    fi
+
+    sleep $POLL_INTERVAL
+done
+
+echo "settle_ms: $settle_ms"
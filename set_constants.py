@@ -65,6 +65,9 @@ def set_constants(config_file: Path, print_shell_vars: bool = False) -> dict:
     RUN_DUT_SETUP_CMD = f"{DUT_ENSO_EVAL_PATH}/dut_setup.sh"
     config["paths"]["dut_setup_cmd"] = RUN_DUT_SETUP_CMD
 
+    SET_CLOCK_CMD = f"sudo {DUT_ENSO_EVAL_PATH}/set_clock.sh"
+    config["paths"]["set_clock_cmd"] = SET_CLOCK_CMD
+
     MAGLEV_PATH = f"{DUT_ENSO_EVAL_PATH}/maglev/build_release/bin"
     ENSO_MAGLEV_CMD = f"sudo {MAGLEV_PATH}/enso_maglev"
     DPDK_MAGLEV_CMD = f"sudo {MAGLEV_PATH}/dpdk_maglev"
@@ -75,6 +78,21 @@ def set_constants(config_file: Path, print_shell_vars: bool = False) -> dict:
     CHANGE_DDIO_CMD = f"sudo {TOOLS_PATH}/ddio-bench/change-ddio"
     config["paths"]["change_ddio_cmd"] = CHANGE_DDIO_CMD
 
+    # Intel PCM (see tools/ddio-bench/TESTBED.md).
+    config["paths"]["pcm_iio_cmd"] = "sudo pcm-iio"
+    config["paths"]["perf_stat_cmd"] = "sudo perf stat"
+
+    # Where measurements are kept on the DUT until they are collected.
+    config["paths"]["dut_artifacts_path"] = f"{DUT_ENSO_EVAL_PATH}/artifacts"
+
+    DUT_AGENT_CMD = f"python3 {DUT_ENSO_EVAL_PATH}/remote_agent.py"
+    PKTGEN_AGENT_CMD = f"python3 {PKTGEN_ENSO_EVAL_PATH}/remote_agent.py"
+    config["paths"]["dut_agent_cmd"] = DUT_AGENT_CMD
+    config["paths"]["pktgen_agent_cmd"] = PKTGEN_AGENT_CMD
+
+    HIST_SUMMARY_CMD = f"python3 {PKTGEN_ENSO_EVAL_PATH}/hist_summary.py"
+    config["paths"]["pktgen_hist_summary_cmd"] = HIST_SUMMARY_CMD
+
     ENSO_DUT_PCIE_ADDR = config["devices"]["enso_dut_pcie"]
     ENSO_DUT_FPGA_ID = config["devices"]["dut_fpga_id"]
 
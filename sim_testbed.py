@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+# Simulated testbed to run experiments without the FPGA machines.
+#
+# The simulated DUT host interprets the commands that the `Dut` subclasses in
+# `experiment.py` run (e.g., setting clocks or DDIO ways and starting the DUT
+# programs), so the real `Dut` classes and experiment code run unchanged. The
+# capacity and latency of the DUT are given by `CapacityModel`.
+
+import math
+import shlex
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, TextIO, Union
+
+# Cycles each core spends per packet for each DUT program.
+PROGRAM_CYCLES = {
+    "enso_echo": 40,
+    "enso_echo_prefetch": 36,
+    "enso_maglev": 110,
+    "dpdk_echo": 90,
+    "dpdk_maglev": 170,
+}
+
+# Base round-trip time (in ns) for each DUT program.
+PROGRAM_BASE_RTT = {
+    "enso_echo": 2_500,
+    "enso_echo_prefetch": 2_200,
+    "enso_maglev": 3_000,
+    "dpdk_echo": 4_500,
+    "dpdk_maglev": 5_000,
+}
+
+# Time (in seconds) for each DUT program to be ready to receive packets.
+PROGRAM_STARTUP_TIME = {
+    "enso_echo": 1.0,
+    "enso_echo_prefetch": 1.0,
+    "enso_maglev": 2.0,
+    "dpdk_echo": 3.0,
+    "dpdk_maglev": 4.0,
+}
+
+# IIO stacks where the NICs of the DUT are attached, as reported by `pcm-iio`.
+PCM_IIO_STACKS = [
+    "Socket0,IIO Stack 1 - PCIe0,Part0 (1st x16/x8/x4)",
+    "Socket0,IIO Stack 2 - PCIe1,Part0 (1st x16/x8/x4)",
+]
+
+# Cache events per packet echoed by the DUT, as counted by `perf stat`.
+# LLC misses are given with DDIO enabled and disabled.
+PERF_EVENTS_PER_PKT = {
+    "L1-dcache-loads": 213.0,
+    "L1-dcache-load-misses": 13.6,
+    "l2_rqsts.references": 13.6,
+    "l2_rqsts.miss": 7.5,
+    "LLC-loads": 7.5,
+}
+PERF_LLC_MISSES_PER_PKT = {True: 0.5, False: 4.0}
+
+# Output that `Dut.wait_ready` waits for.
+PROGRAM_READY_OUTPUT = {
+    "enso_echo": "0 Mbps\n",
+    "enso_echo_prefetch": "0 Mbps\n",
+    "enso_maglev": "DUT ready (1 cores polling)\n0 Mbps\n",
+    "dpdk_echo": (
+        "Starting core 0 with first queue 0\nDUT ready (1 cores polling)\n"
+    ),
+    "dpdk_maglev": (
+        "Starting core 0 with first queue 0\nDUT ready (1 cores polling)\n"
+    ),
+}
+
+
+def write_log(log_file: Union[bool, TextIO], message: str) -> None:
+    if log_file is False:
+        return
+    if log_file is True:
+        print(message, end="")
+        return
+    log_file.write(message)
+    log_file.flush()
+
+
+class CapacityModel:
+    """Model of the capacity and latency of the simulated DUT.
+
+    Every core spends a fixed number of cycles per packet, which depends on
+    the DUT program, the extra cycles requested by the experiment and the
+    NIC configuration. Queues that do not fit in the DDIO ways of the LLC
+    make every packet more expensive, as DMA writes have to go to memory.
+
+    Args:
+        line_rate: Maximum rate supported by the link (in bps).
+        queues_per_ddio_way: Number of queues whose buffers fit in each DDIO
+          way.
+        ddio_miss_penalty: Extra cost (as a fraction of the cycles per packet)
+          when none of the queues fit in the DDIO ways.
+        desc_per_pkt_cycles: Extra cycles per packet when the NIC sends one
+          descriptor per packet.
+        flow_miss_cycles: Extra cycles per packet for Maglev when the flows do
+          not fit in the cache.
+        cached_flows: Number of flows that fit in the cache.
+    """
+
+    def __init__(
+        self,
+        line_rate: float = 100e9,
+        queues_per_ddio_way: int = 16,
+        ddio_miss_penalty: float = 0.5,
+        desc_per_pkt_cycles: int = 30,
+        flow_miss_cycles: int = 120,
+        cached_flows: int = 65536,
+    ) -> None:
+        self.line_rate = line_rate
+        self.queues_per_ddio_way = queues_per_ddio_way
+        self.ddio_miss_penalty = ddio_miss_penalty
+        self.desc_per_pkt_cycles = desc_per_pkt_cycles
+        self.flow_miss_cycles = flow_miss_cycles
+        self.cached_flows = cached_flows
+
+    def cycles_per_pkt(
+        self,
+        program: str,
+        nb_cores: int,
+        queues_per_core: int,
+        nb_cycles: int,
+        ddio_ways: int,
+        nb_dst: int,
+        desc_per_pkt: bool,
+    ) -> float:
+        cycles = PROGRAM_CYCLES[program] + nb_cycles
+
+        if desc_per_pkt:
+            cycles += self.desc_per_pkt_cycles
+
+        if program.endswith("maglev") and nb_dst > self.cached_flows:
+            cycles += self.flow_miss_cycles
+
+        nb_queues = nb_cores * queues_per_core
+        cached_queues = ddio_ways * self.queues_per_ddio_way
+        if nb_queues > cached_queues:
+            miss_ratio = (nb_queues - cached_queues) / nb_queues
+            cycles *= 1 + self.ddio_miss_penalty * miss_ratio
+
+        return cycles
+
+    def capacity(
+        self,
+        program: str,
+        pkt_size: int,
+        core_clocks: list[int],
+        queues_per_core: int,
+        nb_cycles: int,
+        ddio_ways: int,
+        nb_dst: int,
+        desc_per_pkt: bool,
+    ) -> float:
+        """Highest rate (in bps) that the DUT sustains without loss.
+
+        Args:
+            program: DUT program (see `PROGRAM_CYCLES`).
+            pkt_size: Packet size (in bytes).
+            core_clocks: CPU frequency of each DUT core (in kHz).
+            queues_per_core: Number of queues per core.
+            nb_cycles: Extra cycles per packet.
+            ddio_ways: Number of DDIO ways.
+            nb_dst: Number of destinations (flows) in the traffic.
+            desc_per_pkt: Whether the NIC sends one descriptor per packet.
+        """
+        cycles = self.cycles_per_pkt(
+            program,
+            len(core_clocks),
+            queues_per_core,
+            nb_cycles,
+            ddio_ways,
+            nb_dst,
+            desc_per_pkt,
+        )
+        pps = sum(clock * 1000 / cycles for clock in core_clocks)
+        return min(pps * (pkt_size + 20) * 8, self.line_rate)
+
+    def rtt_histogram(
+        self,
+        program: str,
+        load: float,
+        capacity: float,
+        nb_pkts: int,
+        bin_width: int = 10,
+    ) -> list[tuple[int, int]]:
+        """RTT histogram for the given offered load.
+
+        The queueing delay follows an exponential distribution whose mean
+        grows as the load approaches the capacity (as in an M/M/1 queue).
+
+        Returns:
+            List of (RTT in ns, number of packets) pairs.
+        """
+        base_rtt = PROGRAM_BASE_RTT[program]
+        utilization = min(load / capacity, 0.99) if capacity > 0 else 0.99
+        mean_delay = 100 * utilization / (1 - utilization)
+
+        histogram = []
+        nb_bins = max(int(10 * mean_delay / bin_width), 1)
+        remaining_pkts = nb_pkts
+        for i in range(nb_bins):
+            low = i * bin_width
+            high = low + bin_width
+            if i == nb_bins - 1:
+                count = remaining_pkts
+            else:
+                fraction = math.exp(-low / mean_delay) - math.exp(
+                    -high / mean_delay
+                )
+                count = min(round(nb_pkts * fraction), remaining_pkts)
+            remaining_pkts -= count
+            if count > 0:
+                histogram.append((base_rtt + low, count))
+
+        return histogram
+
+
+class SimCommand:
+    """Command running on a simulated host.
+
+    Implements the subset of the `netexp` command interface used by
+    `experiment.py`.
+    """
+
+    def __init__(
+        self,
+        output: str = "",
+        exit_status: int = 0,
+        running: bool = False,
+        on_interrupt: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.output = output
+        self.exit_status = exit_status
+        self.running = running
+        self.on_interrupt = on_interrupt
+
+    def watch(
+        self,
+        stdout: Union[bool, TextIO] = False,
+        stderr: Union[bool, TextIO] = False,
+        stop_pattern: Optional[str] = None,
+        keyboard_int: Optional[Any] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        # Programs never finish on their own, only when interrupted.
+        output = self.output
+        self.output = ""
+        write_log(stdout, output)
+
+        return output
+
+    def send(self, data: bytes) -> None:
+        if data == b"\x03" and self.running:  # Ctrl+C.
+            self.running = False
+            if self.on_interrupt is not None:
+                self.on_interrupt()
+
+    def recv_exit_status(self) -> int:
+        return self.exit_status
+
+    def exit_status_ready(self) -> bool:
+        return not self.running
+
+
+class SimHost:
+    """Simulated DUT host.
+
+    Interprets the commands that the `Dut` subclasses run and updates the
+    state of the testbed accordingly.
+
+    Args:
+        testbed: Simulated testbed.
+        command_latency: Time to run a remote command (in seconds).
+    """
+
+    def __init__(
+        self, testbed: "SimTestbed", command_latency: float = 0.05
+    ) -> None:
+        self.testbed = testbed
+        self.command_latency = command_latency
+        self.nb_commands = 0
+
+        paths = testbed.config["paths"]
+        programs = {
+            paths["dut_enso_echo_cmd"]: "enso_echo",
+            paths["dut_enso_echo_prefetch_cmd"]: "enso_echo_prefetch",
+            paths["enso_maglev_cmd"]: "enso_maglev",
+            paths["dut_dpdk_echo_cmd"]: "dpdk_echo",
+            paths["dpdk_maglev_cmd"]: "dpdk_maglev",
+        }
+
+        # Match longer commands first, as some commands are prefixes of
+        # others (e.g., echo and echo_prefetch).
+        self.programs = dict(
+            sorted(programs.items(), key=lambda item: -len(item[0]))
+        )
+
+    def run_command(
+        self,
+        command: str,
+        pty: bool = False,
+        dir: Optional[str] = None,
+        source_bashrc: bool = False,
+        print_command: Union[bool, TextIO] = False,
+    ) -> SimCommand:
+        write_log(print_command, f"{command}\n")
+
+        self.nb_commands += 1
+        self.testbed.advance(self.command_latency)
+
+        # Commands chained with `&&` run in the same round trip.
+        for part in command.split(" && "):
+            result = self.interpret(part)
+            if result.exit_status != 0:
+                break
+
+        return result
+
+    def interpret(self, command: str) -> SimCommand:
+        paths = self.testbed.config["paths"]
+
+        if command.startswith(paths["set_clock_cmd"]):
+            args = command[len(paths["set_clock_cmd"]) :].split()
+            return self.set_clock(int(args[0]), [int(a) for a in args[2:]])
+
+        if command.startswith(paths["change_ddio_cmd"]):
+            args = command[len(paths["change_ddio_cmd"]) :].split()
+            self.testbed.ddio_enabled = bool(int(args[1]))
+            return SimCommand()
+
+        if command.startswith(paths["pcm_iio_cmd"]):
+            args = command[len(paths["pcm_iio_cmd"]) :].split()
+            return self.pcm_iio(args)
+
+        if command.startswith(paths["perf_stat_cmd"]):
+            args = shlex.split(command[len(paths["perf_stat_cmd"]) :])
+            return self.perf_stat(args)
+
+        if command.startswith("mkdir "):
+            for path in shlex.split(command)[1:]:
+                if not path.startswith("-"):
+                    Path(path).mkdir(parents=True, exist_ok=True)
+            return SimCommand()
+
+        if command.startswith("sudo wrmsr 0xc8b"):
+            ddio_mask = int(command.split()[-1], 16)
+            self.testbed.ddio_ways = bin(ddio_mask).count("1")
+            return SimCommand()
+
+        for program_cmd, program in self.programs.items():
+            if command.startswith(program_cmd):
+                args = shlex.split(command[len(program_cmd) :])
+                return self.start_program(program, args)
+
+        return SimCommand()
+
+    def set_clock(self, clock: int, cores: list[int]) -> SimCommand:
+        testbed = self.testbed
+        if clock == 0:
+            clock = testbed.max_clock
+        for core in cores:
+            testbed.core_clocks[core] = clock
+
+        testbed.advance(testbed.clock_settle_time)
+        settle_ms = int(testbed.clock_settle_time * 1000)
+
+        return SimCommand(f"settle_ms: {settle_ms}\n")
+
+    def pcm_iio(self, args: list[str]) -> SimCommand:
+        """Save one sample per second of the PCIe traffic of the NICs.
+
+        Both directions carry the packets that the DUT echoes back, without
+        accounting for descriptors or other PCIe overheads.
+        """
+        csv_file = None
+        nb_samples = 1
+        for arg in args:
+            if arg.startswith("-csv="):
+                csv_file = arg[len("-csv=") :]
+            elif arg.startswith("-i="):
+                nb_samples = int(arg[len("-i=") :])
+
+        pktgen = self.testbed.pktgen
+        pkt_size = pktgen.pkt_size
+        bytes_per_sec = int(
+            pktgen.rx_throughput / 8 * pkt_size / (pkt_size + 20)
+        )
+
+        lines = ["Socket,Name,Part,IB write,IB read,OB read,OB write\n"]
+        for _ in range(nb_samples):
+            for stack in PCM_IIO_STACKS:
+                lines.append(f"{stack},{bytes_per_sec},{bytes_per_sec},0,0\n")
+        self.testbed.advance(nb_samples)
+
+        if csv_file is not None:
+            with open(csv_file, "w") as f:
+                f.writelines(lines)
+
+        return SimCommand()
+
+    def perf_stat(self, args: list[str]) -> SimCommand:
+        """Count cache events while running the command given after `--`
+        (only `sleep` is supported)."""
+        events: list[str] = []
+        output_file = None
+        duration = 0.0
+        i = 0
+        while i < len(args):
+            if args[i] == "-e":
+                events = args[i + 1].split(",")
+                i += 1
+            elif args[i] == "-o":
+                output_file = args[i + 1]
+                i += 1
+            elif args[i] == "--":
+                duration = float(args[i + 2])
+                break
+            i += 1
+
+        testbed = self.testbed
+        pktgen = testbed.pktgen
+        nb_pkts = pktgen.rx_throughput / ((pktgen.pkt_size + 20) * 8)
+        nb_pkts *= duration
+        testbed.advance(duration)
+
+        lines = []
+        for event in events:
+            if event == "LLC-load-misses":
+                per_pkt = PERF_LLC_MISSES_PER_PKT[testbed.ddio_enabled]
+            elif event in PERF_EVENTS_PER_PKT:
+                per_pkt = PERF_EVENTS_PER_PKT[event]
+            else:
+                lines.append(f"<not supported>,,{event},0,100.00,,\n")
+                continue
+            count = int(nb_pkts * per_pkt)
+            runtime = int(duration * 1e9)
+            lines.append(f"{count},,{event},{runtime},100.00,,\n")
+
+        if output_file is not None:
+            with open(output_file, "w") as f:
+                f.writelines(lines)
+
+        return SimCommand()
+
+    def start_program(self, program: str, args: list[str]) -> SimCommand:
+        testbed = self.testbed
+        if testbed.running_program is not None:
+            return SimCommand("Device or resource busy\n", exit_status=1)
+
+        nb_cycles = 0
+        if program.startswith("dpdk"):
+            nb_cores = len(args[args.index("-l") + 1].split(","))
+            queues_per_core = int(args[args.index("--q-per-core") + 1])
+            if "--nb-cycles" in args:
+                nb_cycles = int(args[args.index("--nb-cycles") + 1])
+        elif program == "enso_maglev":
+            program_args = args[args.index("--") + 1 :]
+            nb_cores = int(program_args[0])
+            queues_per_core = int(program_args[1])
+        else:
+            nb_cores = int(args[0])
+            queues_per_core = int(args[1])
+            nb_cycles = int(args[2])
+
+        testbed.advance(PROGRAM_STARTUP_TIME[program])
+
+        def stop_program() -> None:
+            testbed.running_program = None
+
+        testbed.running_program = {
+            "program": program,
+            "nb_cores": nb_cores,
+            "queues_per_core": queues_per_core,
+            "nb_cycles": nb_cycles,
+        }
+
+        return SimCommand(
+            PROGRAM_READY_OUTPUT[program],
+            running=True,
+            on_interrupt=stop_program,
+        )
+
+
+class SimEnsoNic:
+    """Stand-in for `EnsoNic` on the simulated DUT host."""
+
+    def __init__(self, testbed: "SimTestbed", host_name: str) -> None:
+        self.testbed = testbed
+        self.host_name = host_name
+        self.host = testbed.dut_host
+        self._fallback_queues = 0
+
+    def enable_desc_per_pkt(self) -> None:
+        self.testbed.desc_per_pkt = True
+
+    def disable_desc_per_pkt(self) -> None:
+        self.testbed.desc_per_pkt = False
+
+    @property
+    def fallback_queues(self) -> int:
+        return self._fallback_queues
+
+    @fallback_queues.setter
+    def fallback_queues(self, nb_fallback_queues: int) -> None:
+        self.testbed.advance(self.testbed.dut_host.command_latency)
+        self._fallback_queues = nb_fallback_queues
+
+    def get_stats(self) -> dict[str, int]:
+        return {}
+
+
+class SimPktgenNic:
+    """Stand-in for the `EnsoNic` used by `SimEnsoGen`.
+
+    Files produced by the simulated packet generator are local, so the host
+    name is `localhost`.
+    """
+
+    host_name = "localhost"
+
+
+class SimEnsoGen:
+    """Stand-in for `EnsoGen` connected to the simulated DUT.
+
+    Like EnsōGen, this fails when RTT histograms are enabled and not all the
+    packets come back.
+
+    Args:
+        testbed: Simulated testbed.
+        log_file: Where to log the packet generator output.
+        trial_overhead: Time to start and stop each transmission (in
+          seconds).
+    """
+
+    def __init__(
+        self,
+        testbed: "SimTestbed",
+        log_file: Union[bool, TextIO] = False,
+        trial_overhead: float = 0.3,
+    ) -> None:
+        self.testbed = testbed
+        self.log_file = log_file
+        self.trial_overhead = trial_overhead
+        self.nic = SimPktgenNic()
+        self.rtt_hist = False
+        self.hist_file = str(Path(testbed.tmp_dir.name) / "hist.csv")
+        self.pktgen_cmd = SimCommand()
+
+        self.pkt_size = 64
+        self.nb_src = 1
+        self.nb_dst = 1
+        self.error = False
+
+        self.clean_stats()
+
+    def set_params(self, pkt_size: int, nb_src: int, nb_dst: int) -> None:
+        self.pkt_size = pkt_size
+        self.nb_src = nb_src
+        self.nb_dst = nb_dst
+
+    def clean_stats(self) -> None:
+        self.nb_tx_pkts = 0
+        self.nb_rx_pkts = 0
+        self.rx_throughput = 0.0
+
+    def start(self, throughput: float, nb_pkts: int) -> None:
+        testbed = self.testbed
+        capacity = testbed.capacity(self.pkt_size, self.nb_dst)
+
+        pps = throughput / ((self.pkt_size + 20) * 8)
+        if nb_pkts == 0:
+            # Send until stopped.
+            nb_pkts = int(pps)
+            self.pktgen_cmd = SimCommand(running=True)
+
+        duration = nb_pkts / pps if pps > 0 else 0
+        testbed.advance(duration + self.trial_overhead)
+
+        delivered_ratio = min(capacity / throughput, 1.0) if throughput else 1
+        nb_rx_pkts = int(nb_pkts * delivered_ratio)
+
+        self.nb_tx_pkts += nb_pkts
+        self.nb_rx_pkts += nb_rx_pkts
+        self.rx_throughput = throughput * delivered_ratio
+
+        if self.rtt_hist and testbed.running_program is not None:
+            histogram = testbed.model.rtt_histogram(
+                testbed.running_program["program"],
+                throughput,
+                capacity,
+                nb_rx_pkts,
+            )
+            with open(self.hist_file, "w") as f:
+                for rtt, count in histogram:
+                    f.write(f"{rtt},{count}\n")
+
+        self.error = self.rtt_hist and nb_rx_pkts < nb_pkts
+
+    def wait_transmission_done(self) -> None:
+        if self.error:
+            raise RuntimeError("Error running EnsōGen")
+
+    def stop(self) -> None:
+        self.pktgen_cmd.running = False
+
+    def get_nb_tx_pkts(self) -> int:
+        return self.nb_tx_pkts
+
+    def get_nb_rx_pkts(self) -> int:
+        return self.nb_rx_pkts
+
+    def get_rx_throughput(self) -> float:
+        return self.rx_throughput
+
+
+class SimTestbed:
+    """Simulated testbed with a DUT host and an EnsōGen packet generator.
+
+    Time in the testbed is virtual. Every command, program startup and packet
+    transmission advances the virtual clock by how long it would take on the
+    real testbed. Set `speedup` to also sleep for the virtual time divided by
+    `speedup`, otherwise the simulation runs as fast as possible.
+
+    Args:
+        config: Experiment configuration (see `set_constants`).
+        model: Capacity model of the DUT.
+        max_clock: Maximum CPU frequency of the DUT (in kHz).
+        clock_settle_time: Time for CPU frequency changes to settle (in
+          seconds).
+        speedup: How much faster than real time the simulation runs. Zero
+          means as fast as possible.
+        log_file: Where to log the packet generator output.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        model: Optional[CapacityModel] = None,
+        max_clock: int = 3_100_000,
+        clock_settle_time: float = 0.2,
+        speedup: float = 0,
+        log_file: Union[bool, TextIO] = False,
+    ) -> None:
+        self.config = config
+        self.model = model or CapacityModel()
+        self.max_clock = max_clock
+        self.clock_settle_time = clock_settle_time
+        self.speedup = speedup
+        self.virtual_time = 0.0
+
+        self.core_clocks: dict[int, int] = {}
+        self.ddio_enabled = True
+        self.ddio_ways = config["extra"]["default_nb_ddio_ways"]
+        self.desc_per_pkt = False
+        self.running_program: Optional[dict[str, Any]] = None
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+        self.dut_host = SimHost(self)
+        self.dut_nic = SimEnsoNic(self, config["hosts"]["dut"])
+        self.pktgen = SimEnsoGen(self, log_file=log_file)
+
+    def advance(self, seconds: float) -> None:
+        self.virtual_time += seconds
+        if self.speedup > 0:
+            time.sleep(seconds / self.speedup)
+
+    def capacity(self, pkt_size: int, nb_dst: int) -> float:
+        """Capacity (in bps) of the program currently running on the DUT."""
+        if self.running_program is None:
+            return 0.0
+
+        nb_cores = self.running_program["nb_cores"]
+        core_clocks = [
+            self.core_clocks.get(core, self.max_clock)
+            for core in range(nb_cores)
+        ]
+        ddio_ways = self.ddio_ways if self.ddio_enabled else 0
+
+        return self.model.capacity(
+            self.running_program["program"],
+            pkt_size,
+            core_clocks,
+            self.running_program["queues_per_core"],
+            self.running_program["nb_cycles"],
+            ddio_ways,
+            nb_dst,
+            self.desc_per_pkt,
+        )
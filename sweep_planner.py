@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Helpers to plan the order in which experiment points run.
+
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def sweep_cost(
+    points: list[T],
+    cost: Callable[[Optional[T], T], float],
+    initial: Optional[T] = None,
+) -> float:
+    """Total cost of running `points` in the given order."""
+    total = 0.0
+    current = initial
+    for point in points:
+        total += cost(current, point)
+        current = point
+    return total
+
+
+def plan_sweep(
+    points: list[T],
+    cost: Callable[[Optional[T], T], float],
+    initial: Optional[T] = None,
+) -> tuple[list[T], float, float]:
+    """Reorder `points` to reduce the cost of moving between them.
+
+    Uses a greedy nearest-neighbor heuristic: starting from `initial`, always
+    run next the point that is cheapest to reach. Ties are broken by the
+    original order, so points that differ only in parameters that are free to
+    change keep their relative order.
+
+    Args:
+        points: Points to run.
+        cost: Function returning the cost of going from the first point
+          (None if nothing ran yet) to the second.
+        initial: Point where the sweep starts.
+
+    Returns:
+        Tuple with the planned order, its cost, and the cost of the original
+        order.
+    """
+    baseline_cost = sweep_cost(points, cost, initial)
+
+    remaining = list(points)
+    planned = []
+    planned_cost = 0.0
+    current = initial
+
+    while remaining:
+        best_idx = 0
+        best_cost = cost(current, remaining[0])
+        for idx in range(1, len(remaining)):
+            if best_cost == 0:
+                break
+            point_cost = cost(current, remaining[idx])
+            if point_cost < best_cost:
+                best_idx = idx
+                best_cost = point_cost
+
+        current = remaining.pop(best_idx)
+        planned.append(current)
+        planned_cost += best_cost
+
+    # The greedy heuristic is not guaranteed to beat the original order.
+    if planned_cost > baseline_cost:
+        return list(points), baseline_cost, baseline_cost
+
+    return planned, planned_cost, baseline_cost
@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("netexp")
+pytest.importorskip("enso")
+
+from experiment import (  # noqa: E402
+    check_cores_clock,
+    set_cores_clock,
+    set_cores_clock_command,
+)
+
+CONFIG = {"paths": {"set_clock_cmd": "sudo set_clock.sh"}}
+
+
+class FakeCommand:
+    def __init__(self, output: str, status: int) -> None:
+        self.output = output
+        self.status = status
+
+    def watch(self, **kwargs) -> str:
+        return self.output
+
+    def recv_exit_status(self) -> int:
+        return self.status
+
+
+class FakeHost:
+    def __init__(self, output: str, status: int) -> None:
+        self.output = output
+        self.status = status
+        self.commands: list[str] = []
+
+    def run_command(self, command: str, **kwargs) -> FakeCommand:
+        self.commands.append(command)
+        return FakeCommand(self.output, self.status)
+
+
+def test_command_sets_all_cores_at_once():
+    command = set_cores_clock_command(2000000, [0, 1, 2], CONFIG, timeout=5)
+    assert command == "sudo set_clock.sh 2000000 5000 0 1 2"
+
+
+def test_settle_time():
+    assert check_cores_clock(2000000, [0], "settle_ms: 250\n", 0) == 0.25
+
+
+def test_did_not_settle():
+    assert check_cores_clock(2000000, [0], "", 2, timeout=5) == 5
+
+
+def test_failure():
+    with pytest.raises(RuntimeError):
+        check_cores_clock(2000000, [0], "", 1)
+
+
+def test_single_command():
+    host = FakeHost("settle_ms: 120\n", 0)
+    assert set_cores_clock(host, 0, [0, 1], CONFIG) == 0.12
+    assert host.commands == ["sudo set_clock.sh 0 10000 0 1"]
@@ -0,0 +1,76 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from hist_summary import compact, percentile, read_histogram, summarize
+
+HIST_SUMMARY = Path(__file__).resolve().parent.parent / "hist_summary.py"
+
+
+def test_percentile():
+    bins = [(10.0, 50.0), (20.0, 49.0), (30.0, 1.0)]
+    assert percentile(bins, 0.5) == 10.0
+    assert percentile(bins, 0.99) == 20.0
+    assert percentile(bins, 0.999) == 30.0
+
+
+def test_summarize():
+    summary = summarize([(10.0, 1.0), (20.0, 3.0)])
+    assert summary is not None
+    assert summary["count"] == 4
+    assert summary["mean"] == 17.5
+    assert summary["p50"] == 20.0
+    assert summary["hist"] == [(10.0, 1.0), (20.0, 3.0)]
+
+
+def test_zero_total():
+    assert summarize([(10.0, 0.0), (20.0, 0.0)]) is None
+
+
+def test_compact_merges_close_bins():
+    bins = [(1000.0, 1.0), (1001.0, 1.0), (2000.0, 2.0), (3000.0, 0.0)]
+    assert compact(bins) == [(1000.5, 2.0), (2000.0, 2.0)]
+
+
+def test_read_histogram(tmp_path):
+    hist_file = tmp_path / "hist.csv"
+    hist_file.write_text("20,3\n10,1\n")
+    assert read_histogram(hist_file) == [(10.0, 1.0), (20.0, 3.0)]
+
+    hist_file.write_text("")
+    with pytest.raises(ValueError):
+        read_histogram(hist_file)
+
+
+def run_summary(*args: str) -> str:
+    return subprocess.run(
+        [sys.executable, str(HIST_SUMMARY), *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def test_command_moves_histogram(tmp_path):
+    hist_file = tmp_path / "hist.csv"
+    hist_file.write_text("10,1\n20,3\n")
+    keep = tmp_path / "pending" / "hist.csv"
+
+    summary = json.loads(run_summary(str(hist_file), "--keep", str(keep)))
+
+    assert summary["count"] == 4
+    assert not hist_file.exists()
+    assert keep.read_text() == "10,1\n20,3\n"
+
+
+def test_command_zero_total(tmp_path):
+    hist_file = tmp_path / "hist.csv"
+    hist_file.write_text("10,0\n")
+    keep = tmp_path / "pending" / "hist.csv"
+
+    assert json.loads(run_summary(str(hist_file), "--keep", str(keep))) is None
+    assert hist_file.exists()
+    assert not keep.exists()
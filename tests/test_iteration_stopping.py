@@ -0,0 +1,48 @@
+import math
+
+import pytest
+
+from iteration_stopping import (
+    AdaptiveIterations,
+    median_ci,
+    min_samples,
+    relative_ci_width,
+)
+
+
+def test_min_samples():
+    assert min_samples(0.95) == 6
+    assert min_samples(0.99) == 8
+
+
+def test_too_few_samples():
+    assert median_ci([1, 2, 3, 4, 5], 0.95) is None
+    assert relative_ci_width([1, 2, 3, 4, 5], 0.95) == math.inf
+
+
+def test_smallest_interval_uses_extremes():
+    assert median_ci([6, 1, 5, 2, 4, 3], 0.95) == (1, 6)
+
+
+def test_order_statistics():
+    # For 20 samples, the 95% interval is [x_(6), x_(15)].
+    samples = list(range(1, 21))
+    assert median_ci(samples, 0.95) == (6, 15)
+
+
+def test_relative_width():
+    samples = [99, 100, 100, 100, 100, 101]
+    assert relative_ci_width(samples, 0.95) == pytest.approx(0.02)
+    assert relative_ci_width([5] * 6, 0.95) == 0.0
+
+
+def test_adaptive_iterations():
+    stopping = AdaptiveIterations(max_ci_width=0.05, min_iterations=6)
+    assert not stopping.is_done([100] * 5)
+    assert stopping.is_done([99, 100, 100, 100, 100, 101])
+    assert not stopping.is_done([50, 100, 100, 100, 100, 150])
+
+
+def test_min_iterations_too_small():
+    with pytest.raises(ValueError):
+        AdaptiveIterations(max_ci_width=0.05, min_iterations=5)
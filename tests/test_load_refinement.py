@@ -0,0 +1,42 @@
+from load_refinement import LoadRefinement
+
+G = 1_000_000_000
+
+
+def test_flat_curve():
+    refinement = LoadRefinement(budget=4)
+    p99s = {10 * G: 10.0, 20 * G: 10.1, 30 * G: 10.2}
+    assert refinement.next_load(p99s, set()) is None
+
+
+def test_knee():
+    refinement = LoadRefinement(budget=4)
+    p99s = {70 * G: 10.0, 80 * G: 11.0, 90 * G: 40.0, 100 * G: 45.0}
+    assert refinement.next_load(p99s, set()) == 85 * G
+
+
+def test_lossy_high_endpoint_first():
+    refinement = LoadRefinement(budget=4)
+    p99s = {10 * G: 10.0, 20 * G: 100.0}
+    assert refinement.next_load(p99s, {30 * G}) == 25 * G
+
+
+def test_lossy_saved_histogram():
+    # With `always_save`, lossy loads also have a p99.
+    refinement = LoadRefinement(budget=4)
+    p99s = {10 * G: 10.0, 20 * G: 100.0, 30 * G: 100.0}
+    assert refinement.next_load(p99s, {30 * G}) == 25 * G
+
+
+def test_lossy_low_endpoint_skipped():
+    # (10, 11) is too narrow to split and loads between two lossy loads
+    # would also lose packets.
+    refinement = LoadRefinement(budget=4)
+    p99s = {10 * G: 10.0, 11 * G: 50.0}
+    assert refinement.next_load(p99s, {11 * G, 20 * G}) is None
+
+
+def test_min_step():
+    refinement = LoadRefinement(budget=4, min_step=10 * G)
+    p99s = {10 * G: 10.0}
+    assert refinement.next_load(p99s, {20 * G}) is None
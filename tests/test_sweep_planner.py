@@ -0,0 +1,62 @@
+from typing import Optional
+
+from sweep_planner import plan_sweep, sweep_cost
+
+
+def clock_cost(current: Optional[tuple], target: tuple) -> float:
+    """Changing the clock (second field) is expensive, changing the number
+    of cores (first field) is free."""
+    if current is None or current[1] != target[1]:
+        return 10.0
+    return 0.0
+
+
+def test_sweep_cost():
+    points = [(1, 100), (2, 100), (1, 200)]
+    assert sweep_cost(points, clock_cost) == 20.0
+    assert sweep_cost(points, clock_cost, initial=(1, 100)) == 10.0
+
+
+def test_groups_expensive_changes():
+    points = [(1, 100), (1, 200), (2, 100), (2, 200)]
+    planned, planned_cost, baseline_cost = plan_sweep(points, clock_cost)
+
+    assert planned == [(1, 100), (2, 100), (1, 200), (2, 200)]
+    assert planned_cost == 20.0
+    assert baseline_cost == 40.0
+
+
+def test_keeps_order_of_free_changes():
+    points = [(4, 100), (1, 100), (2, 100)]
+    planned, planned_cost, baseline_cost = plan_sweep(points, clock_cost)
+
+    assert planned == points
+    assert planned_cost == baseline_cost == 10.0
+
+
+def test_never_worse_than_original_order():
+    # Greedy starts with point 1, which makes the rest of the sweep expensive.
+    costs = {
+        (None, 0): 2.0,
+        (None, 1): 1.0,
+        (None, 2): 5.0,
+        (0, 1): 1.0,
+        (1, 0): 100.0,
+        (0, 2): 1.0,
+        (2, 0): 1.0,
+        (1, 2): 100.0,
+        (2, 1): 1.0,
+    }
+
+    def cost(current: Optional[int], target: int) -> float:
+        return costs[(current, target)]
+
+    points = [0, 2, 1]
+    planned, planned_cost, baseline_cost = plan_sweep(points, cost)
+
+    assert planned == points
+    assert planned_cost == baseline_cost == 4.0
+
+
+def test_empty():
+    assert plan_sweep([], clock_cost) == ([], 0.0, 0.0)
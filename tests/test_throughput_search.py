@@ -0,0 +1,92 @@
+import pytest
+
+pytest.importorskip("enso.ensogen")
+
+from throughput_search import ThroughputSearch  # noqa: E402
+
+GBPS = 1_000_000_000
+
+
+class FakePktgen:
+    """Packet generator connected to a DUT that drops every packet above
+    `capacity`."""
+
+    def __init__(self, capacity: float) -> None:
+        self.capacity = capacity
+        self.throughput = 0.0
+        self.nb_pkts = 0
+
+    def clean_stats(self) -> None:
+        pass
+
+    def start(self, throughput: float, nb_pkts: int) -> None:
+        self.throughput = throughput
+        self.nb_pkts = nb_pkts
+
+    def wait_transmission_done(self) -> None:
+        pass
+
+    def get_nb_tx_pkts(self) -> int:
+        return self.nb_pkts
+
+    def get_nb_rx_pkts(self) -> int:
+        if self.throughput <= self.capacity:
+            return self.nb_pkts
+        return int(self.nb_pkts * self.capacity / self.throughput)
+
+
+def find(capacity: float, **kwargs) -> int:
+    seed = kwargs.pop("seed", None)
+    search = ThroughputSearch(FakePktgen(capacity), 64, **kwargs)
+    return search.find(seed=seed)
+
+
+def test_full_range():
+    throughput = find(42.3 * GBPS)
+    assert 42.2 * GBPS <= throughput <= 42.3 * GBPS
+
+
+def test_seed_too_high_falls_back():
+    throughput = find(20.5 * GBPS, seed=(60 * GBPS, 70 * GBPS))
+    assert 20.4 * GBPS <= throughput <= 20.5 * GBPS
+
+
+def test_seed_too_low_falls_back():
+    throughput = find(80.5 * GBPS, seed=(10 * GBPS, 20 * GBPS))
+    assert 80.4 * GBPS <= throughput <= 80.5 * GBPS
+
+
+def test_seed_at_max_throughput():
+    search = ThroughputSearch(FakePktgen(100 * GBPS), 64)
+    assert search.find(seed=(90 * GBPS, 100 * GBPS)) == 100 * GBPS
+    assert search.nb_trials == 1
+
+
+def test_good_seed_saves_trials():
+    capacity = 55.55 * GBPS
+    full = ThroughputSearch(FakePktgen(capacity), 64)
+    full.find()
+    seeded = ThroughputSearch(FakePktgen(capacity), 64)
+    throughput = seeded.find(seed=(55 * GBPS, 56 * GBPS))
+    assert 55.45 * GBPS <= throughput <= 55.55 * GBPS
+    assert seeded.nb_trials < full.nb_trials
+
+
+def test_bounded_loss():
+    capacity = 50 * GBPS
+    zero_loss = find(capacity)
+    bounded_loss = find(capacity, loss_tolerance=0.01)
+
+    # Loss ratio is 1 - capacity / throughput above the capacity.
+    assert zero_loss <= capacity
+    assert capacity / 0.99 - 0.1 * GBPS <= bounded_loss <= capacity / 0.99
+
+
+def test_adaptive_duration_same_result():
+    capacity = 33.3 * GBPS
+    search = ThroughputSearch(
+        FakePktgen(capacity), 64, target_duration=1, adaptive_duration=True
+    )
+    throughput = search.find()
+    assert throughput == find(capacity)
+    assert search.trial_time < search.nb_trials
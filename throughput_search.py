@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# Throughput search strategies used by `experiment.py`.
+
+from typing import Optional, TextIO, Union
+
+from enso.ensogen import EnsoGen
+
+
+def is_ensogen_error(e: RuntimeError) -> bool:
+    """Check if an exception was raised because EnsōGen failed.
+
+    EnsōGen fails when it does not receive back all the packets it sent,
+    which indicates that the DUT cannot keep up with the offered load.
+    """
+    # HACK(sadok): Should use proper Exception class.
+    return len(e.args) > 0 and e.args[0] == "Error running EnsōGen"
+
+
+def log_message(log_file: Union[bool, TextIO], message: str) -> None:
+    if log_file is False:
+        return
+    if log_file is True:
+        print(message)
+        return
+    log_file.write(f"{message}\n")
+    log_file.flush()
+
+
+class ThroughputSearch:
+    """Bisection search for the zero-loss throughput of a DUT.
+
+    The search can also look for a bounded-loss throughput, i.e., the highest
+    rate at which the loss ratio does not exceed `loss_tolerance`.
+
+    Unlike `netexp.throughput.zero_loss_throughput`, the search can start
+    from a seed bracket (e.g., from previous measurements of the same or a
+    similar configuration). The seed bracket is never trusted blindly: if all
+    probes inside the bracket pass (or fail), the corresponding edge is
+    checked and the search falls back to the full range when it turns out to
+    be wrong.
+
+    When `adaptive_duration` is set, rates are first probed with a short
+    trial. Rates that are clearly below the boundary (no loss while the
+    bracket is still wide) or clearly above it (loss above `clear_loss_ratio`)
+    are decided by the short trial alone. Everything else, including every
+    probe once the bracket is narrower than `boundary_width`, is decided by a
+    trial of `target_duration`.
+
+    When `ramp` is set and no seed is given, the search starts with a rate
+    ramp (see `ramp_estimate`) to locate the loss onset and only runs a short
+    bisection around it to confirm the result.
+
+    Args:
+        pktgen: Packet generator used to send traffic to the DUT.
+        pkt_size: Packet size (in bytes).
+        max_throughput: Maximum throughput to probe (in bps).
+        precision: Search stops when the bracket is narrower than this (bps).
+        target_duration: Duration of each trial (in seconds).
+        log_file: Where to log the trials.
+        loss_tolerance: Maximum loss ratio that still counts as a pass (e.g.,
+          1e-4). Defaults to zero loss.
+        adaptive_duration: Use short trials for rates far from the boundary.
+        short_trial_duration: Minimum duration of short trials (in seconds).
+        min_trial_pkts: Minimum number of packets in a short trial. A
+          zero-loss short trial with n packets bounds the loss ratio to 3/n
+          with 95% confidence.
+        clear_loss_ratio: Loss ratio above which a short trial is enough to
+          tell that the rate is above the boundary.
+        boundary_width: Bracket width below which every probe uses a full
+          trial. Defaults to 8x the precision.
+        ramp: Estimate the loss onset with a rate ramp before bisecting.
+        ramp_steps: Number of steps in the rate ramp.
+        ramp_step_duration: Duration of each step in the ramp (in seconds).
+    """
+
+    def __init__(
+        self,
+        pktgen: EnsoGen,
+        pkt_size: int,
+        max_throughput: int = 100_000_000_000,
+        precision: int = 100_000_000,
+        target_duration: float = 1,
+        log_file: Union[bool, TextIO] = False,
+        loss_tolerance: float = 0.0,
+        adaptive_duration: bool = False,
+        short_trial_duration: float = 0.1,
+        min_trial_pkts: int = 100_000,
+        clear_loss_ratio: float = 0.01,
+        boundary_width: Optional[int] = None,
+        ramp: bool = False,
+        ramp_steps: int = 10,
+        ramp_step_duration: float = 0.1,
+    ) -> None:
+        self.pktgen = pktgen
+        self.pkt_size = pkt_size
+        self.max_throughput = max_throughput
+        self.precision = precision
+        self.target_duration = target_duration
+        self.log_file = log_file
+        self.loss_tolerance = loss_tolerance
+        self.adaptive_duration = adaptive_duration
+        self.short_trial_duration = short_trial_duration
+        self.min_trial_pkts = min_trial_pkts
+        self.clear_loss_ratio = max(clear_loss_ratio, 10 * loss_tolerance)
+
+        if boundary_width is None:
+            boundary_width = 8 * precision
+        self.boundary_width = boundary_width
+
+        self.ramp = ramp
+        self.ramp_steps = ramp_steps
+        self.ramp_step_duration = ramp_step_duration
+
+        self.nb_trials = 0
+        self.trial_time = 0.0
+        self.last_trial_full = True
+
+    def run_trial(self, throughput: float, duration: float) -> tuple[int, int]:
+        """Send traffic at `throughput` for `duration` seconds.
+
+        Returns:
+            Tuple with the number of transmitted and received packets.
+        """
+        pps = throughput / ((self.pkt_size + 20) * 8)
+        nb_pkts = max(int(pps * duration), 1)
+
+        self.nb_trials += 1
+        self.trial_time += duration
+        self.pktgen.clean_stats()
+        self.pktgen.start(throughput, nb_pkts)
+
+        try:
+            self.pktgen.wait_transmission_done()
+        except RuntimeError as e:
+            if not is_ensogen_error(e):
+                raise
+
+        nb_tx = self.pktgen.get_nb_tx_pkts()
+        nb_rx = self.pktgen.get_nb_rx_pkts()
+
+        log_message(
+            self.log_file,
+            f"Trial {self.nb_trials}: {throughput / 1e9:.3f} Gbps for "
+            f"{duration}s, tx: {nb_tx}, rx: {nb_rx}",
+        )
+
+        return nb_tx, nb_rx
+
+    @staticmethod
+    def loss_ratio(nb_tx: int, nb_rx: int) -> float:
+        if nb_tx == 0:
+            return 1.0
+        return max(nb_tx - nb_rx, 0) / nb_tx
+
+    def passes(self, throughput: float, near_boundary: bool = True) -> bool:
+        """Check if the DUT can sustain `throughput` within the loss tolerance.
+
+        Args:
+            throughput: Rate to probe (in bps).
+            near_boundary: Whether the rate may be the final result of the
+              search, in which case it is always checked with a full trial.
+        """
+        self.last_trial_full = True
+
+        if self.adaptive_duration and not near_boundary:
+            pps = throughput / ((self.pkt_size + 20) * 8)
+            duration = max(
+                self.short_trial_duration, self.min_trial_pkts / pps
+            )
+
+            if duration < self.target_duration:
+                nb_tx, nb_rx = self.run_trial(throughput, duration)
+                loss_ratio = self.loss_ratio(nb_tx, nb_rx)
+
+                if loss_ratio > self.clear_loss_ratio:
+                    return False
+
+                if loss_ratio <= self.loss_tolerance:
+                    self.last_trial_full = False
+                    return True
+
+        nb_tx, nb_rx = self.run_trial(throughput, self.target_duration)
+        return self.loss_ratio(nb_tx, nb_rx) <= self.loss_tolerance
+
+    def ramp_estimate(self) -> tuple[float, float]:
+        """Estimate the loss onset with a staircase of short trials.
+
+        EnsōGen sends at a constant rate in each run, so instead of a single
+        ramped trial, this runs up to `ramp_steps` separate short trials at
+        increasing rates up to `max_throughput`. The staircase stops at the
+        first trial with loss above the tolerance. The loss onset
+        is then estimated from the fraction of packets that the DUT delivered
+        in that step.
+
+        Returns:
+            Bracket (low, high) around the estimated loss onset.
+        """
+        step = self.max_throughput / self.ramp_steps
+        previous_rate = 0.0
+        samples = []
+
+        for i in range(1, self.ramp_steps + 1):
+            rate = step * i
+            pps = rate / ((self.pkt_size + 20) * 8)
+            duration = max(self.ramp_step_duration, self.min_trial_pkts / pps)
+
+            nb_tx, nb_rx = self.run_trial(rate, duration)
+            samples.append((rate, nb_tx, nb_rx))
+
+            if self.loss_ratio(nb_tx, nb_rx) > self.loss_tolerance:
+                break
+
+            previous_rate = rate
+        else:
+            # No loss above the tolerance up to the maximum throughput.
+            log_message(self.log_file, f"Ramp samples: {samples}")
+            return (previous_rate, previous_rate)
+
+        # When the DUT is overloaded, the rate at which it delivers packets
+        # approximates its capacity.
+        delivered_rate = rate * (1 - self.loss_ratio(nb_tx, nb_rx))
+        estimate = min(max(delivered_rate, previous_rate), rate)
+
+        low = max(estimate - self.boundary_width / 2, previous_rate)
+        high = min(estimate + self.boundary_width / 2, rate)
+
+        log_message(
+            self.log_file,
+            f"Ramp samples: {samples}, loss onset estimate: "
+            f"{estimate / 1e9:.3f} Gbps",
+        )
+
+        return (low, high)
+
+    def _bisect(
+        self,
+        low: float,
+        high: float,
+    ) -> tuple[float, float, bool, bool]:
+        """Bisect assuming `low` passes and `high` does not.
+
+        Returns:
+            Tuple with the final bracket and whether each of its edges was
+            confirmed by a probe. The lower edge only counts as confirmed if
+            it passed a full trial.
+        """
+        low_confirmed = False
+        high_confirmed = False
+        while high - low > self.precision:
+            mid = (low + high) / 2
+            near_boundary = high - low <= self.boundary_width
+            if self.passes(mid, near_boundary):
+                low = mid
+                low_confirmed = self.last_trial_full
+            else:
+                high = mid
+                high_confirmed = True
+
+        return low, high, low_confirmed, high_confirmed
+
+    def _search(
+        self,
+        low: float,
+        high: float,
+        low_known: bool = False,
+        high_known: bool = False,
+    ) -> float:
+        low, high, low_confirmed, high_confirmed = self._bisect(low, high)
+        low_known = low_known or low_confirmed or low == 0
+        high_known = high_known or high_confirmed
+
+        # The lower edge of the bracket was never probed with a full trial, it
+        # may be wrong.
+        if not low_known and not self.passes(low):
+            log_message(
+                self.log_file,
+                f"Lower bound {low / 1e9:.3f} Gbps is too high, "
+                "falling back to the full range",
+            )
+            return self._search(0, low, high_known=True)
+
+        # The upper edge of the bracket was never probed, it may be wrong.
+        if not high_known and self.passes(high):
+            if high >= self.max_throughput:
+                return high
+            log_message(
+                self.log_file,
+                f"Upper bound {high / 1e9:.3f} Gbps is too low, "
+                "falling back to the full range",
+            )
+            return self._search(high, self.max_throughput, low_known=True)
+
+        return low
+
+    def find(self, seed: Optional[tuple[float, float]] = None) -> int:
+        """Find the zero-loss (or bounded-loss) throughput.
+
+        Args:
+            seed: Optional bracket (low, high) where the zero-loss throughput
+              is expected to be. Defaults to the full range.
+
+        Returns:
+            Highest throughput within the loss tolerance (in bps).
+        """
+        self.nb_trials = 0
+        self.trial_time = 0.0
+        low = 0.0
+        high = float(self.max_throughput)
+
+        if seed is None and self.ramp:
+            seed = self.ramp_estimate()
+
+        if seed is not None:
+            low = min(max(seed[0], 0.0), high)
+            high = min(max(seed[1], low), high)
+
+            # Make sure the seed bracket is at least as wide as the precision.
+            if high - low < self.precision:
+                low = max(high - self.precision, 0.0)
+
+        # Points that previously reached the maximum throughput are likely
+        # to reach it again, so we check it first.
+        if seed is not None and high >= self.max_throughput:
+            if self.passes(high):
+                throughput = high
+            else:
+                throughput = self._search(low, high, high_known=True)
+        else:
+            throughput = self._search(low, high)
+
+        log_message(
+            self.log_file,
+            f"Throughput (loss tolerance {self.loss_tolerance:g}): "
+            f"{throughput / 1e9:.3f} Gbps after "
+            f"{self.nb_trials} trials ({self.trial_time:.1f}s, seed: {seed})",
+        )
+
+        return int(throughput)